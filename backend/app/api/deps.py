@@ -3,50 +3,75 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import decode_access_token
-from app.db.session import get_db
+from app.core.security import decode_access_claims
+from app.db.session import async_session, get_db
 from app.models import User
+from app.services.principal_cache import Principal, principal_cache
 
 security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def _resolve_principal(token: str) -> Principal:
+    """Снимок пользователя по токену: из кэша или (при промахе) из БД в отдельной короткой сессии."""
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    claims = decode_access_claims(token)
+    try:
+        user_id = int(claims.get("sub") or 0) if claims else 0
+    except ValueError:
+        user_id = 0
+    if not user_id:
+        raise _unauthorized("Invalid or expired token")
+    version = principal_cache.version()
+    async with async_session() as db:
+        row = (
+            await db.execute(
+                select(User.id, User.email, User.created_at, User.avatar_url).where(User.id == user_id)
+            )
+        ).one_or_none()
+    if row is None:
+        raise _unauthorized("User not found")
+    principal = Principal(**row._mapping)
+    principal_cache.put(token, version, principal, token_exp=claims.get("exp"))
+    return principal
+
+
+async def get_current_principal(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
-    db: AsyncSession = Depends(get_db),
-) -> User:
+) -> Principal:
+    """Текущий пользователь без ORM-сессии — для чтений, где нужен только id/профиль."""
     if not credentials or credentials.credentials is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user_id = decode_access_token(credentials.credentials)
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return user
+        raise _unauthorized("Not authenticated")
+    return await _resolve_principal(credentials.credentials)
 
 
-async def get_current_user_optional(
+async def get_current_principal_optional(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
-    db: AsyncSession = Depends(get_db),
-) -> User | None:
-    """Возвращает текущего пользователя или None, если не авторизован."""
+) -> Principal | None:
+    """Текущий пользователь или None, если не авторизован; без токена в БД не ходит."""
     if not credentials or credentials.credentials is None:
         return None
-    user_id = decode_access_token(credentials.credentials)
-    if user_id is None:
+    try:
+        return await _resolve_principal(credentials.credentials)
+    except HTTPException:
         return None
-    result = await db.execute(select(User).where(User.id == user_id))
-    return result.scalar_one_or_none()
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """ORM-объект пользователя в сессии запроса — для ручек, которые его меняют."""
+    user = await db.get(User, principal.id)
+    if not user:
+        raise _unauthorized("User not found")
+    return user
@@ -2,18 +2,16 @@ import os
 import secrets
 from datetime import datetime, timezone, timedelta
 
-import httpx
 from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_principal, get_current_user
 from app.core.config import settings
 from app.core.security import (
     create_access_token,
-    get_password_hash,
-    verify_password,
+    password_hasher,
 )
 from app.db.session import get_db
 from app.models import User
@@ -27,6 +25,8 @@ from app.schemas import (
     UserUpdate,
 )
 from app.services.email import send_password_reset_email
+from app.services.http_clients import GOOGLE, http_clients
+from app.services.principal_cache import Principal, mark_user_changed
 
 router = APIRouter()
 
@@ -44,7 +44,7 @@ async def register(
         )
     user = User(
         email=data.email,
-        hashed_password=get_password_hash(data.password),
+        hashed_password=await password_hasher.hash(data.password),
     )
     db.add(user)
     await db.flush()
@@ -73,11 +73,15 @@ async def login(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="This account uses Google sign-in. Use «Login with Google».",
         )
-    if not verify_password(data.password, user.hashed_password):
+    ok, new_hash = await password_hasher.verify_and_update(data.password, user.hashed_password)
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
+    if new_hash is not None:
+        # Стоимость bcrypt изменилась (PASSWORD_HASH_ROUNDS) — сохраняем хэш с новой
+        user.hashed_password = new_hash
     access_token = create_access_token(user.id)
     return Token(
         access_token=access_token,
@@ -95,40 +99,40 @@ async def login_google(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Google sign-in is not configured",
         )
-    async with httpx.AsyncClient() as client:
-        token_res = await client.post(
-            "https://oauth2.googleapis.com/token",
-            data={
-                "code": data.code,
-                "client_id": settings.google_client_id,
-                "client_secret": settings.google_client_secret,
-                "redirect_uri": data.redirect_uri,
-                "grant_type": "authorization_code",
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
+    client = http_clients.get(GOOGLE)
+    token_res = await client.post(
+        "https://oauth2.googleapis.com/token",
+        data={
+            "code": data.code,
+            "client_id": settings.google_client_id,
+            "client_secret": settings.google_client_secret,
+            "redirect_uri": data.redirect_uri,
+            "grant_type": "authorization_code",
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    if token_res.status_code != 200:
+        err_body = token_res.text
+        try:
+            err_json = token_res.json()
+            msg = err_json.get("error_description") or err_json.get("error") or err_body
+        except Exception:
+            msg = err_body or "Invalid or expired Google authorization code"
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=msg,
         )
-        if token_res.status_code != 200:
-            err_body = token_res.text
-            try:
-                err_json = token_res.json()
-                msg = err_json.get("error_description") or err_json.get("error") or err_body
-            except Exception:
-                msg = err_body or "Invalid or expired Google authorization code"
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=msg,
-            )
-        token_json = token_res.json()
-        access_token_google = token_json.get("access_token")
-        if not access_token_google:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Google did not return an access token",
-            )
-        userinfo_res = await client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token_google}"},
+    token_json = token_res.json()
+    access_token_google = token_json.get("access_token")
+    if not access_token_google:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Google did not return an access token",
         )
+    userinfo_res = await client.get(
+        "https://www.googleapis.com/oauth2/v2/userinfo",
+        headers={"Authorization": f"Bearer {access_token_google}"},
+    )
     if userinfo_res.status_code != 200:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -166,7 +170,7 @@ async def login_google(
 
 
 @router.get("/me", response_model=UserResponse)
-async def me(current_user: User = Depends(get_current_user)):
+async def me(current_user: Principal = Depends(get_current_principal)):
     return UserResponse.model_validate(current_user)
 
 
@@ -181,6 +185,7 @@ async def update_me(
         current_user.avatar_url = data.avatar_url if data.avatar_url.strip() else None
     await db.flush()
     await db.refresh(current_user)
+    mark_user_changed(db, current_user.id)
     return UserResponse.model_validate(current_user)
 
 
@@ -218,6 +223,7 @@ async def upload_avatar(
     current_user.avatar_url = f"{base}/api/uploads/avatars/{filename}"
     await db.flush()
     await db.refresh(current_user)
+    mark_user_changed(db, current_user.id)
     return UserResponse.model_validate(current_user)
 
 
@@ -268,8 +274,9 @@ async def reset_password(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ссылка недействительна или истекла. Запросите сброс пароля снова.",
         )
-    user.hashed_password = get_password_hash(data.new_password)
+    user.hashed_password = await password_hasher.hash(data.new_password)
     user.password_reset_token = None
     user.password_reset_expires = None
     await db.flush()
+    mark_user_changed(db, user.id)
     return {"detail": "Пароль изменён. Теперь можно войти с новым паролем."}
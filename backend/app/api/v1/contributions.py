@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.db.session import get_db
-from app.models import Contribution, WishlistItem
+from app.models import Contribution, Wishlist, WishlistItem
 from app.schemas import ContributionResponse
-from app.services.wishlist import broadcast_wishlist_update
+from app.services.wishlist import mark_wishlist_changed
 
 router = APIRouter()
 
@@ -40,17 +40,32 @@ async def cancel_contribution(
     contributor_secret: str, db: AsyncSession = Depends(get_db)
 ):
     """Отменить свой вклад."""
-    result = await db.execute(
-        select(Contribution)
-        .where(Contribution.contributor_secret == contributor_secret)
-        .options(selectinload(Contribution.item).selectinload(WishlistItem.wishlist))
-    )
-    contribution = result.scalar_one_or_none()
-    if not contribution:
+    # Сначала удаляем: итог товара уменьшает только тот запрос, который действительно удалил вклад
+    # (две одновременные отмены одним secret не вычтут сумму дважды)
+    deleted = (
+        await db.execute(
+            delete(Contribution)
+            .where(Contribution.contributor_secret == contributor_secret)
+            .returning(Contribution.wishlist_item_id, Contribution.amount)
+        )
+    ).first()
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Вклад не найден")
 
-    slug = contribution.item.wishlist.slug
-    await db.delete(contribution)
-    await db.flush()
-    await broadcast_wishlist_update(slug, db)
+    await db.execute(
+        update(WishlistItem)
+        .where(WishlistItem.id == deleted.wishlist_item_id)
+        .values(
+            total_contributed=WishlistItem.total_contributed - deleted.amount,
+            contributions_count=WishlistItem.contributions_count - 1,
+        )
+    )
+    slug = (
+        await db.execute(
+            select(Wishlist.slug)
+            .join(WishlistItem, WishlistItem.wishlist_id == Wishlist.id)
+            .where(WishlistItem.id == deleted.wishlist_item_id)
+        )
+    ).scalar_one()
+    mark_wishlist_changed(db, slug)
     return None
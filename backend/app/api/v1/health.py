@@ -1,5 +1,18 @@
+import secrets
 from datetime import datetime, timezone
-from fastapi import APIRouter
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.core.config import settings
+from app.core.security import password_hasher
+from app.db.session import pool_stats
+from app.services import fetch_product
+from app.services.cache import public_cache
+from app.services.principal_cache import principal_cache
+from app.services.product_cache import product_cache
+from app.services.http_clients import http_clients
+from app.services.pubsub import event_bus
+from app.services.websocket import broadcast_scheduler, ws_manager
 
 router = APIRouter()
 
@@ -17,3 +30,24 @@ async def test():
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "source": "backend",
     }
+
+
+@router.get("/internal/metrics", include_in_schema=False)
+async def internal_metrics(x_metrics_token: str | None = Header(default=None)):
+    """Метрики процесса: пул БД, кэш публичных снимков, WebSocket и шина изменений. Без METRICS_TOKEN — 404."""
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(x_metrics_token or "", settings.metrics_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return {
+        "db_pool": pool_stats(),
+        "public_cache": public_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "product_cache": product_cache.stats(),
+        "product_fetch": fetch_product.stats(),
+        "websocket": ws_manager.stats(),
+        "broadcast": broadcast_scheduler.stats(),
+        "event_bus": event_bus.stats(),
+        "password_hasher": password_hasher.stats(),
+        "http_clients": http_clients.stats(),
+    }
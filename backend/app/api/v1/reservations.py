@@ -6,7 +6,7 @@ from sqlalchemy.orm import selectinload
 from app.db.session import get_db
 from app.models import Reservation, WishlistItem
 from app.schemas import ReservationResponse
-from app.services.wishlist import broadcast_wishlist_update
+from app.services.wishlist import mark_wishlist_changed
 
 router = APIRouter()
 
@@ -51,5 +51,5 @@ async def cancel_reservation(
     slug = reservation.item.wishlist.slug
     await db.delete(reservation)
     await db.flush()
-    await broadcast_wishlist_update(slug, db)
+    mark_wishlist_changed(db, slug)
     return None
@@ -1,12 +1,21 @@
+import asyncio
+import base64
+import json
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, delete, func, insert, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.api.deps import get_current_user, get_current_user_optional
-from app.db.session import get_db
-from app.models import Contribution, Reservation, User, Wishlist, WishlistItem
+from app.api.deps import get_current_principal, get_current_principal_optional
+from app.core.config import settings
+from app.db.session import async_session, get_db
+from app.models import Contribution, Reservation, Wishlist, WishlistItem
 from app.schemas import (
     ContributionCreate,
     ContributionCreatedResponse,
@@ -18,21 +27,32 @@ from app.schemas import (
     WishlistItemCreate,
     WishlistItemResponse,
     WishlistItemUpdate,
+    WishlistItemsBatchRequest,
+    WishlistItemsBatchResponse,
+    WishlistItemsImportRequest,
     WishlistManageDetailResponse,
     WishlistManageResponse,
     WishlistPublicResponse,
     WishlistResponse,
+    WishlistSummaryPage,
+    WishlistSummaryResponse,
     WishlistUpdate,
 )
+from app.services.cache import public_cache
 from app.services.fetch_product import fetch_product
+from app.services.principal_cache import Principal
 from app.services.websocket import ws_manager
 from app.services.wishlist import (
     _total_contributed,
-    broadcast_wishlist_update,
-    get_wishlist_public_dict,
+    build_public_response,
+    get_items_aggregated,
+    get_wishlist_totals,
     item_to_response,
+    mark_wishlist_changed,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -41,7 +61,7 @@ router = APIRouter()
 async def create_wishlist(
     data: WishlistCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User | None = Depends(get_current_user_optional),
+    current_user: Principal | None = Depends(get_current_principal_optional),
 ):
     """Создать список желаний. Если авторизован — привязывается к пользователю."""
     wishlist = Wishlist(
@@ -61,14 +81,13 @@ async def create_wishlist(
 @router.get("/mine", response_model=list[WishlistManageDetailResponse])
 async def get_my_wishlists(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """Список вишлистов текущего пользователя. Доступно с любого устройства."""
     result = await db.execute(
         select(Wishlist)
         .where(Wishlist.user_id == current_user.id)
         .options(
-            selectinload(Wishlist.items).selectinload(WishlistItem.contributions),
             selectinload(Wishlist.items).selectinload(WishlistItem.reservation),
         )
     )
@@ -89,6 +108,65 @@ async def get_my_wishlists(
     ]
 
 
+def _encode_cursor(created_at: datetime, wishlist_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), wishlist_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, wishlist_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(wishlist_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Неверный курсор")
+
+
+@router.get("/mine/summary", response_model=WishlistSummaryPage)
+async def get_my_wishlists_summary(
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """
+    «Мои списки» постранично, новые первыми: карточки с итогами по товарам, посчитанными в SQL.
+    Курсор — позиция (created_at, id) последнего списка страницы; товары конкретного
+    списка — GET /m/{creator_secret}.
+    """
+    stmt = (
+        select(Wishlist)
+        .where(Wishlist.user_id == current_user.id)
+        .order_by(Wishlist.created_at.desc(), Wishlist.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        stmt = stmt.where(tuple_(Wishlist.created_at, Wishlist.id) < tuple_(*_decode_cursor(cursor)))
+    wishlists = list((await db.execute(stmt)).scalars())
+    next_cursor = None
+    if len(wishlists) > limit:
+        wishlists = wishlists[:limit]
+        next_cursor = _encode_cursor(wishlists[-1].created_at, wishlists[-1].id)
+    totals = await get_wishlist_totals([w.id for w in wishlists], db) if wishlists else {}
+    return WishlistSummaryPage(
+        items=[
+            WishlistSummaryResponse(
+                id=w.id,
+                title=w.title,
+                occasion=w.occasion,
+                event_date=w.event_date,
+                currency=getattr(w, "currency", None) or "RUB",
+                slug=w.slug,
+                creator_secret=w.creator_secret,
+                created_at=w.created_at,
+                **totals.get(w.id, {}),
+            )
+            for w in wishlists
+        ],
+        next_cursor=next_cursor,
+    )
+
+
 # --- Автозаполнение товара по URL ---
 @router.post("/fetch-product", response_model=FetchProductResponse)
 async def fetch_product_endpoint(data: FetchProductRequest):
@@ -113,64 +191,156 @@ async def fetch_product_endpoint(data: FetchProductRequest):
 
 
 # --- WebSocket для реалтайм-обновлений ---
+async def _heartbeat(websocket: WebSocket, slug: str) -> None:
+    while True:
+        await asyncio.sleep(settings.ws_ping_interval_seconds)
+        await ws_manager.ping(websocket, slug)
+
+
 @router.websocket("/ws/{slug}")
 async def wishlist_websocket(websocket: WebSocket, slug: str):
-    """Подписка на обновления вишлиста по slug (резервации, вклады)."""
-    await ws_manager.connect(websocket, slug)
+    """
+    Подписка на обновления вишлиста по slug (резервации, вклады).
+    Сразу после подключения — снимок, дальше — patch-сообщения с seq (см. ConnectionManager).
+    Клиент шлёт {"type": "resync"}, если заметил пропуск seq, и отвечает {"type": "pong"} на ping.
+    Без сообщений от клиента дольше WS_IDLE_TIMEOUT_SECONDS соединение закрывается.
+    """
+    if not await ws_manager.connect(websocket, slug):
+        return
+    heartbeat = asyncio.create_task(_heartbeat(websocket, slug))
     try:
+        await ws_manager.send_snapshot(websocket, slug)
         while True:
-            await websocket.receive_text()  # держим соединение
+            text = await asyncio.wait_for(
+                websocket.receive_text(), timeout=settings.ws_idle_timeout_seconds
+            )
+            try:
+                message = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(message, dict) and message.get("type") == "resync":
+                await ws_manager.send_snapshot(websocket, slug)
+    except asyncio.TimeoutError:
+        # Полуоткрытое соединение или клиент без pong
+        await websocket.close(code=1001)
     except WebSocketDisconnect:
         pass
     finally:
+        heartbeat.cancel()
         await ws_manager.disconnect(websocket, slug)
 
 
+# --- HTTP-кэширование: ETag / Last-Modified по ревизии списка ---
+def _etag(kind: str, wishlist_id: int, revision: int) -> str:
+    """Сильный ETag; kind различает представления (p — публичное, m — для создателя)."""
+    return f'"{kind}{wishlist_id}-{revision}"'
+
+
+def _cache_headers(etag: str, modified: datetime | None) -> dict[str, str]:
+    # no-cache: браузер и прокси хранят ответ, но каждый раз перепроверяют его по ETag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if modified:
+        headers["Last-Modified"] = format_datetime(modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def _not_modified(request: Request, etag: str, modified: datetime | None) -> bool:
+    """If-None-Match (приоритетнее) или If-Modified-Since совпадают с текущей ревизией."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
 # --- Публичный просмотр (для друзей по ссылке) ---
 @router.get("/s/{slug}", response_model=WishlistPublicResponse)
-async def get_wishlist_public(slug: str, db: AsyncSession = Depends(get_db)):
-    """Публичный вид списка по slug. Видят друзья — могут резервировать подарки."""
-    result = await db.execute(
-        select(Wishlist)
-        .where(Wishlist.slug == slug)
-        .options(
-            selectinload(Wishlist.items).selectinload(WishlistItem.contributions),
-            selectinload(Wishlist.items).selectinload(WishlistItem.reservation),
-        )
-    )
+async def get_wishlist_public(slug: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Публичный вид списка по slug. Видят друзья — могут резервировать подарки.
+    Поддерживает If-None-Match / If-Modified-Since: без изменений — 304 без сборки ответа.
+    """
+    version = public_cache.version(slug)
+    result = await db.execute(select(Wishlist).where(Wishlist.slug == slug))
     wishlist = result.scalar_one_or_none()
     if not wishlist:
         raise HTTPException(status_code=404, detail="Список не найден")
-    return WishlistPublicResponse(
-        id=wishlist.id,
-        title=wishlist.title,
-        occasion=wishlist.occasion,
-        event_date=wishlist.event_date,
-        currency=getattr(wishlist, "currency", None) or "RUB",
-        slug=wishlist.slug,
-        items=[item_to_response(i) for i in wishlist.items],
-    )
+    modified = wishlist.updated_at or wishlist.created_at
+    etag = _etag("p", wishlist.id, wishlist.revision)
+    headers = _cache_headers(etag, modified)
+    if _not_modified(request, etag, modified):
+        return Response(status_code=304, headers=headers)
+    payload = public_cache.get(slug, wishlist.revision)
+    if payload is None:
+        payload = (await build_public_response(wishlist, db)).model_dump_json().encode()
+        public_cache.put(slug, version, payload, wishlist.revision)
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 
 # --- Управление (для создателя по creator_secret) ---
-async def get_wishlist_by_secret(creator_secret: str, db: AsyncSession) -> Wishlist:
-    result = await db.execute(
-        select(Wishlist)
-        .where(Wishlist.creator_secret == creator_secret)
-        .options(
-            selectinload(Wishlist.items).selectinload(WishlistItem.contributions),
-            selectinload(Wishlist.items).selectinload(WishlistItem.reservation),
-        )
-    )
-    wishlist = result.scalar_one_or_none()
+async def get_wishlist_by_secret(creator_secret: str, db: AsyncSession, with_items: bool = True) -> Wishlist:
+    stmt = select(Wishlist).where(Wishlist.creator_secret == creator_secret)
+    if with_items:
+        stmt = stmt.options(selectinload(Wishlist.items).selectinload(WishlistItem.reservation))
+    wishlist = (await db.execute(stmt)).scalar_one_or_none()
     if not wishlist:
         raise HTTPException(status_code=404, detail="Список не найден или неверный ключ")
     return wishlist
 
 
+async def resolve_wishlist_owner(creator_secret: str, db: AsyncSession) -> Row[tuple[int, str]]:
+    """
+    Проверка ключа создателя для ручек редактирования: только (id, slug) по индексу
+    creator_secret, без загрузки товаров, резерваций и вкладов.
+    """
+    owner = (
+        await db.execute(select(Wishlist.id, Wishlist.slug).where(Wishlist.creator_secret == creator_secret))
+    ).first()
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Список не найден или неверный ключ")
+    return owner
+
+
+async def _delete_items(db: AsyncSession, item_ids: list[int]) -> None:
+    # Зависимые строки — явно: ON DELETE CASCADE есть не во всех БД (SQLite без PRAGMA)
+    await db.execute(delete(Contribution).where(Contribution.wishlist_item_id.in_(item_ids)))
+    await db.execute(delete(Reservation).where(Reservation.wishlist_item_id.in_(item_ids)))
+    await db.execute(delete(WishlistItem).where(WishlistItem.id.in_(item_ids)))
+
+
 @router.get("/m/{creator_secret}", response_model=WishlistManageDetailResponse)
-async def get_wishlist_manage(creator_secret: str, db: AsyncSession = Depends(get_db)):
-    """Управление списком по creator_secret. Создатель видит items с is_reserved (без имён)."""
+async def get_wishlist_manage(
+    creator_secret: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Управление списком по creator_secret. Создатель видит items с is_reserved (без имён).
+    Поддерживает If-None-Match / If-Modified-Since (304), как публичный вид.
+    """
+    result = await db.execute(
+        select(Wishlist.id, Wishlist.revision, Wishlist.updated_at, Wishlist.created_at)
+        .where(Wishlist.creator_secret == creator_secret)
+    )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="Список не найден или неверный ключ")
+    modified = row.updated_at or row.created_at
+    etag = _etag("m", row.id, row.revision)
+    headers = _cache_headers(etag, modified)
+    if _not_modified(request, etag, modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     wishlist = await get_wishlist_by_secret(creator_secret, db)
     return WishlistManageDetailResponse(
         id=wishlist.id,
@@ -190,7 +360,7 @@ async def update_wishlist(
     creator_secret: str, data: WishlistUpdate, db: AsyncSession = Depends(get_db)
 ):
     """Обновить название, повод, дату и валюту списка."""
-    wishlist = await get_wishlist_by_secret(creator_secret, db)
+    wishlist = await get_wishlist_by_secret(creator_secret, db, with_items=False)
     update_data = data.model_dump(exclude_unset=True)
     if "currency" in update_data and update_data["currency"]:
         update_data["currency"] = str(update_data["currency"]).upper()[:3]
@@ -198,6 +368,7 @@ async def update_wishlist(
         setattr(wishlist, k, v)
     await db.flush()
     await db.refresh(wishlist)
+    mark_wishlist_changed(db, wishlist.slug)
     return wishlist
 
 
@@ -205,6 +376,7 @@ async def update_wishlist(
 async def delete_wishlist(creator_secret: str, db: AsyncSession = Depends(get_db)):
     """Удалить список и все его товары и резервации."""
     wishlist = await get_wishlist_by_secret(creator_secret, db)
+    mark_wishlist_changed(db, wishlist.slug)
     await db.delete(wishlist)
     return None
 
@@ -217,41 +389,207 @@ async def add_item(
     db: AsyncSession = Depends(get_db),
 ):
     """Добавить товар в список."""
-    wishlist = await get_wishlist_by_secret(creator_secret, db)
-    max_order = (
-        await db.execute(
-            select(WishlistItem.sort_order)
-            .where(WishlistItem.wishlist_id == wishlist.id)
-            .order_by(WishlistItem.sort_order.desc())
-            .limit(1)
-        )
-    )
-    last = max_order.scalar_one_or_none()
-    sort_order = (last or 0) + 1
-
+    owner = await resolve_wishlist_owner(creator_secret, db)
+    last = (
+        await db.execute(select(func.max(WishlistItem.sort_order)).where(WishlistItem.wishlist_id == owner.id))
+    ).scalar_one_or_none()
     item = WishlistItem(
-        wishlist_id=wishlist.id,
+        wishlist_id=owner.id,
         title=data.title,
         link=data.link,
         price=data.price,
         min_contribution=data.min_contribution,
         image_url=data.image_url,
-        sort_order=sort_order,
+        sort_order=(last or 0) + 1,
     )
     db.add(item)
     await db.flush()
-    await db.refresh(item)
-    # Перезагружаем с relationships — иначе lazy load падает в async
-    result = await db.execute(
-        select(WishlistItem)
-        .where(WishlistItem.id == item.id)
-        .options(
-            selectinload(WishlistItem.reservation),
-            selectinload(WishlistItem.contributions),
-        )
+    mark_wishlist_changed(db, owner.slug)
+    (response,) = await get_items_aggregated(owner.id, db, item_ids=[item.id])
+    return response
+
+
+def _ndjson(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode()
+
+
+async def _fetch_for_import(sem: asyncio.Semaphore, index: int, url: str) -> tuple[int, dict | None, str | None]:
+    async with sem:
+        try:
+            return index, await fetch_product(url), None
+        except ValueError as e:
+            return index, None, str(e)
+        except httpx.HTTPError as e:
+            return index, None, f"Не удалось загрузить страницу: {e!s}"
+        except Exception:  # ошибка одной ссылки не должна обрывать поток и импорт остальных
+            logger.exception("Import fetch failed for %s", url)
+            return index, None, "Не удалось разобрать страницу. Введите данные вручную."
+
+
+async def _import_items_stream(creator_secret: str, urls: list[str]):
+    """
+    NDJSON: строка progress на каждую ссылку по мере готовности, в конце — done с товарами.
+    Сессия своя: зависимость get_db закрывается до начала стриминга ответа.
+    """
+    sem = asyncio.Semaphore(settings.items_import_concurrency)
+    tasks = [asyncio.create_task(_fetch_for_import(sem, i, url)) for i, url in enumerate(urls)]
+    products: list[tuple[dict | None, str | None]] = [(None, None)] * len(urls)
+    try:
+        for completed, next_done in enumerate(asyncio.as_completed(tasks), start=1):
+            index, product, error = await next_done
+            products[index] = (product, error)
+            yield _ndjson({
+                "type": "progress",
+                "index": index,
+                "url": urls[index],
+                "ok": error is None,
+                "title": product.get("title") if product else None,
+                "error": error,
+                "completed": completed,
+                "total": len(urls),
+            })
+    finally:
+        # Клиент отключился — незачем догружать остальные страницы
+        for task in tasks:
+            task.cancel()
+
+    async with async_session() as db:
+        wishlist = (
+            await db.execute(select(Wishlist.id, Wishlist.slug).where(Wishlist.creator_secret == creator_secret))
+        ).first()
+        if wishlist is None:
+            yield _ndjson({"type": "error", "detail": "Список не найден или неверный ключ"})
+            return
+        last = (
+            await db.execute(select(func.max(WishlistItem.sort_order)).where(WishlistItem.wishlist_id == wishlist.id))
+        ).scalar_one_or_none() or 0
+        rows = []
+        for offset, (url, (product, _)) in enumerate(zip(urls, products), start=1):
+            product = product or {}
+            rows.append({
+                "wishlist_id": wishlist.id,
+                # Без данных со страницы название — сама ссылка, владелец поправит вручную
+                "title": (product.get("title") or url)[:200],
+                "link": url[:2048],
+                "price": product.get("price"),
+                "image_url": (product.get("image_url") or "")[:2048] or None,
+                "sort_order": last + offset,
+            })
+        # Один INSERT на все товары; порядок RETURNING совпадает с порядком строк
+        inserted = (
+            await db.execute(
+                insert(WishlistItem).returning(
+                    WishlistItem.id, WishlistItem.created_at, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+        ).all()
+        mark_wishlist_changed(db, wishlist.slug)
+        await db.commit()  # after_commit: сброс кэша и одна WS-рассылка на весь импорт
+    items = [
+        WishlistItemResponse(**row, id=ids.id, created_at=ids.created_at, is_reserved=False)
+        for row, ids in zip(rows, inserted)
+    ]
+    yield _ndjson({"type": "done", "items": [item.model_dump(mode="json") for item in items]})
+
+
+@router.post("/m/{creator_secret}/items/import")
+async def import_items(
+    creator_secret: str,
+    data: WishlistItemsImportRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Добавить товары списком ссылок (до 100). Страницы грузятся параллельно, ответ —
+    NDJSON-поток: {"type": "progress", ...} на каждую ссылку, затем {"type": "done", "items": [...]}.
+    Товары добавляются одним INSERT в конец списка; подписчики получают одно обновление.
+    """
+    await resolve_wishlist_owner(creator_secret, db)
+    return StreamingResponse(
+        _import_items_stream(creator_secret, data.urls),
+        media_type="application/x-ndjson",
     )
-    item = result.scalar_one()
-    return item_to_response(item)
+
+
+@router.post("/m/{creator_secret}/items/batch", response_model=WishlistItemsBatchResponse)
+async def batch_items(
+    creator_secret: str,
+    data: WishlistItemsBatchRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Несколько операций над товарами за один запрос: create, update, delete, move
+    (перетаскивание — move с новым sort_order для каждого сдвинутого товара).
+    Операции применяются по порядку в одной транзакции: если хоть одна не проходит,
+    не меняется ничего. В ответе только созданные и изменённые товары; подписчики
+    получают одно обновление на весь пакет.
+    """
+    wishlist = await resolve_wishlist_owner(creator_secret, db)
+    referenced = {op.id for op in data.ops if op.op != "create"}
+    known: set[int] = set()
+    if referenced:
+        known = set(
+            (
+                await db.execute(
+                    select(WishlistItem.id).where(
+                        WishlistItem.wishlist_id == wishlist.id,
+                        WishlistItem.id.in_(referenced),
+                    )
+                )
+            ).scalars()
+        )
+
+    creates: list[dict] = []
+    changes: dict[int, dict] = {}  # id -> новые значения колонок (поздние операции перекрывают ранние)
+    deleted: list[int] = []
+    for op in data.ops:
+        if op.op == "create":
+            creates.append(op.model_dump(exclude={"op"}))
+            continue
+        if op.id not in known:
+            raise HTTPException(status_code=404, detail=f"Товар {op.id} не найден")
+        if op.op == "delete":
+            known.discard(op.id)
+            changes.pop(op.id, None)
+            deleted.append(op.id)
+        elif op.op == "move":
+            changes.setdefault(op.id, {})["sort_order"] = op.sort_order
+        else:
+            changes.setdefault(op.id, {}).update(op.model_dump(exclude={"op", "id"}, exclude_unset=True))
+
+    if deleted:
+        await _delete_items(db, deleted)
+    updates = [{"id": item_id, **values} for item_id, values in changes.items() if values]
+    if updates:
+        # Bulk UPDATE по первичному ключу: executemany, по одному выражению на набор колонок
+        await db.execute(update(WishlistItem), updates)
+    created_ids: list[int] = []
+    if creates:
+        last = 0
+        if any(row["sort_order"] is None for row in creates):
+            last = (
+                await db.execute(
+                    select(func.max(WishlistItem.sort_order)).where(WishlistItem.wishlist_id == wishlist.id)
+                )
+            ).scalar_one_or_none() or 0
+        for row in creates:
+            row["wishlist_id"] = wishlist.id
+            if row["sort_order"] is None:
+                last += 1
+                row["sort_order"] = last
+        created_ids = list(
+            (
+                await db.execute(
+                    insert(WishlistItem).returning(WishlistItem.id, sort_by_parameter_order=True),
+                    creates,
+                )
+            ).scalars()
+        )
+
+    mark_wishlist_changed(db, wishlist.slug)
+    changed = created_ids + list(changes)
+    items = await get_items_aggregated(wishlist.id, db, item_ids=changed) if changed else []
+    return WishlistItemsBatchResponse(items=items, deleted=deleted)
 
 
 @router.patch("/m/{creator_secret}/items/{item_id}", response_model=WishlistItemResponse)
@@ -262,33 +600,19 @@ async def update_item(
     db: AsyncSession = Depends(get_db),
 ):
     """Обновить товар."""
-    wishlist = await get_wishlist_by_secret(creator_secret, db)
-    result = await db.execute(
-        select(WishlistItem).where(
-            WishlistItem.id == item_id,
-            WishlistItem.wishlist_id == wishlist.id,
-        )
-    )
-    item = result.scalar_one_or_none()
-    if not item:
-        raise HTTPException(status_code=404, detail="Товар не найден")
-
+    owner = await resolve_wishlist_owner(creator_secret, db)
     update_data = data.model_dump(exclude_unset=True)
-    for k, v in update_data.items():
-        setattr(item, k, v)
-    await db.flush()
-    await db.refresh(item)
-    # Перезагружаем с relationships — иначе lazy load падает в async
-    result = await db.execute(
-        select(WishlistItem)
-        .where(WishlistItem.id == item.id)
-        .options(
-            selectinload(WishlistItem.reservation),
-            selectinload(WishlistItem.contributions),
+    if update_data:
+        await db.execute(
+            update(WishlistItem)
+            .where(WishlistItem.id == item_id, WishlistItem.wishlist_id == owner.id)
+            .values(**update_data)
         )
-    )
-    item = result.scalar_one()
-    return item_to_response(item)
+    items = await get_items_aggregated(owner.id, db, item_ids=[item_id])
+    if not items:
+        raise HTTPException(status_code=404, detail="Товар не найден")
+    mark_wishlist_changed(db, owner.slug)
+    return items[0]
 
 
 @router.delete("/m/{creator_secret}/items/{item_id}", status_code=204)
@@ -296,17 +620,16 @@ async def delete_item(
     creator_secret: str, item_id: int, db: AsyncSession = Depends(get_db)
 ):
     """Удалить товар."""
-    wishlist = await get_wishlist_by_secret(creator_secret, db)
-    result = await db.execute(
-        select(WishlistItem).where(
-            WishlistItem.id == item_id,
-            WishlistItem.wishlist_id == wishlist.id,
+    owner = await resolve_wishlist_owner(creator_secret, db)
+    found = (
+        await db.execute(
+            select(WishlistItem.id).where(WishlistItem.id == item_id, WishlistItem.wishlist_id == owner.id)
         )
-    )
-    item = result.scalar_one_or_none()
-    if not item:
+    ).first()
+    if not found:
         raise HTTPException(status_code=404, detail="Товар не найден")
-    await db.delete(item)
+    await _delete_items(db, [item_id])
+    mark_wishlist_changed(db, owner.slug)
     return None
 
 
@@ -329,7 +652,6 @@ async def reserve_item(
         select(Wishlist)
         .where(Wishlist.slug == slug)
         .options(
-            selectinload(Wishlist.items).selectinload(WishlistItem.contributions),
             selectinload(Wishlist.items).selectinload(WishlistItem.reservation),
         )
     )
@@ -350,10 +672,7 @@ async def reserve_item(
     db.add(reservation)
     await db.flush()
     await db.refresh(reservation)
-
-    data = await get_wishlist_public_dict(slug, db)
-    if data:
-        await ws_manager.broadcast_wishlist(slug, data)
+    mark_wishlist_changed(db, slug)
 
     return ReservationCreatedResponse(reserver_secret=reservation.reserver_secret)
 
@@ -378,14 +697,12 @@ async def contribute_item(
     if not wishlist:
         raise HTTPException(status_code=404, detail="Список не найден")
 
-    # Блокируем строку товара, чтобы не допустить превышение целевой суммы при одновременных запросах
+    # Блокируем строку товара, чтобы не допустить превышение целевой суммы при одновременных запросах.
+    # Итог вкладов хранится в самой строке — вклады не загружаются.
     item_result = await db.execute(
         select(WishlistItem)
         .where(WishlistItem.id == item_id, WishlistItem.wishlist_id == wishlist.id)
-        .options(
-            selectinload(WishlistItem.contributions),
-            selectinload(WishlistItem.reservation),
-        )
+        .options(selectinload(WishlistItem.reservation))
         .with_for_update()
     )
     item = item_result.scalar_one_or_none()
@@ -415,11 +732,16 @@ async def contribute_item(
         amount=data.amount,
     )
     db.add(contribution)
+    await db.execute(
+        update(WishlistItem)
+        .where(WishlistItem.id == item.id)
+        .values(
+            total_contributed=WishlistItem.total_contributed + data.amount,
+            contributions_count=WishlistItem.contributions_count + 1,
+        )
+    )
     await db.flush()
     await db.refresh(contribution)
-
-    wishlist_data = await get_wishlist_public_dict(slug, db)
-    if wishlist_data:
-        await ws_manager.broadcast_wishlist(slug, wishlist_data)
+    mark_wishlist_changed(db, slug)
 
     return ContributionCreatedResponse(contributor_secret=contribution.contributor_secret)
@@ -29,12 +29,73 @@ class Settings(BaseSettings):
     # Resend API key — если задан, при «забыли пароль» отправляется письмо
     resend_api_key: str | None = Field(default=None, validation_alias="RESEND_API_KEY")
     resend_from_email: str = Field(default="onboarding@resend.dev", validation_alias="RESEND_FROM_EMAIL")
+    # Кэш публичных снимков вишлиста (GET /wishlists/s/{slug}) в памяти процесса
+    public_cache_max_entries: int = Field(default=1024, validation_alias="PUBLIC_CACHE_MAX_ENTRIES")
+    public_cache_ttl_seconds: float = Field(default=30.0, validation_alias="PUBLIC_CACHE_TTL_SECONDS")
+    # WebSocket: изменения одного списка за это окно уходят подписчикам одним снимком
+    ws_broadcast_window_seconds: float = Field(default=0.15, validation_alias="WS_BROADCAST_WINDOW_SECONDS")
+    # Шина изменений между воркерами: memory (один процесс) или postgres (LISTEN/NOTIFY;
+    # за PgBouncer слушает через DATABASE_DIRECT_URL)
+    broadcast_backend: str = Field(default="memory", validation_alias="BROADCAST_BACKEND")
+    # Очередь исходящих сообщений на одно подключение; переполнение — снимок вместо патчей, затем отключение
+    ws_send_queue_size: int = Field(default=32, validation_alias="WS_SEND_QUEUE_SIZE")
+    ws_send_timeout_seconds: float = Field(default=10.0, validation_alias="WS_SEND_TIMEOUT_SECONDS")
+    # Heartbeat: сервер шлёт {"type": "ping"}, клиент отвечает pong; молчание дольше idle — отключение
+    ws_ping_interval_seconds: float = Field(default=25.0, validation_alias="WS_PING_INTERVAL_SECONDS")
+    ws_idle_timeout_seconds: float = Field(default=60.0, validation_alias="WS_IDLE_TIMEOUT_SECONDS")
+    # Лимиты подключений на процесс: сверх лимита — close 1013 (Try Again Later)
+    ws_max_connections_per_slug: int = Field(default=500, validation_alias="WS_MAX_CONNECTIONS_PER_SLUG")
+    ws_max_connections: int = Field(default=10_000, validation_alias="WS_MAX_CONNECTIONS")
+    # bcrypt: стоимость (log2 раундов) и пул потоков; при смене rounds хэш пересчитывается при входе
+    password_hash_rounds: int = Field(default=12, validation_alias="PASSWORD_HASH_ROUNDS")
+    password_hash_workers: int = Field(default=2, validation_alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_queue: int = Field(default=64, validation_alias="PASSWORD_HASH_MAX_QUEUE")
+    # Кэш проверенных JWT (снимок пользователя) на процесс; 0 секунд — каждый запрос идёт в БД
+    principal_cache_max_entries: int = Field(default=10_000, validation_alias="PRINCIPAL_CACHE_MAX_ENTRIES")
+    principal_cache_ttl_seconds: float = Field(default=30.0, validation_alias="PRINCIPAL_CACHE_TTL_SECONDS")
+    # Общий httpx-клиент для страниц магазинов: размер пула и время жизни keep-alive соединения
+    http_max_connections: int = Field(default=100, validation_alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(default=20, validation_alias="HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    http_keepalive_expiry_seconds: float = Field(default=30.0, validation_alias="HTTP_KEEPALIVE_EXPIRY_SECONDS")
+    # Кэш fetch-product: свежая запись отдаётся как есть, устаревшая (до stale) — сразу, с фоновым
+    # обновлением; ответы 403/401/429 кэшируются отдельно на negative_ttl
+    product_cache_max_entries: int = Field(default=2048, validation_alias="PRODUCT_CACHE_MAX_ENTRIES")
+    product_cache_ttl_seconds: float = Field(default=24 * 3600, validation_alias="PRODUCT_CACHE_TTL_SECONDS")
+    product_cache_stale_seconds: float = Field(default=7 * 24 * 3600, validation_alias="PRODUCT_CACHE_STALE_SECONDS")
+    product_cache_negative_ttl_seconds: float = Field(default=600, validation_alias="PRODUCT_CACHE_NEGATIVE_TTL_SECONDS")
+    # Одновременные загрузки страниц магазинов на процесс: всего и на один хост
+    product_fetch_max_concurrency: int = Field(default=16, validation_alias="PRODUCT_FETCH_MAX_CONCURRENCY")
+    product_fetch_per_host: int = Field(default=2, validation_alias="PRODUCT_FETCH_PER_HOST")
+    # Импорт списка ссылок (POST /m/{secret}/items/import): сколько страниц грузить одновременно
+    items_import_concurrency: int = Field(default=8, validation_alias="ITEMS_IMPORT_CONCURRENCY")
+    # Разбор страниц товара в пуле процессов: 0 — прямо в event loop; лимиты размера и времени на задание
+    product_parse_workers: int = Field(default=2, validation_alias="PRODUCT_PARSE_WORKERS")
+    product_parse_max_bytes: int = Field(default=1_000_000, validation_alias="PRODUCT_PARSE_MAX_BYTES")
+    product_parse_timeout_seconds: float = Field(default=2.0, validation_alias="PRODUCT_PARSE_TIMEOUT_SECONDS")
+    # Миграции схемы при старте (python -m app.db.migrate под advisory lock); по умолчанию пустая БД
+    # создаётся при старте, а на непустой устаревшей приложение не запускается
+    db_migrate_on_startup: bool = Field(default=False, validation_alias="DB_MIGRATE_ON_STARTUP")
+    # Пул соединений с Postgres (для SQLite в тестах не применяется)
+    db_pool_size: int = Field(default=10, validation_alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, validation_alias="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(default=30.0, validation_alias="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(default=1800, validation_alias="DB_POOL_RECYCLE_SECONDS")
+    db_pool_pre_ping: bool = Field(default=True, validation_alias="DB_POOL_PRE_PING")
+    # Кэш подготовленных запросов asyncpg на соединение; 0 — выключен
+    db_statement_cache_size: int = Field(default=100, validation_alias="DB_STATEMENT_CACHE_SIZE")
+    # За PgBouncer в режиме transaction: без кэша prepared statements и с уникальными именами
+    db_pgbouncer: bool = Field(default=False, validation_alias="DB_PGBOUNCER")
+    # Прямое подключение к Postgres в обход PgBouncer — для сессионных возможностей (advisory lock
+    # миграций, LISTEN); при DB_PGBOUNCER без него миграции и BROADCAST_BACKEND=postgres не запускаются
+    database_direct_url: str | None = Field(default=None, validation_alias="DATABASE_DIRECT_URL")
+    # Токен для /api/internal/metrics (заголовок X-Metrics-Token); без него ручка отключена (404)
+    metrics_token: str | None = Field(default=None, validation_alias="METRICS_TOKEN")
 
     model_config = {"env_file": ".env"}
 
-    @field_validator("database_url", mode="before")
+    @field_validator("database_url", "database_direct_url", mode="before")
     @classmethod
-    def async_driver(cls, v: str) -> str:
+    def async_driver(cls, v: str | None) -> str | None:
         if v and v.startswith("postgresql://") and "asyncpg" not in v:
             return v.replace("postgresql://", "postgresql+asyncpg://", 1)
         return v
@@ -1,11 +1,20 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.services.metrics import Histogram
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# rounds задаёт и допустимый диапазон: хэши с другой стоимостью verify_and_update пересчитывает
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.password_hash_rounds,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -16,6 +25,91 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasherBusy(Exception):
+    """Очередь на хэширование переполнена — запрос лучше повторить позже."""
+
+
+class PasswordHasher:
+    """
+    bcrypt в отдельном пуле потоков, чтобы не блокировать event loop (bcrypt отпускает GIL).
+
+    В пуле workers потоков; задачи сверх них ждут в очереди пула, и если ждущих уже max_queue —
+    PasswordHasherBusy. Время в очереди и время самого bcrypt пишутся в гистограммы.
+    """
+
+    def __init__(self, context: CryptContext, workers: int = 2, max_queue: int = 64) -> None:
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self.in_flight = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.wait = Histogram()
+        self.duration = Histogram()
+
+    @property
+    def queued(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    async def _run(self, fn, *args):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+        def timed():
+            started_at = time.perf_counter()
+            return fn(*args), started_at, time.perf_counter()
+
+        submitted_at = time.perf_counter()
+        self.in_flight += 1
+        try:
+            result, started_at, finished_at = await asyncio.get_running_loop().run_in_executor(
+                self._executor, timed
+            )
+        finally:
+            self.in_flight -= 1
+        self.wait.observe(started_at - submitted_at)
+        self.duration.observe(finished_at - started_at)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(совпал ли пароль, новый хэш или None) — новый хэш, если стоимость изменилась."""
+        ok, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if new_hash is not None:
+            self.rehashed += 1
+        return ok, new_hash
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": settings.password_hash_rounds,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "wait_seconds": self.wait.snapshot(),
+            "duration_seconds": self.duration.snapshot(),
+        }
+
+
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+
+
 def create_access_token(subject: int | str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(
         minutes=settings.access_token_expire_minutes
@@ -28,14 +122,24 @@ def create_access_token(subject: int | str) -> str:
     )
 
 
-def decode_access_token(token: str) -> int | None:
+def decode_access_claims(token: str) -> dict | None:
+    """Проверенные claims токена или None, если подпись/срок невалидны."""
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token,
             settings.secret_key,
             algorithms=[settings.algorithm],
         )
-        sub = payload.get("sub")
-        return int(sub) if sub else None
     except JWTError:
         return None
+
+
+def decode_access_token(token: str) -> int | None:
+    payload = decode_access_claims(token)
+    if payload is None:
+        return None
+    sub = payload.get("sub")
+    try:
+        return int(sub) if sub else None
+    except ValueError:
+        return None
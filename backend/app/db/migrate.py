@@ -0,0 +1,224 @@
+"""
+Версионированные миграции схемы: файлы backend/migrations/NNNN_<имя>.sql и NNNN_<имя>.py
+применяются по порядку номеров, каждый один раз; применённые версии — в таблице schema_migrations.
+
+Запуск из backend/ (перед стартом приложения при деплое):
+    python -m app.db.migrate
+
+Пустая БД создаётся по моделям (create_all) и сразу помечается всеми известными версиями —
+модели уже отражают их. Несколько воркеров/деплоев не применяют миграции одновременно:
+в Postgres прогон идёт под advisory lock (за PgBouncer — только по прямому DATABASE_DIRECT_URL).
+При старте приложения — check_schema_version(): пустая БД создаётся сразу, отставшая непустая —
+только с DB_MIGRATE_ON_STARTUP.
+
+SQL-файл выполняется в одной транзакции вместе с записью версии; файл с CONCURRENTLY —
+вне транзакции, по одному выражению (такие файлы должны быть идемпотентны: IF NOT EXISTS).
+INVALID-индекс от прерванного CREATE INDEX CONCURRENTLY пересоздаётся, а не пропускается.
+Python-миграция определяет async def upgrade(conn: AsyncConnection) и выполняется в транзакции.
+"""
+import asyncio
+import importlib.util
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+import app.models  # noqa: F401 — все таблицы в Base.metadata для create_all
+from app.core.config import settings
+from app.db.base import Base
+from app.db.session import engine as app_engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+# Ключ pg_advisory_lock: одинаковый у всех процессов приложения
+ADVISORY_LOCK_KEY = 7_202_410_001
+
+_FILE_NAME = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+_CONCURRENTLY = re.compile(r"\bCONCURRENTLY\b", re.IGNORECASE)
+_CREATE_INDEX_CONCURRENTLY = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE
+)
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+class SchemaOutdated(RuntimeError):
+    """Схема БД отстаёт от миграций в коде."""
+
+
+class SchemaEmpty(SchemaOutdated):
+    """БД пустая (нет ни таблиц приложения, ни schema_migrations) — её можно создать по моделям."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    def statements(self) -> list[str]:
+        return split_sql(self.path.read_text(encoding="utf-8"))
+
+    @property
+    def transactional(self) -> bool:
+        """CONCURRENTLY в самих выражениях (не в комментариях) нельзя выполнять в транзакции."""
+        return self.path.suffix == ".py" or not any(_CONCURRENTLY.search(stmt) for stmt in self.statements())
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """Миграции каталога по возрастанию версии; файлы без номера (служебные скрипты) пропускаются."""
+    migrations: dict[int, Migration] = {}
+    for path in directory.iterdir():
+        match = _FILE_NAME.match(path.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise RuntimeError(f"Две миграции с версией {version:04d}: {migrations[version].path.name}, {path.name}")
+        migrations[version] = Migration(version, match.group(2), path)
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def split_sql(sql: str) -> list[str]:
+    """Выражения SQL-файла: без комментариев --, разделитель — ';' (в файлах нет функций и строк с ';')."""
+    lines = [line.split("--", 1)[0] for line in sql.splitlines()]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+async def _index_valid(conn: AsyncConnection, name: str) -> bool | None:
+    """pg_index.indisvalid индекса; None — индекса нет."""
+    return (
+        await conn.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+        )
+    ).scalar()
+
+
+async def _apply(conn: AsyncConnection, migration: Migration) -> None:
+    if migration.path.suffix == ".py":
+        spec = importlib.util.spec_from_file_location(f"migration_{migration.version:04d}", migration.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        await module.upgrade(conn)
+        return
+    for stmt in migration.statements():
+        index = _CREATE_INDEX_CONCURRENTLY.match(stmt) if conn.dialect.name == "postgresql" else None
+        if index and await _index_valid(conn, index.group(1)) is False:
+            # Прерванный CREATE INDEX CONCURRENTLY оставляет INVALID-индекс, а IF NOT EXISTS его пропустил бы
+            logger.warning("Dropping invalid index %s left by an interrupted build", index.group(1))
+            await conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {index.group(1)}")
+        await conn.exec_driver_sql(stmt)
+        if index and not await _index_valid(conn, index.group(1)):
+            raise RuntimeError(f"Index {index.group(1)} is missing or invalid after {migration.path.name}")
+
+
+def _has_table(conn, name: str) -> bool:
+    return inspect(conn).has_table(name)
+
+
+async def _applied_versions(conn: AsyncConnection) -> set[int]:
+    return set((await conn.execute(select(schema_migrations.c.version))).scalars())
+
+
+async def _record(conn: AsyncConnection, migration: Migration) -> None:
+    await conn.execute(schema_migrations.insert().values(version=migration.version, name=migration.name))
+
+
+async def _migrate_locked(engine: AsyncEngine, migrations: list[Migration]) -> list[Migration]:
+    async with engine.begin() as conn:
+        has_versions = await conn.run_sync(_has_table, schema_migrations.name)
+        fresh = not has_versions and not await conn.run_sync(_has_table, "wishlists")
+        await conn.run_sync(schema_migrations.metadata.create_all)
+        if fresh:
+            await conn.run_sync(Base.metadata.create_all)
+            for migration in migrations:
+                await _record(conn, migration)
+            logger.info("Schema created from models at version %04d", migrations[-1].version if migrations else 0)
+            return []
+        applied = await _applied_versions(conn)
+
+    done = []
+    for migration in migrations:
+        if migration.version in applied:
+            continue
+        logger.info("Applying migration %s", migration.path.name)
+        if migration.transactional:
+            async with engine.begin() as conn:
+                await _apply(conn, migration)
+                await _record(conn, migration)
+        else:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await _apply(conn, migration)
+                await _record(conn, migration)
+        done.append(migration)
+    return done
+
+
+async def migrate(engine: AsyncEngine, directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """Применяет недостающие миграции; возвращает применённые в этом прогоне."""
+    migrations = discover(directory)
+    if engine.dialect.name != "postgresql":
+        return await _migrate_locked(engine, migrations)
+    if settings.db_pgbouncer and engine is app_engine:
+        # Сессионный advisory lock через PgBouncer (transaction) может сняться на другом серверном
+        # соединении и остаться висеть — следующий деплой ждал бы его вечно
+        raise RuntimeError("Migrations need a direct Postgres connection: use app.db.session.direct_engine()")
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        # Остальные процессы ждут здесь, потом видят уже применённые версии
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        try:
+            return await _migrate_locked(engine, migrations)
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+
+async def check_schema_version(engine: AsyncEngine, directory: Path = MIGRATIONS_DIR) -> int:
+    """
+    Один запрос при старте: версия БД не ниже последней миграции в коде, иначе SchemaOutdated
+    (SchemaEmpty — если БД пустая).
+    """
+    migrations = discover(directory)
+    expected = migrations[-1].version if migrations else 0
+    async with engine.connect() as conn:  # недоступность БД пробрасывается как есть
+        try:
+            current = (await conn.execute(select(func.max(schema_migrations.c.version)))).scalar() or 0
+        except DBAPIError:  # нет таблицы schema_migrations — БД ещё не мигрирована
+            await conn.rollback()
+            if not await conn.run_sync(_has_table, "wishlists"):
+                raise SchemaEmpty("Database is empty: schema will be created from models") from None
+            current = 0
+    if current < expected:
+        raise SchemaOutdated(
+            f"Database schema is at version {current:04d}, code expects {expected:04d}: run python -m app.db.migrate"
+        )
+    return current
+
+
+async def main() -> None:
+    from app.db.session import direct_engine
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    engine = direct_engine()
+    try:
+        applied = await migrate(engine)
+    finally:
+        await engine.dispose()
+    print(f"Applied {len(applied)} migration(s)" + "".join(f"\n  {m.path.name}" for m in applied))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,13 +1,60 @@
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import time
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from app.core.config import settings
-from app.db.base import Base
+from app.services.metrics import Histogram
+
+# Время ожидания свободного соединения из пула (включая открытие нового в overflow)
+pool_wait = Histogram()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул asyncpg, который пишет время выдачи соединения в pool_wait."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+
+def engine_options(url: str) -> dict:
+    """Параметры пула и драйвера из настроек; только для Postgres, SQLite оставляем по умолчанию."""
+    if not url.startswith("postgresql"):
+        return {}
+    connect_args: dict = {
+        # statement_cache_size — кэш asyncpg, prepared_statement_cache_size — кэш диалекта SQLAlchemy
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+    }
+    if settings.db_pgbouncer:
+        # PgBouncer в режиме transaction отдаёт разные серверные соединения — именованные
+        # prepared statements между ними не переживают, поэтому кэш выключен, а имена уникальны
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
 
 # sync URL for create_async_engine expects postgresql+asyncpg://
 engine = create_async_engine(
     settings.database_url,
     echo=False,
+    **engine_options(settings.database_url),
 )
 
 async_session = async_sessionmaker(
@@ -19,6 +66,35 @@ async_session = async_sessionmaker(
 )
 
 
+def direct_engine() -> AsyncEngine:
+    """
+    Engine с прямым подключением к Postgres — для сессионных блокировок и LISTEN, которые не
+    переживают PgBouncer в режиме transaction. Без DB_PGBOUNCER — общий engine; иначе новый
+    (без пула) по DATABASE_DIRECT_URL, его закрывает вызывающий.
+    """
+    if not settings.db_pgbouncer:
+        return engine
+    if not settings.database_direct_url:
+        raise RuntimeError("DB_PGBOUNCER is set: DATABASE_DIRECT_URL (direct Postgres connection) is required")
+    return create_async_engine(settings.database_direct_url, poolclass=NullPool)
+
+
+def pool_stats() -> dict:
+    """Состояние пула: занятые, свободные и overflow-соединения плюс время ожидания выдачи."""
+    pool = engine.pool
+    stats: dict = {"class": type(pool).__name__, "wait_seconds": pool_wait.snapshot()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # overflow() отрицателен, пока пул не заполнен до pool_size
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    return stats
+
+
 async def get_db():
     async with async_session() as session:
         try:
@@ -32,25 +108,12 @@ async def get_db():
 
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        # Widen price/amount columns for existing DBs (Numeric(10,2) -> Numeric(18,2))
-        for stmt in (
-            "ALTER TABLE wishlist_items ALTER COLUMN price TYPE NUMERIC(18, 2)",
-            "ALTER TABLE contributions ALTER COLUMN amount TYPE NUMERIC(18, 2)",
-            "ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS currency VARCHAR(3) DEFAULT 'RUB'",
-            "ALTER TABLE wishlist_items ADD COLUMN IF NOT EXISTS min_contribution NUMERIC(18, 2) NULL",
-            "ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS user_id INTEGER NULL",
-            "ALTER TABLE wishlists DROP CONSTRAINT IF EXISTS fk_wishlists_user_id",
-            "ALTER TABLE wishlists ADD CONSTRAINT fk_wishlists_user_id "
-            "FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL",
-            "CREATE INDEX IF NOT EXISTS ix_wishlists_user_id ON wishlists(user_id)",
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS password_reset_token VARCHAR(255) NULL",
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS password_reset_expires TIMESTAMP NULL",
-            "CREATE INDEX IF NOT EXISTS ix_users_password_reset_token ON users(password_reset_token)",
-            "ALTER TABLE users ADD COLUMN IF NOT EXISTS avatar_url VARCHAR(2048) NULL",
-        ):
-            try:
-                await conn.execute(text(stmt))
-            except Exception:
-                pass  # column/constraint may already exist or table missing
+    """Применить недостающие миграции (см. app.db.migrate); пустая БД создаётся по моделям."""
+    from app.db.migrate import migrate
+
+    target = direct_engine()
+    try:
+        await migrate(target)
+    finally:
+        if target is not engine:
+            await target.dispose()
@@ -2,13 +2,20 @@ import logging
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.v1 import auth, contributions, health, items, reservations, wishlists
 from app.core.config import settings
-from app.db.session import init_db
+from app.core.security import PasswordHasherBusy, password_hasher
+from app.db.migrate import SchemaEmpty, SchemaOutdated, check_schema_version
+from app.db.session import engine, init_db
+from app.services.fetch_product import parse_pool
+from app.services.http_clients import http_clients
+from app.services.pubsub import event_bus
+from app.services.websocket import broadcast_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -35,15 +42,26 @@ OPENAPI_TAGS = [
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
+        await check_schema_version(engine)
+    except SchemaOutdated as e:
+        # Пустую БД (первый деплой, SQLite в памяти) создаём всегда; непустую отставшую — только по флагу
+        if not isinstance(e, SchemaEmpty) and not settings.db_migrate_on_startup:
+            raise
         await init_db()
-    except Exception as e:  # init_db can raise DB/network errors
-        logger.warning("Database init skipped (unavailable): %s", e)
+    except Exception as e:  # DB/network errors: стартуем, запросы к БД вернут ошибку
+        logger.warning("Database check skipped (unavailable): %s", e)
     upload_dir = os.path.join(settings.upload_dir, "avatars")
     os.makedirs(upload_dir, exist_ok=True)
     if os.path.isdir(settings.upload_dir):
         app.mount("/api/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
+    await event_bus.start()
+    parse_pool.start()
     yield
-    # cleanup if needed
+    await event_bus.stop()
+    await broadcast_scheduler.aclose()
+    password_hasher.shutdown()
+    await http_clients.aclose()
+    parse_pool.shutdown()
 
 
 app = FastAPI(
@@ -73,6 +91,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    """Очередь bcrypt переполнена (всплеск логинов) — просим клиента повторить позже."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(items.router, prefix="/api/items", tags=["items"])
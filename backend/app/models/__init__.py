@@ -2,7 +2,7 @@ import secrets
 from datetime import date, datetime
 from decimal import Decimal
 
-from sqlalchemy import Date, DateTime, ForeignKey, Numeric, String, Text
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Numeric, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -39,6 +39,10 @@ class Wishlist(Base):
     user_id — владелец (если залогинен при создании); иначе None.
     """
     __tablename__ = "wishlists"
+    __table_args__ = (
+        # «Мои списки» постранично: WHERE user_id ORDER BY created_at DESC, id DESC
+        Index("ix_wishlists_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int | None] = mapped_column(
@@ -51,8 +55,12 @@ class Wishlist(Base):
     event_date: Mapped[date | None] = mapped_column(Date, nullable=True)  # Дата события
     currency: Mapped[str] = mapped_column(String(3), default="RUB")  # Валюта списка: RUB, USD, EUR, ...
     slug: Mapped[str] = mapped_column(String(64), unique=True, default=generate_slug, index=True)
-    creator_secret: Mapped[str] = mapped_column(String(64), default=generate_slug)
+    # Индекс: по creator_secret находится список в каждой ручке редактирования
+    creator_secret: Mapped[str] = mapped_column(String(64), unique=True, default=generate_slug, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Ревизия списка: увеличивается при каждом изменении списка, товаров, резерваций и вкладов (ETag)
+    revision: Mapped[int] = mapped_column(default=1, server_default="1")
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, default=datetime.utcnow)
 
     user: Mapped["User | None"] = relationship("User", back_populates="wishlists")
     items: Mapped[list["WishlistItem"]] = relationship(
@@ -66,6 +74,10 @@ class Wishlist(Base):
 class WishlistItem(Base):
     """Товар в списке желаний."""
     __tablename__ = "wishlist_items"
+    __table_args__ = (
+        # Товары списка в порядке отображения и MAX(sort_order) при добавлении
+        Index("ix_wishlist_items_wishlist_id_sort_order", "wishlist_id", "sort_order"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     wishlist_id: Mapped[int] = mapped_column(ForeignKey("wishlists.id", ondelete="CASCADE"))
@@ -75,6 +87,10 @@ class WishlistItem(Base):
     min_contribution: Mapped[Decimal | None] = mapped_column(Numeric(18, 2), nullable=True)  # Мин. вклад (опц.)
     image_url: Mapped[str | None] = mapped_column(String(2048), nullable=True)  # Картинка
     sort_order: Mapped[int] = mapped_column(default=0)  # Порядок отображения
+    # Денормализованные итоги по contributions: обновляются в contribute/cancel,
+    # пересчитываются app.services.reconcile
+    total_contributed: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=Decimal("0"), server_default="0")
+    contributions_count: Mapped[int] = mapped_column(default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     wishlist: Mapped["Wishlist"] = relationship("Wishlist", back_populates="items")
@@ -97,6 +113,11 @@ class Contribution(Base):
     не видит кто сколько скинул.
     """
     __tablename__ = "contributions"
+    __table_args__ = (
+        # Вклады товара (selectinload, каскадное удаление, пересчёт итогов): в Postgres
+        # сумма считается по индексу без чтения таблицы
+        Index("ix_contributions_wishlist_item_id", "wishlist_item_id", postgresql_include=["amount"]),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     wishlist_item_id: Mapped[int] = mapped_column(
@@ -129,6 +150,25 @@ class Reservation(Base):
     item: Mapped["WishlistItem"] = relationship("WishlistItem", back_populates="reservation")
 
 
+class ProductCache(Base):
+    """
+    Кэш метаданных товара для fetch-product по каноническому URL (без utm и прочих меток).
+    До fresh_until запись отдаётся как есть, до stale_until — сразу, с обновлением в фоне.
+    error заполнен у «отрицательных» записей (403/401/429) — магазин не опрашиваем до fresh_until.
+    """
+    __tablename__ = "product_cache"
+
+    url_hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 канонического URL
+    url: Mapped[str] = mapped_column(Text)
+    title: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    image_url: Mapped[str | None] = mapped_column(String(2048), nullable=True)
+    price: Mapped[Decimal | None] = mapped_column(Numeric(18, 2), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    fresh_until: Mapped[datetime] = mapped_column(DateTime)
+    stale_until: Mapped[datetime] = mapped_column(DateTime, index=True)  # для очистки устаревших
+
+
 # Legacy model — можно удалить после миграции старых данных
 class Item(Base):
     __tablename__ = "items"
@@ -25,10 +25,15 @@ from app.schemas.wishlist import (
     WishlistItemCreate,
     WishlistItemResponse,
     WishlistItemUpdate,
+    WishlistItemsBatchRequest,
+    WishlistItemsBatchResponse,
+    WishlistItemsImportRequest,
     WishlistManageDetailResponse,
     WishlistManageResponse,
     WishlistPublicResponse,
     WishlistResponse,
+    WishlistSummaryPage,
+    WishlistSummaryResponse,
     WishlistUpdate,
 )
 
@@ -54,9 +59,14 @@ __all__ = [
     "WishlistItemCreate",
     "WishlistItemResponse",
     "WishlistItemUpdate",
+    "WishlistItemsBatchRequest",
+    "WishlistItemsBatchResponse",
+    "WishlistItemsImportRequest",
     "WishlistManageDetailResponse",
     "WishlistManageResponse",
     "WishlistPublicResponse",
     "WishlistResponse",
+    "WishlistSummaryPage",
+    "WishlistSummaryResponse",
     "WishlistUpdate",
 ]
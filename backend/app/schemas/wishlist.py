@@ -1,5 +1,6 @@
 from datetime import date, datetime
 from decimal import Decimal
+from typing import Annotated, Literal
 
 from pydantic import BaseModel, Field
 
@@ -100,6 +101,19 @@ class WishlistPublicResponse(BaseModel):
     items: list[WishlistItemResponse]
 
 
+class WishlistSummaryResponse(WishlistManageResponse):
+    """Карточка списка для «Мои списки»: итоги по товарам без самих товаров."""
+    item_count: int = 0
+    reserved_count: int = 0
+    collected: Decimal = Decimal("0")  # Сумма вкладов по всем товарам
+    target: Decimal = Decimal("0")  # Сумма цен товаров
+
+
+class WishlistSummaryPage(BaseModel):
+    items: list[WishlistSummaryResponse]
+    next_cursor: str | None = Field(None, description="Передать в cursor для следующей страницы; null — конец")
+
+
 class WishlistManageDetailResponse(WishlistManageResponse):
     """Полный вид для управления — создатель видит items с is_reserved (без имён)."""
     items: list[WishlistItemResponse]
@@ -110,6 +124,49 @@ class FetchProductRequest(BaseModel):
     url: str = Field(description="Ссылка на страницу товара")
 
 
+class WishlistItemsImportRequest(BaseModel):
+    """Массовый импорт: ссылки на товары, данные подтягиваются как в fetch-product."""
+    urls: list[str] = Field(min_length=1, max_length=100, description="Ссылки на страницы товаров (до 100)")
+
+
+class WishlistItemBatchCreate(WishlistItemCreate):
+    op: Literal["create"]
+    sort_order: int | None = Field(None, description="Позиция; по умолчанию — в конец списка")
+
+
+class WishlistItemBatchUpdate(WishlistItemUpdate):
+    op: Literal["update"]
+    id: int
+
+
+class WishlistItemBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+class WishlistItemBatchMove(BaseModel):
+    op: Literal["move"]
+    id: int
+    sort_order: int = Field(description="Новая позиция товара")
+
+
+WishlistItemBatchOp = Annotated[
+    WishlistItemBatchCreate | WishlistItemBatchUpdate | WishlistItemBatchDelete | WishlistItemBatchMove,
+    Field(discriminator="op"),
+]
+
+
+class WishlistItemsBatchRequest(BaseModel):
+    """Операции над товарами, применяются по порядку в одной транзакции."""
+    ops: list[WishlistItemBatchOp] = Field(min_length=1, max_length=200)
+
+
+class WishlistItemsBatchResponse(BaseModel):
+    """Только затронутые товары: созданные и изменённые, плюс id удалённых."""
+    items: list[WishlistItemResponse]
+    deleted: list[int]
+
+
 class FetchProductResponse(BaseModel):
     """Название, картинка и цена, извлечённые со страницы (Open Graph, schema.org)."""
     title: str | None = None
@@ -0,0 +1,89 @@
+"""In-process LRU-кэш публичных снимков вишлиста (сериализованный WishlistPublicResponse)."""
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+
+
+class PublicWishlistCache:
+    """
+    Кэш JSON-байтов публичного ответа по slug.
+
+    Версионирование по slug: version(slug) — номер последней инвалидации этого списка; читатель
+    берёт его перед построением снимка, а put() принимает снимок, только если slug не
+    инвалидировали после этого (изменения других списков версию не сдвигают). Так снимок, собранный из данных до
+    commit конкурентной записи, не попадает в кэш после её инвалидации.
+    Записи помечены ревизией списка из БД (wishlists.revision): get() с ревизией промахивается,
+    если список изменили в другом процессе. TTL — страховка для чтений без ревизии.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[bytes, float, int | None]] = OrderedDict()
+        # slug -> номер поколения последней инвалидации; ограничен, старые сворачиваются в _floor
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._floor = 0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self, slug: str) -> int:
+        """Версия списка для последующего put(): номер его последней инвалидации."""
+        return self._invalidated.get(slug, self._floor)
+
+    def get(self, slug: str, revision: int | None = None) -> bytes | None:
+        entry = self._entries.get(slug)
+        if entry is None:
+            self.misses += 1
+            return None
+        payload, expires_at, entry_revision = entry
+        if expires_at < time.monotonic() or (revision is not None and entry_revision != revision):
+            del self._entries[slug]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(slug)
+        self.hits += 1
+        return payload
+
+    def put(self, slug: str, version: int, payload: bytes, revision: int | None = None) -> bool:
+        """Сохранить снимок, собранный после version(slug). False — снимок устарел и отброшен."""
+        if self._invalidated.get(slug, self._floor) > version:
+            return False
+        self._entries[slug] = (payload, time.monotonic() + self.ttl_seconds, revision)
+        self._entries.move_to_end(slug)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def invalidate(self, slug: str) -> None:
+        self._generation += 1
+        self._entries.pop(slug, None)
+        self._invalidated[slug] = self._generation
+        self._invalidated.move_to_end(slug)
+        self.invalidations += 1
+        while len(self._invalidated) > self.max_entries * 4:
+            _, generation = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, generation)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+public_cache = PublicWishlistCache(
+    max_entries=settings.public_cache_max_entries,
+    ttl_seconds=settings.public_cache_ttl_seconds,
+)
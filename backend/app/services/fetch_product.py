@@ -1,16 +1,36 @@
 """Подтягивание названия, картинки и цены по URL страницы товара (Open Graph, schema.org)."""
-import json
+import asyncio
+import contextlib
+import logging
+import multiprocessing
 import re
-from decimal import Decimal
-from urllib.parse import urljoin, urlparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
 
 import httpx
-from bs4 import BeautifulSoup
+
+from app.core.config import settings
+from app.services.http_clients import SHOPS, http_clients
+from app.services.product_cache import ProductEntry, canonical_url, product_cache, url_key
+from app.services.product_parser import (  # noqa: F401 — parse_product_page и сканер реэкспортируются
+    ProductMetaScanner,
+    parse_page_bytes,
+    parse_product_page,
+    scan_product_page,
+)
+
+logger = logging.getLogger(__name__)
 
 
 # Ограничения запроса
 FETCH_TIMEOUT = 10.0
+# Сколько страницы качать; из скачанного разбирается не больше PRODUCT_PARSE_MAX_BYTES (parse_pool),
+# поэтому поток обрезается по меньшему из двух лимитов
 FETCH_MAX_BYTES = 1_000_000  # 1 MB
+# После конца <head> скачанное разбирается повторно, когда прирастёт хотя бы на столько байт
+FETCH_RECHECK_BYTES = 64 * 1024
 
 # Заголовки как у браузера — многие сайты (Ozon, Wildberries и др.) отдают 403 боту
 BROWSER_HEADERS = {
@@ -30,94 +50,140 @@ def _normalize_url(url: str) -> str:
     return url
 
 
-def _extract_og(soup: BeautifulSoup, base_url: str) -> dict:
-    """Open Graph и Twitter Card."""
-    out: dict = {"title": None, "image_url": None, "price": None}
-    for meta in soup.find_all("meta"):
-        prop = (meta.get("property") or meta.get("name") or "").lower()
-        content = meta.get("content")
-        if not content:
-            continue
-        if prop in ("og:title", "twitter:title") and not out["title"]:
-            out["title"] = content.strip()
-        if prop in ("og:image", "twitter:image", "og:image:secure_url") and not out["image_url"]:
-            out["image_url"] = content.strip()
-        if prop in ("og:price:amount", "product:price:amount") and out["price"] is None:
-            try:
-                out["price"] = Decimal(re.sub(r"[^\d.,]", "", content.replace(",", ".")))
-            except Exception:
-                pass
-    if out["image_url"] and not out["image_url"].startswith("http"):
-        out["image_url"] = urljoin(base_url, out["image_url"])
-    return out
-
-
-def _extract_json_ld(soup: BeautifulSoup, base_url: str) -> dict:
-    """Schema.org Product из JSON-LD."""
-    out: dict = {"title": None, "image_url": None, "price": None}
-    for script in soup.find_all("script", type="application/ld+json"):
+class ProductFetchBlocked(ValueError):
+    """Магазин отказал (401/403/429) — такой ответ кэшируется как отрицательный."""
+
+
+async def fetch_product(url: str) -> dict:
+    """
+    fetch_product_uncached с кэшем по каноническому URL (см. app.services.product_cache).
+    Свежая запись отдаётся без запроса к магазину; устаревшая — тоже сразу, а обновление идёт в фоне.
+    Отказ магазина (ProductFetchBlocked) повторяется из кэша до истечения negative TTL.
+    Одновременные промахи по одному URL ждут одну загрузку (single-flight).
+    """
+    canonical = canonical_url(url)
+    if urlparse(canonical).scheme not in ("http", "https"):
+        raise ValueError("Допустимы только http и https")
+    key = url_key(canonical)
+    entry = await product_cache.get(key)
+    if entry is not None:
+        now = time.time()
+        if not entry.is_fresh(now) and entry.is_servable_stale(now):
+            _refresh_shared(key, canonical)
+        return _entry_result(entry)
+    # shield: отмена одного запроса (клиент ушёл) не отменяет загрузку для остальных ждущих
+    return _entry_result(await asyncio.shield(_refresh_shared(key, canonical)))
+
+
+def _entry_result(entry: ProductEntry) -> dict:
+    if entry.error is not None:
+        raise ProductFetchBlocked(entry.error)
+    return dict(entry.data)
+
+
+async def _refresh(key: str, url: str) -> ProductEntry:
+    """Запрос к магазину и запись результата (или отказа 401/403/429) в кэш; прочие ошибки не кэшируются."""
+    try:
+        entry = product_cache.positive(await fetch_product_uncached(url))
+    except ProductFetchBlocked as e:
+        entry = product_cache.negative(str(e))
+    await product_cache.put(key, url, entry)
+    return entry
+
+
+# Загрузки в полёте по ключу кэша: и промахи, и фоновые обновления stale-записей
+_inflight: dict[str, asyncio.Task] = {}
+fetch_stats = {"started": 0, "coalesced": 0}
+
+
+def _refresh_shared(key: str, url: str) -> asyncio.Task:
+    task = _inflight.get(key)
+    if task is not None:
+        fetch_stats["coalesced"] += 1
+        return task
+    fetch_stats["started"] += 1
+    task = asyncio.create_task(_refresh(key, url))
+    _inflight[key] = task
+    task.add_done_callback(lambda t: _refresh_done(key, url, t))
+    return task
+
+
+def _refresh_done(key: str, url: str, task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Забираем исключение, чтобы фоновое обновление без ждущих не давало "exception was never retrieved"
+    if not task.cancelled() and task.exception() is not None:
+        logger.info("Product fetch failed for %s: %s", url, task.exception())
+
+
+class ScrapeLimiter:
+    """
+    Ограничение одновременных загрузок страниц: не больше per_host на хост и max_total всего.
+    Семафоры привязаны к event loop, поэтому при смене цикла (тесты) создаются заново.
+    """
+
+    def __init__(self, max_total: int, per_host: int) -> None:
+        self.max_total = max_total
+        self.per_host = per_host
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._total: asyncio.Semaphore | None = None
+        self._hosts: dict[str, tuple[asyncio.Semaphore, int]] = {}  # host -> (семафор, пользователей)
+        self.active = 0
+        self.waiting = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host: str):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._total, self._hosts = loop, asyncio.Semaphore(self.max_total), {}
+        host_sem, users = self._hosts.get(host, (None, 0))
+        if host_sem is None:
+            host_sem = asyncio.Semaphore(self.per_host)
+        self._hosts[host] = (host_sem, users + 1)
+        self.waiting += 1
+        acquired = False
         try:
-            data = json.loads(script.string or "{}")
-        except Exception:
-            continue
-        if not isinstance(data, dict):
-            if isinstance(data, list):
-                for item in data:
-                    if isinstance(item, dict) and item.get("@type") == "Product":
-                        data = item
-                        break
-            else:
-                continue
-        if data.get("@type") != "Product":
-            continue
-        if not out["title"] and data.get("name"):
-            out["title"] = str(data["name"]).strip()
-        if not out["image_url"] and data.get("image"):
-            img = data["image"]
-            if isinstance(img, str):
-                out["image_url"] = img.strip()
-            elif isinstance(img, list) and img:
-                out["image_url"] = str(img[0]).strip()
-            if out["image_url"] and not out["image_url"].startswith("http"):
-                out["image_url"] = urljoin(base_url, out["image_url"])
-        if out["price"] is None and "offers" in data:
-            offers = data["offers"]
-            if isinstance(offers, dict) and "price" in offers:
-                try:
-                    out["price"] = Decimal(str(offers["price"]))
-                except Exception:
-                    pass
-            elif isinstance(offers, list) and offers and isinstance(offers[0], dict) and "price" in offers[0]:
+            # Сначала слот хоста, потом общий: ждущие одного хоста не занимают общие слоты
+            async with host_sem, self._total:
+                acquired = True
+                self.waiting -= 1
+                self.active += 1
                 try:
-                    out["price"] = Decimal(str(offers[0]["price"]))
-                except Exception:
-                    pass
-        break
-    return out
+                    yield
+                finally:
+                    self.active -= 1
+        finally:
+            if not acquired:
+                self.waiting -= 1
+            sem, users = self._hosts[host]
+            if users <= 1:
+                del self._hosts[host]
+            else:
+                self._hosts[host] = (sem, users - 1)
 
+    def stats(self) -> dict:
+        return {"active": self.active, "waiting": self.waiting, "hosts": len(self._hosts)}
 
-def _extract_title_tag(soup: BeautifulSoup) -> str | None:
-    title = soup.find("title")
-    if title and title.string:
-        return title.get_text(strip=True)[:500]
-    return None
 
+scrape_limiter = ScrapeLimiter(
+    max_total=settings.product_fetch_max_concurrency,
+    per_host=settings.product_fetch_per_host,
+)
 
-def parse_product_page(html: str, base_url: str) -> dict:
-    """Из HTML страницы извлекает title, image_url, price."""
-    soup = BeautifulSoup(html, "html.parser")
-    og = _extract_og(soup, base_url)
-    ld = _extract_json_ld(soup, base_url)
-    title = og["title"] or ld["title"] or _extract_title_tag(soup)
-    image_url = og["image_url"] or ld["image_url"]
-    price = og["price"] if og["price"] is not None else ld["price"]
-    return {"title": title, "image_url": image_url, "price": price}
 
+def stats() -> dict:
+    return {
+        **fetch_stats,
+        "in_flight": len(_inflight),
+        **scrape_limiter.stats(),
+        "parse_pool": parse_pool.stats(),
+    }
 
-async def fetch_product(url: str) -> dict:
+
+async def fetch_product_uncached(url: str) -> dict:
     """
     Загружает страницу по URL и возвращает dict с ключами title, image_url, price.
-    Только http/https; таймаут и лимит размера ответа ограничены.
+    Только http/https; таймаут и лимит размера ответа ограничены, параллельность — scrape_limiter.
     """
     url = _normalize_url(url)
     parsed = urlparse(url)
@@ -126,27 +192,123 @@ async def fetch_product(url: str) -> dict:
     # Referer с того же хоста иногда снимает 403
     headers = dict(BROWSER_HEADERS)
     headers["Referer"] = f"{parsed.scheme}://{parsed.netloc}/"
-    async with httpx.AsyncClient(
-        follow_redirects=True,
-        timeout=FETCH_TIMEOUT,
-        headers=headers,
-    ) as client:
-        response = await client.get(url)
-        if response.status_code == 403:
-            raise ValueError(
-                "Сайт не разрешает автоматическую загрузку данных (403). "
-                "Введите название, цену и ссылку на картинку вручную или вставьте ссылку на другой магазин."
+    # Не больше N загрузок на хост и M всего: меньше 429 от магазинов и очередь вместо всплеска CPU
+    async with scrape_limiter.slot((parsed.hostname or "").lower()):
+        client = http_clients.get(SHOPS)
+        # Недочитанный ответ при выходе закрывается вместе с соединением — дешевле, чем докачивать страницу
+        async with client.stream(
+            "GET", url, headers=headers, follow_redirects=True, timeout=FETCH_TIMEOUT
+        ) as response:
+            if response.status_code == 403:
+                raise ProductFetchBlocked(
+                    "Сайт не разрешает автоматическую загрузку данных (403). "
+                    "Введите название, цену и ссылку на картинку вручную или вставьте ссылку на другой магазин."
+                )
+            if response.status_code == 401:
+                raise ProductFetchBlocked("Страница доступна только после входа. Введите данные вручную.")
+            if response.status_code == 429:
+                raise ProductFetchBlocked("Слишком много запросов к этому сайту. Попробуйте позже.")
+            response.raise_for_status()
+            content_type = (response.headers.get("content-type") or "").lower()
+            if "text/html" not in content_type and "application/xhtml" not in content_type:
+                raise ValueError("Ответ не является HTML")
+            return await _scan_stream(response, url)
+
+
+# Конец <head> в сырых байтах: с него начинаем разбирать уже скачанное
+_HEAD_END = re.compile(rb"</head|<body", re.IGNORECASE)
+
+
+async def _scan_stream(response: httpx.Response, url: str) -> dict:
+    """
+    Копит тело в один bytearray (без промежуточных bytes/str) до FETCH_MAX_BYTES. Как только
+    пришёл конец <head>, отдаёт накопленное в parse_pool; если метаданные ещё не найдены
+    (например, JSON-LD в теле), повторяет разбор по мере загрузки: буфер должен вырасти вдвое,
+    но не меньше чем на FETCH_RECHECK_BYTES — суммарно разбирается не больше двух объёмов страницы.
+    Нашлось — остаток страницы не качаем.
+    """
+    encoding = response.encoding
+    limit = min(FETCH_MAX_BYTES, parse_pool.max_bytes)
+    buf = bytearray()
+    next_check: int | None = None  # размер буфера для следующего разбора; None — <head> ещё не закрыт
+    result, checked = None, -1
+    async for chunk in response.aiter_bytes():
+        scanned_from = max(len(buf) - 6, 0)  # "</head" мог разрезаться между кусками
+        buf += chunk[: limit - len(buf)]
+        if next_check is None and _HEAD_END.search(buf, scanned_from):
+            next_check = len(buf)
+        if next_check is not None and len(buf) >= next_check:
+            result, done = await parse_pool.parse(buf, encoding, url)
+            if done:
+                return result
+            checked = len(buf)
+            next_check = max(checked * 2, checked + FETCH_RECHECK_BYTES)
+        if len(buf) >= limit:
+            break
+    if checked != len(buf):
+        result, _ = await parse_pool.parse(buf, encoding, url)
+    return result
+
+
+class ParsePool:
+    """
+    Разбор страниц в пуле процессов, чтобы CPU-работа не останавливала event loop.
+    workers=0 — разбор прямо в цикле (тесты, отладка). Лимиты на задание: max_bytes и
+    time_limit проверяются внутри parse_page_bytes. Байты передаются как есть и
+    сериализуются один раз при отправке в процесс; декодирование — уже в воркере.
+    """
+
+    def __init__(self, workers: int, max_bytes: int, time_limit: float) -> None:
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.time_limit = time_limit
+        self._executor: ProcessPoolExecutor | None = None
+        self.jobs = 0
+        self.in_flight = 0
+        self.broken = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: воркеры не наследуют потоки и соединения родителя (fork с потоками небезопасен)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
             )
-        if response.status_code == 401:
-            raise ValueError("Страница доступна только после входа. Введите данные вручную.")
-        if response.status_code == 429:
-            raise ValueError("Слишком много запросов к этому сайту. Попробуйте позже.")
-        response.raise_for_status()
-        content_type = (response.headers.get("content-type") or "").lower()
-        if "text/html" not in content_type and "application/xhtml" not in content_type:
-            raise ValueError("Ответ не является HTML")
-        body = response.content
-        if len(body) > FETCH_MAX_BYTES:
-            body = body[:FETCH_MAX_BYTES]
-        text = body.decode(response.encoding or "utf-8", errors="replace")
-    return parse_product_page(text, url)
+        return self._executor
+
+    async def parse(self, data: bytes | bytearray, encoding: str | None, url: str) -> tuple[dict, bool]:
+        self.jobs += 1
+        args = (data, encoding, url, self.max_bytes, self.time_limit)
+        if self.workers <= 0:
+            return parse_page_bytes(*args)
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), parse_page_bytes, *args)
+        except BrokenProcessPool:
+            # Воркер упал (OOM и т.п.) — пул пересоздастся при следующем задании
+            self.broken += 1
+            self._executor = None
+            raise ValueError("Не удалось разобрать страницу. Попробуйте ещё раз.")
+        finally:
+            self.in_flight -= 1
+
+    def start(self) -> None:
+        """Поднять процессы заранее, чтобы первый запрос не ждал spawn и импорт модулей."""
+        if self.workers > 0:
+            pool = self._pool()
+            for _ in range(self.workers):
+                pool.submit(int)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "jobs": self.jobs, "in_flight": self.in_flight, "broken": self.broken}
+
+
+parse_pool = ParsePool(
+    workers=settings.product_parse_workers,
+    max_bytes=settings.product_parse_max_bytes,
+    time_limit=settings.product_parse_timeout_seconds,
+)
@@ -0,0 +1,91 @@
+"""
+Общие httpx-клиенты на время жизни приложения: keep-alive и переиспользование TCP/TLS
+к Google OAuth, Resend и магазинам вместо нового AsyncClient на каждый запрос.
+"""
+import importlib.util
+import logging
+import ssl
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 — только если установлен пакет h2 (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+GOOGLE = "google"
+RESEND = "resend"
+SHOPS = "shops"
+
+
+def _service_options() -> dict[str, dict]:
+    """Параметры клиента по сервису. Google и Resend — по одному хосту, так что лимит пула = лимит на хост."""
+    expiry = settings.http_keepalive_expiry_seconds
+    return {
+        GOOGLE: {
+            "limits": httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=expiry),
+            "timeout": httpx.Timeout(10.0),
+        },
+        RESEND: {
+            "limits": httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=expiry),
+            "timeout": httpx.Timeout(10.0),
+        },
+        SHOPS: {
+            "limits": httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=expiry,
+            ),
+            "timeout": httpx.Timeout(10.0),
+            "cookies": _discarding_cookies(),
+        },
+    }
+
+
+def _discarding_cookies() -> CookieJar:
+    """
+    Банка, которая не принимает ни одной cookie: клиент магазинов общий для всех пользователей,
+    и cookie одного магазина не должны копиться и уходить в чужие запросы.
+    """
+    # Именно CookieJar: httpx.Cookies при передаче в клиент копируется в новую банку без политики
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+class HttpClientRegistry:
+    """Клиенты создаются лениво при первом обращении и закрываются в lifespan."""
+
+    def __init__(self, verify: ssl.SSLContext | bool = True) -> None:
+        # verify — SSL-контекст для всех клиентов (например, свой CA в бенчмарке); по умолчанию certifi
+        self.verify = verify
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get(self, service: str) -> httpx.AsyncClient:
+        client = self._clients.get(service)
+        if client is None or client.is_closed:
+            options = _service_options()[service]
+            client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                verify=self.verify,
+                limits=options["limits"],
+                timeout=options["timeout"],
+                cookies=options.get("cookies"),
+            )
+            self._clients[service] = client
+        return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for service, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception:  # закрытие не должно мешать остановке приложения
+                logger.exception("Failed to close http client %s", service)
+
+    def stats(self) -> dict:
+        return {"http2": HTTP2_AVAILABLE, "open": sorted(s for s, c in self._clients.items() if not c.is_closed)}
+
+
+http_clients = HttpClientRegistry()
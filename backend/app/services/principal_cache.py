@@ -0,0 +1,143 @@
+"""Кэш проверенных JWT: sha256 токена -> снимок пользователя, чтобы не ходить в users на каждый запрос."""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+_CHANGED_USERS = "changed_user_ids"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Лёгкий снимок пользователя для авторизованных запросов (без ORM-объекта и сессии)."""
+
+    id: int
+    email: str
+    created_at: datetime
+    avatar_url: str | None = None
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class PrincipalCache:
+    """
+    LRU с коротким TTL. Запись живёт не дольше exp токена.
+
+    Версионирование как в PublicWishlistCache: version() берётся до загрузки пользователя из БД,
+    и put() отбрасывает снимок, если пользователя инвалидировали после этого (update_me, аватар,
+    сброс пароля). Между воркерами инвалидация не рассылается — устаревание ограничено TTL.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 30.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()
+        # user_id -> digest'ы его токенов в кэше, для инвалидации по пользователю
+        self._by_user: dict[int, set[str]] = {}
+        self._invalidated: OrderedDict[int, int] = OrderedDict()
+        self._floor = 0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def version(self) -> int:
+        return self._generation
+
+    def get(self, token: str) -> Principal | None:
+        digest = token_digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        principal, expires_at = entry
+        if expires_at < time.time():
+            self._drop(digest)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return principal
+
+    def put(self, token: str, version: int, principal: Principal, token_exp: float | None = None) -> bool:
+        if self._invalidated.get(principal.id, self._floor) > version:
+            return False
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        digest = token_digest(token)
+        self._entries[digest] = (principal, expires_at)
+        self._entries.move_to_end(digest)
+        self._by_user.setdefault(principal.id, set()).add(digest)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+        return True
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._generation += 1
+        for digest in self._by_user.pop(user_id, ()):
+            self._entries.pop(digest, None)
+        self._invalidated[user_id] = self._generation
+        self._invalidated.move_to_end(user_id)
+        self.invalidations += 1
+        while len(self._invalidated) > self.max_entries:
+            _, generation = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, generation)
+
+    def _drop(self, digest: str) -> None:
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        digests = self._by_user.get(entry[0].id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._by_user[entry[0].id]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.principal_cache_max_entries,
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+)
+
+
+def mark_user_changed(db: AsyncSession, user_id: int) -> None:
+    """
+    Сбросить кэш пользователя сразу и ещё раз после commit сессии: снимок, прочитанный
+    конкурентным запросом до commit, иначе мог бы вернуться в кэш на TTL.
+    """
+    principal_cache.invalidate_user(user_id)
+    db.info.setdefault(_CHANGED_USERS, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop(_CHANGED_USERS, None)
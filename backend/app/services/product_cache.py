@@ -0,0 +1,193 @@
+"""
+Двухуровневый кэш метаданных товара для fetch-product: LRU в памяти процесса + таблица product_cache.
+Ключ — sha256 канонического URL (схема/хост в нижнем регистре, без фрагмента и трекинговых меток).
+"""
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.config import settings
+from app.db.session import async_session, engine
+from app.models import ProductCache
+
+logger = logging.getLogger(__name__)
+
+# Метки рекламы и аналитики — на содержимое страницы не влияют
+TRACKING_PARAMS = frozenset({
+    "gclid", "dclid", "fbclid", "yclid", "ysclid", "msclkid", "igshid",
+    "_openstat", "mc_cid", "mc_eid", "spm", "ref", "ref_src",
+})
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """Канонический вид URL для ключа кэша; сами параметры товара (id, вариант) сохраняются."""
+    url = url.strip()
+    if not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def url_key(canonical: str) -> str:
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class ProductEntry:
+    """Результат разбора (data) или сообщение об отказе магазина (error); время — epoch-секунды."""
+
+    data: dict | None
+    error: str | None
+    fresh_until: float
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def is_servable_stale(self, now: float) -> bool:
+        return self.error is None and now < self.stale_until
+
+
+def _to_naive_utc(ts: float) -> datetime:
+    # Колонки TIMESTAMP WITHOUT TIME ZONE — как в остальных моделях, naive UTC
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+
+def _to_ts(dt: datetime) -> float:
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class ProductMetadataCache:
+    """
+    Чтение: память, затем БД (найденное в БД поднимается в память). Запись — в оба уровня.
+    Ошибки БД не ломают fetch-product: кэш просто работает как промах.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: float = 24 * 3600,
+        stale_seconds: float = 7 * 24 * 3600,
+        negative_ttl_seconds: float = 600,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._memory: OrderedDict[str, ProductEntry] = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def positive(self, data: dict, now: float | None = None) -> ProductEntry:
+        now = time.time() if now is None else now
+        return ProductEntry(data, None, now + self.ttl_seconds, now + self.ttl_seconds + self.stale_seconds)
+
+    def negative(self, error: str, now: float | None = None) -> ProductEntry:
+        now = time.time() if now is None else now
+        return ProductEntry(None, error, now + self.negative_ttl_seconds, now + self.negative_ttl_seconds)
+
+    async def get(self, key: str) -> ProductEntry | None:
+        """Запись из памяти или БД, если она ещё пригодна (свежая или в окне stale)."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if now < entry.stale_until:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+            del self._memory[key]
+        entry = await self._load(key)
+        if entry is not None and now < entry.stale_until:
+            self._remember(key, entry)
+            self.db_hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, url: str, entry: ProductEntry) -> None:
+        self._remember(key, entry)
+        data = entry.data or {}
+        title = data.get("title")
+        image_url = data.get("image_url")
+        values = {
+            "url_hash": key,
+            "url": url,
+            # По длине колонок: в Postgres длиннее — ошибка upsert, и запись осталась бы только в памяти
+            "title": title[:500] if title else None,
+            "image_url": image_url[:2048] if image_url else None,
+            "price": data.get("price"),
+            "error": entry.error,
+            "fetched_at": datetime.utcnow(),
+            "fresh_until": _to_naive_utc(entry.fresh_until),
+            "stale_until": _to_naive_utc(entry.stale_until),
+        }
+        insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(ProductCache).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProductCache.url_hash],
+            set_={k: stmt.excluded[k] for k in values if k != "url_hash"},
+        )
+        try:
+            async with async_session() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception:  # БД недоступна — остаётся кэш в памяти
+            logger.warning("product_cache: failed to store %s", url, exc_info=True)
+
+    async def _load(self, key: str) -> ProductEntry | None:
+        try:
+            async with async_session() as db:
+                row = await db.get(ProductCache, key)
+        except Exception:
+            logger.warning("product_cache: failed to load %s", key, exc_info=True)
+            return None
+        if row is None:
+            return None
+        data = None
+        if row.error is None:
+            data = {"title": row.title, "image_url": row.image_url, "price": row.price}
+        return ProductEntry(data, row.error, _to_ts(row.fresh_until), _to_ts(row.stale_until))
+
+    def _remember(self, key: str, entry: ProductEntry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._memory),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
+
+
+product_cache = ProductMetadataCache(
+    max_entries=settings.product_cache_max_entries,
+    ttl_seconds=settings.product_cache_ttl_seconds,
+    stale_seconds=settings.product_cache_stale_seconds,
+    negative_ttl_seconds=settings.product_cache_negative_ttl_seconds,
+)
@@ -0,0 +1,220 @@
+"""
+Разбор метаданных товара из HTML (Open Graph, Twitter Card, schema.org JSON-LD).
+Модуль без зависимостей от приложения: его импортируют процессы пула разбора (см. ParsePool).
+"""
+import codecs
+import json
+import re
+import time
+from decimal import Decimal
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+
+def _empty() -> dict:
+    return {"title": None, "image_url": None, "price": None}
+
+
+def _apply_meta(out: dict, prop: str, content: str | None) -> None:
+    """Один <meta> Open Graph / Twitter Card; первое найденное значение поля побеждает."""
+    if not content:
+        return
+    if prop in ("og:title", "twitter:title") and not out["title"]:
+        out["title"] = content.strip()
+    if prop in ("og:image", "twitter:image", "og:image:secure_url") and not out["image_url"]:
+        out["image_url"] = content.strip()
+    if prop in ("og:price:amount", "product:price:amount") and out["price"] is None:
+        try:
+            out["price"] = Decimal(re.sub(r"[^\d.,]", "", content.replace(",", ".")))
+        except Exception:
+            pass
+
+
+def _absolute_image(out: dict, base_url: str) -> None:
+    if out["image_url"] and not out["image_url"].startswith("http"):
+        out["image_url"] = urljoin(base_url, out["image_url"])
+
+
+def _json_ld_product(raw: str | None) -> dict | None:
+    """Объект schema.org Product из текста JSON-LD-скрипта (сам объект или элемент массива)."""
+    try:
+        data = json.loads(raw or "{}")
+    except Exception:
+        return None
+    if isinstance(data, list):
+        data = next((i for i in data if isinstance(i, dict) and i.get("@type") == "Product"), None)
+    if not isinstance(data, dict) or data.get("@type") != "Product":
+        return None
+    return data
+
+
+def _apply_json_ld_product(out: dict, data: dict, base_url: str) -> None:
+    if not out["title"] and data.get("name"):
+        out["title"] = str(data["name"]).strip()
+    if not out["image_url"] and data.get("image"):
+        img = data["image"]
+        if isinstance(img, str):
+            out["image_url"] = img.strip()
+        elif isinstance(img, list) and img:
+            out["image_url"] = str(img[0]).strip()
+        _absolute_image(out, base_url)
+    if out["price"] is None and "offers" in data:
+        offers = data["offers"]
+        if isinstance(offers, dict) and "price" in offers:
+            try:
+                out["price"] = Decimal(str(offers["price"]))
+            except Exception:
+                pass
+        elif isinstance(offers, list) and offers and isinstance(offers[0], dict) and "price" in offers[0]:
+            try:
+                out["price"] = Decimal(str(offers[0]["price"]))
+            except Exception:
+                pass
+
+
+def _merge(og: dict, ld: dict, title_tag: str | None) -> dict:
+    """Приоритет: Open Graph, затем JSON-LD, для названия — ещё и <title>."""
+    return {
+        "title": og["title"] or ld["title"] or title_tag,
+        "image_url": og["image_url"] or ld["image_url"],
+        "price": og["price"] if og["price"] is not None else ld["price"],
+    }
+
+
+def _extract_og(soup: BeautifulSoup, base_url: str) -> dict:
+    """Open Graph и Twitter Card."""
+    out = _empty()
+    for meta in soup.find_all("meta"):
+        _apply_meta(out, (meta.get("property") or meta.get("name") or "").lower(), meta.get("content"))
+    _absolute_image(out, base_url)
+    return out
+
+
+def _extract_json_ld(soup: BeautifulSoup, base_url: str) -> dict:
+    """Schema.org Product из JSON-LD (первый найденный)."""
+    out = _empty()
+    for script in soup.find_all("script", type="application/ld+json"):
+        data = _json_ld_product(script.string)
+        if data is not None:
+            _apply_json_ld_product(out, data, base_url)
+            break
+    return out
+
+
+def _extract_title_tag(soup: BeautifulSoup) -> str | None:
+    title = soup.find("title")
+    if title and title.string:
+        return title.get_text(strip=True)[:500]
+    return None
+
+
+def parse_product_page(html: str, base_url: str) -> dict:
+    """Из HTML страницы извлекает title, image_url, price (полное DOM-дерево BeautifulSoup)."""
+    soup = BeautifulSoup(html, "html.parser")
+    return _merge(_extract_og(soup, base_url), _extract_json_ld(soup, base_url), _extract_title_tag(soup))
+
+
+class ProductMetaScanner(HTMLParser):
+    """
+    Потоковый разбор тех же метаданных, что и parse_product_page, без DOM: feed() по кускам,
+    done — дальше читать страницу незачем. Это так, когда Open Graph дал все три поля
+    (у него приоритет), или когда <head> закрыт и найден JSON-LD Product.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.og = _empty()
+        self.ld = _empty()
+        self.title: str | None = None
+        self.head_closed = False
+        self.product_found = False
+        self._in_title = False
+        self._title_parts: list[str] = []
+        self._ld_parts: list[str] | None = None  # текст текущего <script type="application/ld+json">
+
+    @property
+    def done(self) -> bool:
+        og_complete = bool(self.og["title"] and self.og["image_url"]) and self.og["price"] is not None
+        return og_complete or (self.head_closed and self.product_found)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag == "meta":
+            a = dict(attrs)
+            _apply_meta(self.og, (a.get("property") or a.get("name") or "").lower(), a.get("content"))
+        elif tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "script" and not self.product_found and dict(attrs).get("type") == "application/ld+json":
+            self._ld_parts = []
+        elif tag == "body":
+            self.head_closed = True
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = "".join(self._title_parts).strip()[:500] or None
+        elif tag == "script" and self._ld_parts is not None:
+            data = _json_ld_product("".join(self._ld_parts))
+            self._ld_parts = None
+            if data is not None:
+                _apply_json_ld_product(self.ld, data, self.base_url)
+                self.product_found = True
+        elif tag == "head":
+            self.head_closed = True
+
+    def handle_data(self, data: str) -> None:
+        if self._ld_parts is not None:
+            self._ld_parts.append(data)
+        elif self._in_title:
+            self._title_parts.append(data)
+
+    def result(self) -> dict:
+        _absolute_image(self.og, self.base_url)
+        return _merge(self.og, self.ld, self.title)
+
+
+def scan_product_page(html: str, base_url: str, chunk_size: int = 16_384) -> dict:
+    """Как parse_product_page, но потоково по кускам строки с ранней остановкой."""
+    scanner = ProductMetaScanner(base_url)
+    for start in range(0, len(html), chunk_size):
+        scanner.feed(html[start:start + chunk_size])
+        if scanner.done:
+            break
+    return scanner.result()
+
+
+def parse_page_bytes(
+    data: bytes | bytearray,
+    encoding: str | None,
+    base_url: str,
+    max_bytes: int,
+    time_limit: float,
+    chunk_size: int = 65_536,
+) -> tuple[dict, bool]:
+    """
+    Задание для процесса пула: декодирует сырые байты страницы и прогоняет их через сканер.
+    Читает не больше max_bytes и не дольше time_limit секунд (проверка между кусками) —
+    при превышении возвращает то, что успел найти. Второй элемент — scanner.done.
+    """
+    deadline = time.monotonic() + time_limit
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    scanner = ProductMetaScanner(base_url)
+    # memoryview — куски без копий; with освобождает буфер, чтобы вызывающий мог дописывать bytearray
+    with memoryview(data) as view:
+        end = min(len(view), max_bytes)
+        for start in range(0, end, chunk_size):
+            scanner.feed(decoder.decode(view[start:min(start + chunk_size, end)]))
+            if scanner.done or time.monotonic() > deadline:
+                break
+        else:
+            scanner.feed(decoder.decode(b"", final=True))
+    scanner.close()
+    return scanner.result(), scanner.done
@@ -0,0 +1,184 @@
+"""
+Шина «список изменился» между процессами (uvicorn --workers N).
+
+Изменение, закоммиченное в одном воркере, публикуется один раз; остальные воркеры получают
+slug и сбрасывают свой кэш снимка и рассылают обновление своим WebSocket-подписчикам.
+Локальная обработка делается сразу после commit (services.wishlist), шина доставляет только
+в другие процессы.
+"""
+import asyncio
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastBus(ABC):
+    """Базовая шина: подписка обработчиков и доставка slug."""
+
+    def __init__(self) -> None:
+        self._handlers: list[Callable[[str], None]] = []
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, handler: Callable[[str], None]) -> None:
+        self._handlers.append(handler)
+
+    @abstractmethod
+    def publish_nowait(self, slug: str) -> None:
+        """Опубликовать изменение slug для других процессов. Не блокирует (вызывается из after_commit)."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def _deliver(self, slug: str) -> None:
+        self.received += 1
+        for handler in self._handlers:
+            try:
+                handler(slug)
+            except Exception:  # обработчик одного подписчика не должен ломать доставку остальным
+                logger.exception("Broadcast bus handler failed for %s", slug)
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "published": self.published, "received": self.received}
+
+
+class InMemoryBus(BroadcastBus):
+    """
+    Шина внутри процесса. Экземпляры с общим hub ведут себя как разные воркеры:
+    публикация одного доставляется всем остальным. Для тестов и запуска в один воркер.
+    """
+
+    def __init__(self, hub: list["InMemoryBus"] | None = None) -> None:
+        super().__init__()
+        self.hub = hub if hub is not None else []
+        self.hub.append(self)
+
+    def publish_nowait(self, slug: str) -> None:
+        self.published += 1
+        for bus in self.hub:
+            if bus is not self:
+                bus._deliver(slug)
+
+
+class PostgresNotifyBus(BroadcastBus):
+    """
+    LISTEN/NOTIFY через asyncpg. Одно выделенное соединение на процесс и слушает канал, и отправляет
+    NOTIFY из очереди; свои уведомления отфильтровываются по origin. LISTEN не работает через PgBouncer
+    в режиме transaction, поэтому соединение берётся из direct_engine() (DATABASE_DIRECT_URL).
+    Обрыв замечается сразу (termination listener) или проверкой SELECT 1 после liveness_interval
+    тишины — даже воркер, который только слушает, переподключится. Уведомления, не отправленные
+    за время обрыва, теряются — чтения защищены ревизией (ETag, кэш), а WS-клиенты получат
+    следующее изменение.
+    """
+
+    CHANNEL = "wishlist_changes"
+
+    def __init__(self, reconnect_delay: float = 1.0, liveness_interval: float = 30.0) -> None:
+        super().__init__()
+        self.origin = uuid.uuid4().hex[:12]
+        self.reconnect_delay = reconnect_delay
+        self.liveness_interval = liveness_interval
+        self._outbox: asyncio.Queue[str] = asyncio.Queue(maxsize=10_000)
+        self._task: asyncio.Task | None = None
+        self._engine = None
+        self.dropped = 0
+        self.reconnects = 0
+
+    def publish_nowait(self, slug: str) -> None:
+        try:
+            self._outbox.put_nowait(slug)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def start(self) -> None:
+        from app.db.session import direct_engine
+
+        if self._task is None:
+            # За PgBouncer без DATABASE_DIRECT_URL — RuntimeError: старт падает, а не молча теряет рассылки
+            self._engine = direct_engine()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        from app.db.session import engine
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._engine is not None and self._engine is not engine:
+            await self._engine.dispose()
+        self._engine = None
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        origin, _, slug = payload.partition(":")
+        if origin != self.origin and slug:
+            self._deliver(slug)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self._engine.connect() as conn:
+                    await self._serve((await conn.get_raw_connection()).driver_connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # обрыв соединения / БД недоступна — переподключаемся
+                self.reconnects += 1
+                logger.exception("Wishlist change bus connection lost, reconnecting")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _serve(self, raw) -> None:
+        """Слушать канал и отправлять NOTIFY из очереди, пока соединение живо; обрыв — исключение."""
+        lost = asyncio.Event()
+        raw.add_termination_listener(lambda _connection: lost.set())
+        await raw.add_listener(self.CHANNEL, self._on_notify)
+        logger.info("Listening for wishlist changes on %s", self.CHANNEL)
+        while True:
+            slug = await self._next_slug(lost)
+            if slug is None:
+                await raw.execute("SELECT 1")  # тишина: проверяем, что соединение (и LISTEN) живо
+                continue
+            await raw.execute("SELECT pg_notify($1, $2)", self.CHANNEL, f"{self.origin}:{slug}")
+            self.published += 1
+
+    async def _next_slug(self, lost: asyncio.Event) -> str | None:
+        """Следующий slug из очереди; None — liveness_interval без публикаций; ConnectionError — обрыв."""
+        get = asyncio.ensure_future(self._outbox.get())
+        closed = asyncio.ensure_future(lost.wait())
+        try:
+            await asyncio.wait({get, closed}, timeout=self.liveness_interval, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not get.done():
+                get.cancel()
+        if get.done() and not get.cancelled():
+            return get.result()  # уже взятый из очереди slug не теряем, даже если соединение оборвалось
+        if lost.is_set():
+            raise ConnectionError("LISTEN connection closed")
+        return None
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "pending": self._outbox.qsize(),
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
+
+
+def create_bus(backend: str) -> BroadcastBus:
+    if backend == "postgres":
+        return PostgresNotifyBus()
+    if backend == "memory":
+        return InMemoryBus()
+    raise ValueError(f"Unknown BROADCAST_BACKEND: {backend}")
+
+
+event_bus = create_bus(settings.broadcast_backend)
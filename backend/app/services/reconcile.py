@@ -0,0 +1,58 @@
+"""
+Сверка денормализованных итогов вкладов (wishlist_items.total_contributed /
+contributions_count) с таблицей contributions.
+
+Запуск из backend/:
+    python -m app.services.reconcile
+"""
+import asyncio
+import logging
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Contribution, WishlistItem
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile_item_totals(db: AsyncSession, item_ids: list[int] | None = None) -> int:
+    """
+    Пересчитывает итоги по contributions и исправляет расхождения.
+    item_ids — ограничить проверку товарами; None — все товары. Возвращает число исправленных строк.
+    """
+    total = (
+        select(func.coalesce(func.sum(Contribution.amount), 0))
+        .where(Contribution.wishlist_item_id == WishlistItem.id)
+        .scalar_subquery()
+    )
+    count = (
+        select(func.count(Contribution.id))
+        .where(Contribution.wishlist_item_id == WishlistItem.id)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(WishlistItem)
+        .where(or_(WishlistItem.total_contributed != total, WishlistItem.contributions_count != count))
+        .values(total_contributed=total, contributions_count=count)
+        .execution_options(synchronize_session=False)
+    )
+    if item_ids is not None:
+        stmt = stmt.where(WishlistItem.id.in_(item_ids))
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+async def main() -> None:
+    from app.db.session import async_session, engine
+
+    async with async_session() as db:
+        fixed = await reconcile_item_totals(db)
+        await db.commit()
+    await engine.dispose()
+    logger.info("Reconciled contribution totals: %s item(s) fixed", fixed)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,43 +1,347 @@
 import asyncio
+import hashlib
 import json
+import logging
+import time
 from collections import defaultdict
+from collections.abc import Awaitable, Callable
 
 from fastapi import WebSocket
 
+from app.core.config import settings
+from app.services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+def _slug_key(slug: str) -> str:
+    """Ключ списка в метриках: slug — ссылка доступа к списку, поэтому вместо него короткий хэш."""
+    return hashlib.sha256(slug.encode()).hexdigest()[:12]
+
+
+def diff_snapshots(old: dict, new: dict) -> dict:
+    """
+    Дельта между двумя публичными снимками: изменённые поля списка, upsert товаров
+    (новые и изменённые целиком) и id удалённых товаров.
+    """
+    old_items = {i["id"]: i for i in old.get("items", [])}
+    new_items = {i["id"]: i for i in new.get("items", [])}
+    return {
+        "fields": {k: v for k, v in new.items() if k != "items" and old.get(k) != v},
+        "upserts": [i for item_id, i in new_items.items() if old_items.get(item_id) != i],
+        "deletes": [item_id for item_id in old_items if item_id not in new_items],
+    }
+
+
+_PING = json.dumps({"type": "ping"})
+
+
+class _Subscriber:
+    """Подписчик: своя ограниченная очередь исходящих сообщений и задача-писатель."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int) -> None:
+        self.websocket = websocket
+        self.queue: asyncio.Queue[tuple[str, float]] = asyncio.Queue(maxsize=queue_size)
+        # Очередь переполнялась и заменена снимком, который ещё не доставлен
+        self.downgraded = False
+        self.writer: asyncio.Task | None = None
+
 
 class ConnectionManager:
-    """Управляет WebSocket-подключениями по slug вишлиста."""
+    """
+    Управляет WebSocket-подключениями по slug вишлиста.
+
+    Протокол: при подключении (и по запросу клиента {"type": "resync"}) отправляется
+    {"type": "snapshot", "seq", "data"}; дальше — {"type": "patch", "seq", "fields", "upserts",
+    "deletes"} относительно предыдущего снимка. seq растёт на 1 на каждый patch: пропуск seq
+    означает потерю сообщения, клиент запрашивает resync.
+
+    Рассылка: сообщение сериализуется один раз и кладётся в очереди подписчиков, отправляют
+    их задачи-писатели параллельно — медленный клиент не задерживает остальных. Переполненная
+    очередь заменяется одним снимком (downgrade); если не успел и его — клиент отключается.
+
+    Лимиты: не больше max_per_slug подключений на slug и max_total на процесс.
+    """
 
-    def __init__(self) -> None:
-        self._connections: dict[str, set[WebSocket]] = defaultdict(set)
+    def __init__(
+        self,
+        queue_size: int = 32,
+        send_timeout: float = 10.0,
+        max_per_slug: int = 500,
+        max_total: int = 10_000,
+    ) -> None:
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.max_per_slug = max_per_slug
+        self.max_total = max_total
+        self._total = 0
+        self._connections: dict[str, dict[WebSocket, _Subscriber]] = defaultdict(dict)
+        # slug -> (seq, последний отправленный снимок); живёт, пока есть подписчики
+        self._state: dict[str, tuple[int, dict]] = {}
+        self._loader: Callable[[str], Awaitable[dict | None]] | None = None
+        # slug -> [lock, число ждущих refresh]: загрузка и рассылка снимка одного slug — по очереди
+        self._refreshing: dict[str, list] = {}
         self._lock = asyncio.Lock()
+        # Время от постановки в очередь до завершения send_text, по slug и суммарно
+        self._latency: dict[str, Histogram] = {}
+        self._latency_total = Histogram()
+        self._closing: set[asyncio.Task] = set()
+        self.downgrades = 0
+        self.evictions = 0
+        self.rejected = 0
 
-    async def connect(self, websocket: WebSocket, slug: str) -> None:
+    def set_loader(self, loader: Callable[[str], Awaitable[dict | None]]) -> None:
+        """Функция загрузки публичного снимка по slug (регистрирует services.wishlist)."""
+        self._loader = loader
+
+    async def connect(self, websocket: WebSocket, slug: str) -> bool:
+        """Принять подключение. False — лимит исчерпан, сокет закрыт с кодом 1013."""
         await websocket.accept()
         async with self._lock:
-            self._connections[slug].add(websocket)
+            over_limit = (
+                self._total >= self.max_total
+                or len(self._connections.get(slug, ())) >= self.max_per_slug
+            )
+            if not over_limit:
+                subscriber = _Subscriber(websocket, self.queue_size)
+                subscriber.writer = asyncio.create_task(self._write(slug, subscriber))
+                self._connections[slug][websocket] = subscriber
+                self._total += 1
+        if over_limit:
+            self.rejected += 1
+            await self._close(websocket, reason="Too many connections")
+            return False
+        return True
 
     async def disconnect(self, websocket: WebSocket, slug: str) -> None:
         async with self._lock:
-            self._connections[slug].discard(websocket)
-            if not self._connections[slug]:
-                del self._connections[slug]
+            subscriber = self._remove(websocket, slug)
+        if subscriber and subscriber.writer and subscriber.writer is not asyncio.current_task():
+            subscriber.writer.cancel()
+
+    def _remove(self, websocket: WebSocket, slug: str) -> _Subscriber | None:
+        """Убрать подписчика; вызывается под self._lock."""
+        subscribers = self._connections.get(slug)
+        if subscribers is None:
+            return None
+        subscriber = subscribers.pop(websocket, None)
+        if subscriber is not None:
+            self._total -= 1
+        if not subscribers:
+            del self._connections[slug]
+            self._state.pop(slug, None)
+            self._latency.pop(slug, None)
+        return subscriber
 
-    async def broadcast_wishlist(self, slug: str, data: dict) -> None:
-        """Отправить обновлённый вишлист всем подключённым по slug."""
+    def has_subscribers(self, slug: str) -> bool:
+        return bool(self._connections.get(slug))
+
+    async def ping(self, websocket: WebSocket, slug: str) -> None:
+        """Heartbeat: ping через очередь подписчика (не обгоняет снимки и патчи)."""
         async with self._lock:
-            connections = list(self._connections.get(slug, []))
-        msg = json.dumps(data, default=str)
-        disconnected = []
-        for ws in connections:
-            try:
-                await ws.send_text(msg)
-            except (OSError, ConnectionError, RuntimeError):
-                disconnected.append(ws)
-        if disconnected:
+            subscriber = self._connections.get(slug, {}).get(websocket)
+            if subscriber is not None:
+                self._enqueue(slug, subscriber, _PING)
+
+    async def send_snapshot(self, websocket: WebSocket, slug: str) -> None:
+        """Полный снимок одному подписчику: при подключении и после пропуска seq."""
+        state = self._state.get(slug)
+        if state is None:
+            if self._loader is None:
+                return
+            data = await self._loader(slug)
+            if data is None:
+                return
             async with self._lock:
-                for ws in disconnected:
-                    self._connections[slug].discard(ws)
+                # Параллельная рассылка могла уже сохранить более свежее состояние
+                state = self._state.setdefault(slug, (0, data))
+        async with self._lock:
+            subscriber = self._connections.get(slug, {}).get(websocket)
+            if subscriber is not None:
+                self._enqueue(slug, subscriber, self._snapshot_message(state))
+
+    async def refresh(self, slug: str) -> bool:
+        """Загрузить актуальный снимок и разослать дельту подписчикам. True — что-то отправлено."""
+        if self._loader is None or not self.has_subscribers(slug):
+            return False
+        # Параллельные загрузки одного slug могли бы завершиться не по порядку: более старый снимок,
+        # разосланный последним, откатил бы подписчиков назад до следующего изменения
+        entry = self._refreshing.setdefault(slug, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                data = await self._loader(slug)
+                if data is None:
+                    return False
+                return await self.broadcast_wishlist(slug, data)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._refreshing[slug]
+
+    async def broadcast_wishlist(self, slug: str, data: dict) -> bool:
+        """Отправить изменения вишлиста всем подключённым по slug (patch к прошлому снимку)."""
+        async with self._lock:
+            subscribers = list(self._connections.get(slug, {}).values())
+            if not subscribers:
+                return False
+            seq, previous = self._state.get(slug, (0, None))
+            if previous is None:
+                message = {"type": "snapshot", "seq": seq + 1, "data": data}
+            else:
+                delta = diff_snapshots(previous, data)
+                if not any(delta.values()):
+                    return False
+                message = {"type": "patch", "seq": seq + 1, **delta}
+            self._state[slug] = (seq + 1, data)
+            msg = json.dumps(message, default=str)
+            for subscriber in subscribers:
+                self._enqueue(slug, subscriber, msg)
+        return True
+
+    @staticmethod
+    def _snapshot_message(state: tuple[int, dict]) -> str:
+        seq, data = state
+        return json.dumps({"type": "snapshot", "seq": seq, "data": data}, default=str)
+
+    def _enqueue(self, slug: str, subscriber: _Subscriber, msg: str) -> None:
+        """Положить сообщение в очередь подписчика; вызывается под self._lock."""
+        try:
+            subscriber.queue.put_nowait((msg, time.perf_counter()))
+            return
+        except asyncio.QueueFull:
+            pass
+        if subscriber.downgraded:
+            # Не успел забрать даже снимок — отключаем, клиент переподключится
+            self.evictions += 1
+            self._remove(subscriber.websocket, slug)
+            if subscriber.writer:
+                subscriber.writer.cancel()
+            task = asyncio.create_task(self._close(subscriber.websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+            return
+        # Очередь патчей бесполезна: заменяем её одним актуальным снимком
+        self.downgrades += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.downgraded = True
+        subscriber.queue.put_nowait((self._snapshot_message(self._state[slug]), time.perf_counter()))
+
+    async def _write(self, slug: str, subscriber: _Subscriber) -> None:
+        """Задача-писатель подписчика: отправляет сообщения из очереди по одному."""
+        while True:
+            msg, enqueued_at = await subscriber.queue.get()
+            try:
+                await asyncio.wait_for(subscriber.websocket.send_text(msg), timeout=self.send_timeout)
+            except (OSError, ConnectionError, RuntimeError, asyncio.TimeoutError):
+                await self.disconnect(subscriber.websocket, slug)
+                await self._close(subscriber.websocket)
+                return
+            if subscriber.queue.empty():
+                subscriber.downgraded = False
+            elapsed = time.perf_counter() - enqueued_at
+            self._latency_total.observe(elapsed)
+            histogram = self._latency.get(slug)
+            if histogram is None and slug in self._connections:
+                histogram = self._latency[slug] = Histogram()
+            if histogram is not None:
+                histogram.observe(elapsed)
+
+    @staticmethod
+    async def _close(websocket: WebSocket, reason: str | None = None) -> None:
+        try:
+            await websocket.close(code=1013, reason=reason)  # Try Again Later
+        except (OSError, ConnectionError, RuntimeError):
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "connections": self._total,
+            "max_connections": self.max_total,
+            "max_connections_per_slug": self.max_per_slug,
+            "rejected": self.rejected,
+            "downgrades": self.downgrades,
+            "evictions": self.evictions,
+            "send_latency": self._latency_total.snapshot(),
+            "slugs": {
+                _slug_key(slug): {
+                    "connections": len(subscribers),
+                    "send_latency": self._latency[slug].snapshot() if slug in self._latency else None,
+                }
+                for slug, subscribers in self._connections.items()
+            },
+        }
+
+
+class BroadcastScheduler:
+    """
+    Debounce рассылок по slug: все изменения за окно window склеиваются в один снимок.
+    schedule() синхронный и дешёвый — вызывается после commit (см. services.wishlist);
+    снимок грузится в фоновой задаче своей сессией, вне запроса.
+    """
+
+    def __init__(self, manager: ConnectionManager, window: float) -> None:
+        self._manager = manager
+        self.window = window
+        self._pending: dict[str, asyncio.Task] = {}
+        self.scheduled = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def schedule(self, slug: str) -> None:
+        if not self._manager.has_subscribers(slug):
+            self.skipped += 1
+            return
+        self.scheduled += 1
+        if slug in self._pending:
+            self.coalesced += 1
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # вне event loop (CLI-скрипты) — подписчиков всё равно нет
+            self.skipped += 1
+            return
+        self._pending[slug] = loop.create_task(self._flush(slug))
+
+    async def _flush(self, slug: str) -> None:
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            # Изменения во время загрузки снимка запланируют следующую рассылку
+            self._pending.pop(slug, None)
+        try:
+            if await self._manager.refresh(slug):
+                self.sent += 1
+        except Exception:  # фоновая задача: ошибка БД/сети не должна теряться молча
+            self.failed += 1
+            logger.exception("Broadcast for wishlist %s failed", slug)
+
+    async def aclose(self) -> None:
+        """Отменить ожидающие рассылки (при остановке приложения)."""
+        tasks = list(self._pending.values())
+        self._pending.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "scheduled": self.scheduled,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
 
 
-ws_manager = ConnectionManager()
+ws_manager = ConnectionManager(
+    queue_size=settings.ws_send_queue_size,
+    send_timeout=settings.ws_send_timeout_seconds,
+    max_per_slug=settings.ws_max_connections_per_slug,
+    max_total=settings.ws_max_connections,
+)
+broadcast_scheduler = BroadcastScheduler(ws_manager, window=settings.ws_broadcast_window_seconds)
@@ -1,18 +1,24 @@
+from collections.abc import Collection
+from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import select
+from sqlalchemy import event, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import Session
 
-from app.models import Wishlist, WishlistItem
+from app.db.session import async_session
+from app.models import Reservation, Wishlist, WishlistItem
 from app.schemas import WishlistItemResponse, WishlistPublicResponse
-from app.services.websocket import ws_manager
+from app.services.cache import public_cache
+from app.services.pubsub import event_bus
+from app.services.websocket import broadcast_scheduler, ws_manager
+
+_CHANGED_SLUGS = "changed_wishlist_slugs"
 
 
 def _total_contributed(item: WishlistItem) -> Decimal:
-    if not item.contributions:
-        return Decimal("0")
-    return sum((c.amount for c in item.contributions), Decimal("0"))
+    """Сумма вкладов из денормализованной колонки — contributions не загружаются."""
+    return item.total_contributed or Decimal("0")
 
 
 def item_to_response(item: WishlistItem) -> WishlistItemResponse:
@@ -32,33 +38,128 @@ def item_to_response(item: WishlistItem) -> WishlistItemResponse:
     )
 
 
-async def get_wishlist_public_dict(slug: str, db: AsyncSession) -> dict | None:
-    """Загружает вишлист и возвращает данные для публичного ответа (для broadcast)."""
+async def get_items_aggregated(
+    wishlist_id: int, db: AsyncSession, item_ids: Collection[int] | None = None
+) -> list[WishlistItemResponse]:
+    """
+    Товары списка одним запросом: сумма вкладов берётся из денормализованной колонки,
+    флаг резервации — из LEFT JOIN. ORM-объекты не создаются (на популярных списках
+    вкладов тысячи). item_ids — только эти товары.
+    """
+    stmt = (
+        select(
+            WishlistItem.id,
+            WishlistItem.wishlist_id,
+            WishlistItem.title,
+            WishlistItem.link,
+            WishlistItem.price,
+            WishlistItem.min_contribution,
+            WishlistItem.image_url,
+            WishlistItem.sort_order,
+            Reservation.id.is_not(None).label("is_reserved"),
+            WishlistItem.total_contributed,
+            WishlistItem.created_at,
+        )
+        .outerjoin(Reservation, Reservation.wishlist_item_id == WishlistItem.id)
+        .where(WishlistItem.wishlist_id == wishlist_id)
+        .order_by(WishlistItem.sort_order, WishlistItem.id)
+    )
+    if item_ids is not None:
+        stmt = stmt.where(WishlistItem.id.in_(item_ids))
+    result = await db.execute(stmt)
+    return [WishlistItemResponse.model_validate(dict(row._mapping)) for row in result]
+
+
+async def get_wishlist_totals(wishlist_ids: Collection[int], db: AsyncSession) -> dict[int, dict]:
+    """
+    Итоги по товарам списков одним GROUP BY: число товаров, зарезервированных,
+    собрано (денормализованные суммы вкладов) и нужно (сумма цен).
+    """
     result = await db.execute(
-        select(Wishlist)
-        .where(Wishlist.slug == slug)
-        .options(
-            selectinload(Wishlist.items).selectinload(WishlistItem.contributions),
-            selectinload(Wishlist.items).selectinload(WishlistItem.reservation),
+        select(
+            WishlistItem.wishlist_id,
+            func.count(WishlistItem.id).label("item_count"),
+            func.count(Reservation.id).label("reserved_count"),
+            func.coalesce(func.sum(WishlistItem.total_contributed), 0).label("collected"),
+            func.coalesce(func.sum(WishlistItem.price), 0).label("target"),
         )
+        .outerjoin(Reservation, Reservation.wishlist_item_id == WishlistItem.id)
+        .where(WishlistItem.wishlist_id.in_(wishlist_ids))
+        .group_by(WishlistItem.wishlist_id)
     )
-    wishlist = result.scalar_one_or_none()
-    if not wishlist:
-        return None
-    resp = WishlistPublicResponse(
+    return {row.wishlist_id: dict(row._mapping) for row in result}
+
+
+async def build_public_response(wishlist: Wishlist, db: AsyncSession) -> WishlistPublicResponse:
+    """Публичный ответ по уже загруженному вишлисту (без items в identity map)."""
+    return WishlistPublicResponse(
         id=wishlist.id,
         title=wishlist.title,
         occasion=wishlist.occasion,
         event_date=wishlist.event_date,
         currency=getattr(wishlist, "currency", None) or "RUB",
         slug=wishlist.slug,
-        items=[item_to_response(i) for i in wishlist.items],
+        items=await get_items_aggregated(wishlist.id, db),
     )
+
+
+async def get_wishlist_public_dict(slug: str, db: AsyncSession) -> dict | None:
+    """Загружает вишлист и возвращает данные для публичного ответа (для broadcast)."""
+    result = await db.execute(select(Wishlist).where(Wishlist.slug == slug))
+    wishlist = result.scalar_one_or_none()
+    if not wishlist:
+        return None
+    resp = await build_public_response(wishlist, db)
     return resp.model_dump(mode="json")
 
 
-async def broadcast_wishlist_update(slug: str, db: AsyncSession) -> None:
-    """Broadcast обновлённого вишлиста всем подписчикам по slug."""
-    data = await get_wishlist_public_dict(slug, db)
-    if data:
-        await ws_manager.broadcast_wishlist(slug, data)
+async def _load_public_snapshot(slug: str) -> dict | None:
+    """Снимок для рассылки: своя сессия, запрос уже завершён и закоммичен."""
+    async with async_session() as db:
+        return await get_wishlist_public_dict(slug, db)
+
+
+ws_manager.set_loader(_load_public_snapshot)
+
+
+def mark_wishlist_changed(db: AsyncSession, slug: str) -> None:
+    """
+    Отметить список изменённым: перед commit увеличиваются revision/updated_at (ETag, Last-Modified),
+    после commit сбрасывается кэш публичного снимка и планируется WS-рассылка — в этом процессе и,
+    через event_bus, в остальных воркерах.
+    """
+    db.info.setdefault(_CHANGED_SLUGS, set()).add(slug)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_changed_revisions(session: Session) -> None:
+    # UPDATE блокирует строку списка до конца транзакции: делаем его последним запросом перед
+    # COMMIT, чтобы параллельные изменения того же списка не ждали всю работу обработчика
+    slugs = session.info.get(_CHANGED_SLUGS)
+    if slugs:
+        session.execute(
+            update(Wishlist)
+            .where(Wishlist.slug.in_(sorted(slugs)))
+            .values(revision=Wishlist.revision + 1, updated_at=datetime.utcnow())
+        )
+
+
+def _on_wishlist_changed(slug: str) -> None:
+    public_cache.invalidate(slug)
+    broadcast_scheduler.schedule(slug)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_wishlists(session: Session) -> None:
+    for slug in session.info.pop(_CHANGED_SLUGS, ()):
+        _on_wishlist_changed(slug)
+        event_bus.publish_nowait(slug)
+
+
+# Изменения из других воркеров
+event_bus.subscribe(_on_wishlist_changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_wishlists(session: Session) -> None:
+    session.info.pop(_CHANGED_SLUGS, None)
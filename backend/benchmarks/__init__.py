@@ -0,0 +1 @@
+# Бенчмарки горячих путей API (запускаются вручную, не входят в pytest tests/)
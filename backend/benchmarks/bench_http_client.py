@@ -0,0 +1,144 @@
+"""
+Бенчмарк исходящих HTTP-запросов: новый httpx.AsyncClient на каждый запрос (как было)
+против общего клиента из app.services.http_clients (keep-alive, переиспользование TLS).
+
+Запуск из backend/:
+    python -m benchmarks.bench_http_client
+    python -m benchmarks.bench_http_client --no-tls
+
+Поднимает локальный HTTP/1.1-стаб с keep-alive (по умолчанию за TLS с самоподписанным
+сертификатом — чтобы в «до» была видна цена рукопожатия) и печатает p50/p99.
+С TLS «до» получает готовый SSL-контекст, так что это нижняя оценка: httpx.AsyncClient()
+по умолчанию ещё и заново загружает CA-бандл certifi на каждый клиент (это видно в --no-tls).
+"""
+import argparse
+import asyncio
+import datetime
+import ssl
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from app.services.http_clients import SHOPS, HttpClientRegistry
+
+REQUESTS = 300
+CONCURRENCY = 10
+BODY = b"<html><head><meta property='og:title' content='Stub'></head><body></body></html>"
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Минимальный HTTP/1.1: читает заголовки, отвечает 200 и держит соединение открытым."""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            close = b"connection: close" in head.lower()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                + f"Content-Length: {len(BODY)}\r\n".encode()
+                + (b"Connection: close\r\n" if close else b"")
+                + b"\r\n"
+                + BODY
+            )
+            await writer.drain()
+            if close:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def _self_signed_tls() -> tuple[ssl.SSLContext, ssl.SSLContext]:
+    """Серверный и клиентский SSL-контексты с одноразовым сертификатом для 127.0.0.1."""
+    import ipaddress
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    with tempfile.NamedTemporaryFile(suffix=".pem") as cert_file, tempfile.NamedTemporaryFile(suffix=".pem") as key_file:
+        cert_file.write(cert_pem)
+        cert_file.flush()
+        key_file.write(key_pem)
+        key_file.flush()
+        server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ctx.load_cert_chain(cert_file.name, key_file.name)
+    client_ctx = ssl.create_default_context(cadata=cert_pem.decode())
+    return server_ctx, client_ctx
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+async def _run(fetch, url: str) -> list[float]:
+    samples: list[float] = []
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one() -> None:
+        async with sem:
+            start = time.perf_counter()
+            await fetch(url)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    return samples
+
+
+async def main(tls: bool) -> None:
+    server_ctx, client_ctx = _self_signed_tls() if tls else (None, None)
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0, ssl=server_ctx)
+    port = server.sockets[0].getsockname()[1]
+    url = f"{'https' if tls else 'http'}://127.0.0.1:{port}/product"
+    verify = client_ctx if tls else True
+
+    async def per_request(u: str) -> None:
+        async with httpx.AsyncClient(verify=verify) as client:
+            (await client.get(u)).raise_for_status()
+
+    # Тот же клиент, что в приложении, но с доверием к самоподписанному сертификату стаба
+    registry = HttpClientRegistry(verify=verify)
+    shared = registry.get(SHOPS)
+
+    async def shared_client(u: str) -> None:
+        (await shared.get(u)).raise_for_status()
+
+    print(f"{REQUESTS} запросов, параллельность {CONCURRENCY}, {'HTTPS' if tls else 'HTTP'} на 127.0.0.1")
+    print(f"{'вариант':>22} | {'p50':>9} | {'p99':>9}")
+    for label, fetch in (("новый клиент/запрос", per_request), ("общий клиент", shared_client)):
+        await fetch(url)  # прогрев
+        p50, p99 = _percentiles(await _run(fetch, url))
+        print(f"{label:>22} | {p50:>6.2f} ms | {p99:>6.2f} ms")
+
+    await registry.aclose()
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-tls", action="store_true", help="без TLS (только TCP keep-alive)")
+    args = parser.parse_args()
+    asyncio.run(main(tls=not args.no_tls))
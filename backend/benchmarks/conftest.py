@@ -0,0 +1,249 @@
+"""
+Бенчмарки основных путей запроса с базовыми значениями в репозитории (benchmarks/baseline.json).
+
+Запуск из backend/ (в обычный прогон pytest не входят — testpaths = tests):
+    python -m pytest benchmarks                                        # SQLite в памяти
+    DATABASE_URL=postgresql+asyncpg://... python -m pytest benchmarks  # локальный Postgres
+    python -m pytest benchmarks --update-baseline                      # записать текущие результаты
+
+Каждый бенчмарк: прогрев, подбор числа вызовов на раунд (раунд не короче ROUND_MIN_SECONDS),
+ROUNDS раундов (медленным путям — сколько уложится в ROUND_BUDGET_SECONDS, но не меньше MIN_ROUNDS);
+сборщик мусора на время замеров выключен, как в timeit. Сравнивается лучший раунд (min_us) — время
+одного вызова: у медленных путей (разбор страницы, десятки мс) раунд — один вызов, и разброс медианы
+между прогонами превышает порог, а лучший раунд отражает стоимость кода без помех от планировщика.
+Тест падает, если лучший раунд хуже базового больше чем в --benchmark-threshold раз. Базы хранятся
+по разделам: "python" — пути без БД, "sqlite"/"postgresql" — пути с БД (фикстура db); без базы тест
+только записывает результат.
+Базы зависят от машины: обновляйте их там же, где сравниваете. Недоступная БД — бенчмарки с ней пропускаются.
+Тесты с меткой memory после замеров времени делают ещё один вызов под tracemalloc и записывают
+пик памяти (peak_kb) — для сравнения вариантов, с базой он не сверяется.
+"""
+import gc
+import inspect
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+# Должно быть до импорта app (config читает настройки при загрузке)
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+os.environ.setdefault("PRODUCT_PARSE_WORKERS", "0")
+
+import pytest  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+from sqlalchemy.exc import DBAPIError  # noqa: E402
+
+from app.db.session import async_session, engine, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Contribution, Reservation, Wishlist, WishlistItem  # noqa: E402
+from app.services.cache import public_cache  # noqa: E402
+from app.services.principal_cache import principal_cache  # noqa: E402
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+CORPUS_DIR = Path(__file__).with_name("pages")
+ROUNDS = 15
+MIN_ROUNDS = 5
+ROUND_BUDGET_SECONDS = 3.0
+ROUND_MIN_SECONDS = 0.005
+MAX_ITERATIONS = 10_000
+DEFAULT_THRESHOLD = 1.5
+
+ITEMS_PER_WISHLIST = 20
+CONTRIBUTED_ITEMS = 10
+CONTRIBUTIONS_PER_ITEM = 50
+RESERVED_ITEMS = 5
+
+_RESULTS = pytest.StashKey[dict[str, dict[str, dict]]]()
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("benchmarks")
+    group.addoption("--update-baseline", action="store_true", help="записать медианы в benchmarks/baseline.json")
+    group.addoption(
+        "--benchmark-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"допустимое замедление относительно базы, раз (по умолчанию {DEFAULT_THRESHOLD})",
+    )
+    group.addoption(
+        "--benchmark-corpus",
+        type=Path,
+        default=CORPUS_DIR,
+        help="папка с сохранёнными страницами товаров (*.html) для test_parse_product (по умолчанию benchmarks/pages)",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.stash[_RESULTS] = {}
+    config.addinivalue_line("markers", "memory: записать пик памяти одного вызова (tracemalloc)")
+
+
+def _load_baseline() -> dict[str, dict[str, dict]]:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+
+class Benchmark:
+    """await benchmark(fn, *args) — измеряет fn (обычную или async) и сверяет с базой; возвращает результат fn."""
+
+    def __init__(self, config: pytest.Config, section: str, name: str, memory: bool = False) -> None:
+        self.config = config
+        self.section = section
+        self.name = name
+        self.memory = memory
+
+    async def __call__(self, fn, *args, **kwargs):
+        is_async = inspect.iscoroutinefunction(fn)
+
+        async def run(iterations: int) -> float:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                if is_async:
+                    await fn(*args, **kwargs)
+                else:
+                    fn(*args, **kwargs)
+            return time.perf_counter() - start
+
+        result = await fn(*args, **kwargs) if is_async else fn(*args, **kwargs)  # прогрев
+        # Паузы сборщика мусора попадали бы в случайные раунды
+        gc.collect()
+        gc.disable()
+        try:
+            iterations = 1
+            while (elapsed := await run(iterations)) < ROUND_MIN_SECONDS and iterations < MAX_ITERATIONS:
+                iterations *= 2
+            rounds = max(MIN_ROUNDS, min(ROUNDS, int(ROUND_BUDGET_SECONDS / elapsed)))
+            samples = [await run(iterations) / iterations * 1e6 for _ in range(rounds)]
+        finally:
+            gc.enable()
+        best = min(samples)
+
+        results = self.config.stash[_RESULTS].setdefault(self.section, {})
+        assert self.name not in results, "один бенчмарк на тест"
+        results[self.name] = {
+            "median_us": round(statistics.median(samples), 2),
+            "min_us": round(best, 2),
+            "iterations": iterations,
+        }
+        if self.memory:
+            tracemalloc.start()
+            try:
+                await fn(*args, **kwargs) if is_async else fn(*args, **kwargs)
+                results[self.name]["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            finally:
+                tracemalloc.stop()
+
+        baseline = _load_baseline().get(self.section, {}).get(self.name)
+        threshold = self.config.getoption("--benchmark-threshold")
+        if baseline and not self.config.getoption("--update-baseline") and best > baseline["min_us"] * threshold:
+            pytest.fail(
+                f"{self.section}/{self.name}: лучший раунд {best:.1f} мкс, база {baseline['min_us']:.1f} мкс "
+                f"(x{best / baseline['min_us']:.2f} > x{threshold})"
+            )
+        return result
+
+
+@pytest.fixture
+def benchmark(request: pytest.FixtureRequest) -> Benchmark:
+    section = engine.dialect.name if "db" in request.fixturenames else "python"
+    memory = request.node.get_closest_marker("memory") is not None
+    return Benchmark(request.config, section, request.node.name, memory)
+
+
+@pytest.fixture
+async def db():
+    """Чистая БД и сессия; недоступная БД (нет локального Postgres) — пропуск."""
+    try:
+        await init_db()
+        async with engine.begin() as conn:
+            for table in ("contributions", "reservations", "wishlist_items", "wishlists", "items", "users"):
+                await conn.execute(text(f"DELETE FROM {table}"))
+    except (OSError, DBAPIError) as e:
+        pytest.skip(f"БД недоступна: {e}")
+    public_cache.clear()
+    principal_cache.clear()
+    async with async_session() as session:
+        yield session
+
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+async def wishlist(db, request: pytest.FixtureRequest) -> Wishlist:
+    """
+    Список с ITEMS_PER_WISHLIST товарами: часть со вкладами, часть зарезервирована. Вкладов на товар —
+    CONTRIBUTIONS_PER_ITEM или значение косвенной параметризации (indirect=["wishlist"]).
+    """
+    per_item = getattr(request, "param", CONTRIBUTIONS_PER_ITEM)
+    wishlist = Wishlist(title="Бенчмарк")
+    db.add(wishlist)
+    await db.flush()
+    items = [
+        WishlistItem(
+            wishlist_id=wishlist.id,
+            title=f"Товар {n}",
+            link=f"https://shop.example.com/p/{n}",
+            price=Decimal("100000"),
+            sort_order=n,
+            total_contributed=Decimal(per_item * 100) if n < CONTRIBUTED_ITEMS else Decimal("0"),
+            contributions_count=per_item if n < CONTRIBUTED_ITEMS else 0,
+        )
+        for n in range(ITEMS_PER_WISHLIST)
+    ]
+    db.add_all(items)
+    await db.flush()
+    if per_item:
+        await db.execute(
+            insert(Contribution),
+            [
+                {
+                    "wishlist_item_id": item.id,
+                    "contributor_name": "Гость",
+                    "contributor_secret": f"bench-{item.id}-{n}",
+                    "amount": Decimal("100"),
+                }
+                for item in items[:CONTRIBUTED_ITEMS]
+                for n in range(per_item)
+            ],
+        )
+    db.add_all(
+        Reservation(wishlist_item_id=item.id, reserver_name="Маша")
+        for item in items[CONTRIBUTED_ITEMS:CONTRIBUTED_ITEMS + RESERVED_ITEMS]
+    )
+    await db.commit()
+    return wishlist
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus: int, config: pytest.Config) -> None:
+    results = config.stash.get(_RESULTS, {})
+    if not results:
+        return
+    baseline = _load_baseline()
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        f"{'бенчмарк':<64} | {'медиана мкс':>11} | {'лучший мкс':>10} | {'база мкс':>9} | {'x':>5} | {'пик КБ':>8}"
+    )
+    for section, entries in sorted(results.items()):
+        for name, entry in sorted(entries.items()):
+            base = baseline.get(section, {}).get(name)
+            ratio = f"{entry['min_us'] / base['min_us']:.2f}" if base else "-"
+            terminalreporter.write_line(
+                f"{section + '/' + name:<64} | {entry['median_us']:>11.1f} | {entry['min_us']:>10.1f} | "
+                f"{base['min_us'] if base else '-':>9} | {ratio:>5} | {entry.get('peak_kb', '-'):>8}"
+            )
+    if config.getoption("--update-baseline"):
+        updated = _load_baseline()
+        for section, entries in results.items():
+            updated.setdefault(section, {}).update(entries)
+        BASELINE_PATH.write_text(json.dumps(updated, indent=2, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+        terminalreporter.write_line(f"База обновлена: {BASELINE_PATH}")
@@ -0,0 +1,276 @@
+"""
+Нагрузочный прогон по данным benchmarks.seed: смесь публичных чтений, резерваций и вкладов
+плюс WebSocket-подписчики на тех же «горячих» списках. Популярность списков — по Ципфу:
+немногие списки получают большую часть трафика, как при расшаренной в чат ссылке.
+
+Запуск из backend/ (по умолчанию приложение поднимается в этом процессе: uvicorn на 127.0.0.1,
+измеряется полный HTTP-стек; данные берутся из той же БД по DATABASE_URL):
+    python -m benchmarks.seed --wishlists 10000              # по умолчанию SQLite-файл bench.db
+    python -m benchmarks.load --duration 30 --concurrency 32
+    python -m benchmarks.load --seed-wishlists 2000          # заполнить БД в том же запуске
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.load --subscribers 500
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --mix read=90,reserve=5,contribute=5
+
+Отчёт по каждой ручке: запросы/с, p50/p95/p99/max, ожидаемые отказы (409/400 на уже занятых
+или собранных подарках — это нормальный исход под нагрузкой) и ошибки; по WebSocket —
+подключения и полученные сообщения.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+# Должно быть до импорта app (config читает DATABASE_URL при загрузке)
+# Файл, а не :memory: — в памяти все сессии делят одно соединение, и параллельные транзакции
+# мешают друг другу, чего не бывает в настоящей БД
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///bench.db")
+
+import httpx  # noqa: E402
+import websockets  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.db.session import engine, init_db  # noqa: E402
+from app.models import Wishlist, WishlistItem  # noqa: E402
+from benchmarks.seed import SLUG_PREFIX, add_seed_arguments, seed, seed_config  # noqa: E402
+
+# Ожидаемые отказы по операциям: конкуренция за подарок, а не сбой
+EXPECTED_STATUSES = {"read": set(), "reserve": {409}, "contribute": {400}}
+
+
+@dataclass
+class EndpointStats:
+    samples: list[float] = field(default_factory=list)  # латентность успешных и ожидаемых ответов, мс
+    ok: int = 0
+    expected: int = 0
+    errors: int = 0
+
+    def record(self, elapsed_ms: float, status: int | None, expected: set[int]) -> None:
+        if status is not None and status < 400:
+            self.ok += 1
+        elif status in expected:
+            self.expected += 1
+        else:
+            self.errors += 1
+            return
+        self.samples.append(elapsed_ms)
+
+
+@dataclass
+class SubscriberStats:
+    connected: int = 0
+    failed: int = 0
+    messages: Counter = field(default_factory=Counter)  # по типу: snapshot, patch, ping
+
+
+def _percentile(sorted_samples: list[float], p: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * p))]
+
+
+class HotSet:
+    """Списки и их товары; выбор списка с весом 1/rank^s (Ципф)."""
+
+    def __init__(self, wishlists: list[tuple[str, list[int]]], skew: float) -> None:
+        self.wishlists = wishlists
+        self._cum_weights = list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, len(wishlists) + 1)))
+
+    def pick(self, rng: random.Random) -> tuple[str, list[int]]:
+        return rng.choices(self.wishlists, cum_weights=self._cum_weights)[0]
+
+
+async def load_hot_set(size: int, skew: float) -> HotSet:
+    async with engine.connect() as conn:
+        rows = (
+            await conn.execute(
+                select(Wishlist.id, Wishlist.slug)
+                .where(Wishlist.slug.startswith(SLUG_PREFIX))
+                .order_by(Wishlist.id)
+                .limit(size)
+            )
+        ).all()
+        items: dict[int, list[int]] = {wishlist_id: [] for wishlist_id, _ in rows}
+        if items:
+            result = await conn.execute(
+                select(WishlistItem.wishlist_id, WishlistItem.id).where(WishlistItem.wishlist_id.in_(list(items)))
+            )
+            for wishlist_id, item_id in result:
+                items[wishlist_id].append(item_id)
+    wishlists = [(slug, items[wishlist_id]) for wishlist_id, slug in rows if items[wishlist_id]]
+    if not wishlists:
+        raise SystemExit("Нет данных benchmarks.seed: запустите python -m benchmarks.seed или укажите --seed-wishlists")
+    return HotSet(wishlists, skew)
+
+
+async def _request(client: httpx.AsyncClient, op: str, slug: str, item_id: int, rng: random.Random) -> httpx.Response:
+    base = f"/api/wishlists/s/{slug}"
+    if op == "read":
+        return await client.get(base)
+    if op == "reserve":
+        return await client.post(f"{base}/items/{item_id}/reserve", json={"reserver_name": "Нагрузка"})
+    amount = str(Decimal(rng.randrange(100, 2_000, 50)))
+    return await client.post(
+        f"{base}/items/{item_id}/contribute", json={"contributor_name": "Нагрузка", "amount": amount}
+    )
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    hot: HotSet,
+    mix: dict[str, int],
+    stats: dict[str, EndpointStats],
+    deadline: float,
+    seed: int,
+) -> None:
+    rng = random.Random(seed)
+    ops, cum_weights = list(mix), list(itertools.accumulate(mix.values()))
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, cum_weights=cum_weights)[0]
+        slug, item_ids = hot.pick(rng)
+        start = time.perf_counter()
+        try:
+            status = (await _request(client, op, slug, rng.choice(item_ids), rng)).status_code
+        except httpx.HTTPError:
+            status = None
+        stats[op].record((time.perf_counter() - start) * 1000, status, EXPECTED_STATUSES[op])
+
+
+async def _subscriber(ws_url: str, slug: str, stats: SubscriberStats, stop: asyncio.Event) -> None:
+    """Ведёт себя как вкладка со списком: получает снимок и патчи, отвечает на ping."""
+    try:
+        async with websockets.connect(f"{ws_url}/api/wishlists/ws/{slug}") as ws:
+            stats.connected += 1
+            while not stop.is_set():
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                message = json.loads(raw)
+                stats.messages[message.get("type", "?")] += 1
+                if message.get("type") == "ping":
+                    await ws.send(json.dumps({"type": "pong"}))
+    except (OSError, websockets.WebSocketException):
+        stats.failed += 1
+
+
+async def run_load(
+    base_url: str,
+    hot: HotSet,
+    mix: dict[str, int],
+    duration: float,
+    concurrency: int,
+    subscribers: int,
+    seed: int,
+) -> tuple[dict[str, EndpointStats], SubscriberStats, float]:
+    stats = {op: EndpointStats() for op in mix}
+    ws_stats = SubscriberStats()
+    stop = asyncio.Event()
+    rng = random.Random(seed)
+    ws_url = "ws" + base_url.removeprefix("http")
+    ws_tasks = [
+        asyncio.create_task(_subscriber(ws_url, hot.pick(rng)[0], ws_stats, stop)) for _ in range(subscribers)
+    ]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(_worker(client, hot, mix, stats, deadline, seed + n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*ws_tasks)
+    return stats, ws_stats, elapsed
+
+
+def print_report(stats: dict[str, EndpointStats], ws_stats: SubscriberStats, elapsed: float) -> None:
+    print(
+        f"{'ручка':>10} | {'запросов':>8} | {'rps':>7} | {'p50 мс':>7} | {'p95 мс':>7} | {'p99 мс':>7} | "
+        f"{'max мс':>7} | {'отказы':>6} | {'ошибки':>6}"
+    )
+    for op, s in stats.items():
+        samples = sorted(s.samples)
+        total = s.ok + s.expected + s.errors
+        print(
+            f"{op:>10} | {total:>8} | {total / elapsed:>7.1f} | {_percentile(samples, 0.50):>7.1f} | "
+            f"{_percentile(samples, 0.95):>7.1f} | {_percentile(samples, 0.99):>7.1f} | "
+            f"{samples[-1] if samples else 0.0:>7.1f} | {s.expected:>6} | {s.errors:>6}"
+        )
+    messages = sum(ws_stats.messages.values())
+    print(
+        f"WebSocket: подключено {ws_stats.connected}, отказов {ws_stats.failed}, "
+        f"сообщений {messages} ({messages / elapsed:.1f}/с: "
+        + ", ".join(f"{kind} {count}" for kind, count in ws_stats.messages.most_common())
+        + ")"
+    )
+
+
+def _parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        op, _, weight = part.partition("=")
+        if op not in EXPECTED_STATUSES or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"ожидается read=N,reserve=N,contribute=N, получено {part!r}")
+        mix[op] = int(weight)
+    return mix
+
+
+async def _serve_in_process() -> tuple[str, object, asyncio.Task]:
+    import uvicorn
+
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()  # пробрасываем ошибку старта
+        await asyncio.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return f"http://127.0.0.1:{port}", server, task
+
+
+async def main(args: argparse.Namespace) -> None:
+    await init_db()
+    if args.seed_wishlists:
+        await seed(engine, seed_config(args, args.seed_wishlists))
+    hot = await load_hot_set(args.hot_set, args.skew)
+
+    server = task = None
+    base_url = args.base_url
+    if base_url is None:
+        base_url, server, task = await _serve_in_process()
+    try:
+        print(
+            f"{base_url}: {args.duration:.0f} с, {args.concurrency} клиентов, {args.subscribers} подписчиков, "
+            f"{len(hot.wishlists)} списков (Ципф s={args.skew}), смесь {args.mix}"
+        )
+        stats, ws_stats, elapsed = await run_load(
+            base_url, hot, args.mix, args.duration, args.concurrency, args.subscribers, args.seed
+        )
+        print_report(stats, ws_stats, elapsed)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await task
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="внешний сервер вместо приложения в этом процессе")
+    parser.add_argument("--duration", type=float, default=20.0, help="длительность прогона, с")
+    parser.add_argument("--concurrency", type=int, default=32, help="одновременных HTTP-клиентов")
+    parser.add_argument("--subscribers", type=int, default=50, help="WebSocket-подписчиков")
+    parser.add_argument(
+        "--mix", type=_parse_mix, default="read=80,reserve=5,contribute=15", help="веса операций"
+    )
+    parser.add_argument("--hot-set", type=int, default=1_000, help="сколько списков участвует в прогоне")
+    parser.add_argument("--skew", type=float, default=1.1, help="параметр Ципфа для популярности списков")
+    parser.add_argument("--seed-wishlists", type=int, default=0, help="заполнить БД перед прогоном")
+    add_seed_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
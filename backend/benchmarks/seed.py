@@ -0,0 +1,220 @@
+"""
+Синтетические данные для нагрузочных прогонов: пользователи, списки, товары, резервации и вклады
+с перекосом — у немногих товаров сотни вкладов, у большинства ни одного (распределение Парето).
+
+Запуск из backend/ (схема создаётся/догоняется миграциями):
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.seed --wishlists 100000
+    DATABASE_URL=sqlite+aiosqlite:///bench.db python -m benchmarks.seed --wishlists 10000
+
+В Postgres строки грузятся COPY (asyncpg copy_records_to_table), в SQLite — executemany пачками.
+Генерация детерминирована (--seed). Списки получают slug bench-s-<id> — по нему их находит
+benchmarks.load; итоги вкладов (total_contributed) записываются сразу согласованными.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Должно быть до импорта app (config читает DATABASE_URL при загрузке)
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///bench.db")
+
+from sqlalchemy import Table, func, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine  # noqa: E402
+
+from app.models import Contribution, Reservation, User, Wishlist, WishlistItem  # noqa: E402
+
+SLUG_PREFIX = "bench-s-"
+OCCASIONS = ("День рождения", "Новый год", "Свадьба", None)
+NAMES = ("Маша", "Петя", "Аня", "Дима", "Оля", "Гость")
+
+USER_COLUMNS = ("id", "email", "created_at")
+WISHLIST_COLUMNS = (
+    "id", "user_id", "title", "occasion", "currency", "slug", "creator_secret", "created_at", "revision",
+    "updated_at",
+)
+ITEM_COLUMNS = (
+    "id", "wishlist_id", "title", "link", "price", "sort_order", "total_contributed", "contributions_count",
+    "created_at",
+)
+CONTRIBUTION_COLUMNS = ("id", "wishlist_item_id", "contributor_name", "contributor_secret", "amount", "contributed_at")
+RESERVATION_COLUMNS = ("id", "wishlist_item_id", "reserver_name", "reserver_secret", "reserved_at")
+
+
+@dataclass
+class SeedConfig:
+    wishlists: int = 100_000
+    items_per_wishlist: int = 10
+    users: int = 10_000
+    owned_share: float = 0.7  # доля списков, привязанных к пользователю
+    reserved_share: float = 0.2  # доля товаров без вкладов, которые зарезервированы
+    contribution_alpha: float = 1.5  # параметр Парето: меньше — длиннее хвост популярных товаров
+    max_contributions_per_item: int = 1_000
+    batch_wishlists: int = 2_000
+    seed: int = 42
+
+
+class _Ids:
+    """Следующие свободные id по таблицам: строки вставляются с явными id, чтобы связать их без RETURNING."""
+
+    def __init__(self, start: dict[str, int]) -> None:
+        self._next = dict(start)
+
+    def take(self, table: str) -> int:
+        value = self._next[table]
+        self._next[table] += 1
+        return value
+
+
+async def _next_ids(conn: AsyncConnection) -> dict[str, int]:
+    start = {}
+    for model in (User, Wishlist, WishlistItem, Contribution, Reservation):
+        current = (await conn.execute(select(func.max(model.id)))).scalar() or 0
+        start[model.__tablename__] = current + 1
+    return start
+
+
+async def _write(conn: AsyncConnection, table: Table, columns: tuple[str, ...], rows: list[tuple]) -> None:
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table.name, records=rows, columns=list(columns))
+    else:
+        await conn.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+async def _reset_sequences(conn: AsyncConnection) -> None:
+    """После COPY с явными id сдвигаем serial-последовательности, иначе приложение получит дубликаты ключей."""
+    for model in (User, Wishlist, WishlistItem, Contribution, Reservation):
+        table = model.__tablename__
+        await conn.execute(
+            text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))")
+        )
+
+
+def _contribution_count(rng: random.Random, config: SeedConfig) -> int:
+    return min(int(rng.paretovariate(config.contribution_alpha)) - 1, config.max_contributions_per_item)
+
+
+def _wishlist_batch(
+    rng: random.Random, ids: _Ids, config: SeedConfig, count: int, user_ids: range, now: datetime
+) -> dict[str, list[tuple]]:
+    rows: dict[str, list[tuple]] = {"wishlists": [], "wishlist_items": [], "contributions": [], "reservations": []}
+    for _ in range(count):
+        wishlist_id = ids.take("wishlists")
+        created = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        owner = rng.choice(user_ids) if user_ids and rng.random() < config.owned_share else None
+        rows["wishlists"].append((
+            wishlist_id, owner, f"Список {wishlist_id}", rng.choice(OCCASIONS), "RUB",
+            f"{SLUG_PREFIX}{wishlist_id}", f"bench-m-{wishlist_id}-{rng.getrandbits(64):016x}", created, 1, created,
+        ))
+        for order in range(1, config.items_per_wishlist + 1):
+            item_id = ids.take("wishlist_items")
+            price = Decimal(rng.randrange(500, 200_000, 100))
+            contributions = _contribution_count(rng, config)
+            total = Decimal(0)
+            for n in range(contributions):
+                amount = Decimal(rng.randrange(100, 5_000, 50))
+                total += amount
+                rows["contributions"].append((
+                    ids.take("contributions"), item_id, rng.choice(NAMES), f"bench-c-{item_id}-{n}", amount,
+                    created + timedelta(minutes=n),
+                ))
+            rows["wishlist_items"].append((
+                item_id, wishlist_id, f"Подарок {order}", f"https://shop.example.com/p/{item_id}", price, order,
+                total, contributions, created,
+            ))
+            if not contributions and rng.random() < config.reserved_share:
+                rows["reservations"].append((
+                    ids.take("reservations"), item_id, rng.choice(NAMES), f"bench-r-{item_id}", created,
+                ))
+    return rows
+
+
+async def seed(engine: AsyncEngine, config: SeedConfig, progress: bool = False) -> Counter:
+    """Добавляет данные к существующим (id продолжают текущие); возвращает число строк по таблицам."""
+    rng = random.Random(config.seed)
+    now = datetime.utcnow()
+    written: Counter = Counter()
+    async with engine.begin() as conn:
+        ids = _Ids(await _next_ids(conn))
+        users = [
+            (user_id, f"bench-{user_id}@example.com", now)
+            for user_id in (ids.take("users") for _ in range(config.users))
+        ]
+        await _write(conn, User.__table__, USER_COLUMNS, users)
+        written["users"] += len(users)
+    user_ids = range(users[0][0], users[-1][0] + 1) if users else range(0)
+
+    tables = (
+        ("wishlists", Wishlist.__table__, WISHLIST_COLUMNS),
+        ("wishlist_items", WishlistItem.__table__, ITEM_COLUMNS),
+        ("contributions", Contribution.__table__, CONTRIBUTION_COLUMNS),
+        ("reservations", Reservation.__table__, RESERVATION_COLUMNS),
+    )
+    remaining = config.wishlists
+    while remaining:
+        count = min(remaining, config.batch_wishlists)
+        rows = _wishlist_batch(rng, ids, config, count, user_ids, now)
+        # Пачка — одна транзакция: прерванный прогон не оставляет товаров без списка
+        async with engine.begin() as conn:
+            for name, table, columns in tables:
+                await _write(conn, table, columns, rows[name])
+                written[name] += len(rows[name])
+        remaining -= count
+        if progress:
+            print(f"  {config.wishlists - remaining}/{config.wishlists} списков", end="\r", flush=True)
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await _reset_sequences(conn)
+            for name, _, _ in tables:
+                await conn.execute(text(f"ANALYZE {name}"))
+    return written
+
+
+async def main(config: SeedConfig) -> None:
+    from app.db.session import engine, init_db
+
+    await init_db()
+    start = time.perf_counter()
+    written = await seed(engine, config, progress=True)
+    elapsed = time.perf_counter() - start
+    method = "COPY" if engine.dialect.name == "postgresql" else "executemany"
+    print(f"\n{engine.dialect.name}, {method}, {elapsed:.1f} с")
+    for table, rows in written.items():
+        print(f"{table:>16}: {rows:>10} строк, {rows / elapsed:>10.0f} строк/с")
+    await engine.dispose()
+
+
+def add_seed_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = SeedConfig()
+    parser.add_argument("--items", type=int, default=defaults.items_per_wishlist, help="товаров в списке")
+    parser.add_argument("--users", type=int, default=None, help="пользователей (по умолчанию списков / 10)")
+    parser.add_argument(
+        "--contribution-alpha", type=float, default=defaults.contribution_alpha,
+        help="перекос вкладов (Парето): меньше — больше «горячих» товаров",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="зерно генератора")
+
+
+def seed_config(args: argparse.Namespace, wishlists: int) -> SeedConfig:
+    return SeedConfig(
+        wishlists=wishlists,
+        items_per_wishlist=args.items,
+        users=wishlists // 10 if args.users is None else args.users,
+        contribution_alpha=args.contribution_alpha,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wishlists", type=int, default=SeedConfig.wishlists, help="число списков")
+    add_seed_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(main(seed_config(args, args.wishlists)))
@@ -0,0 +1,44 @@
+"""Зависимости авторизации: снимок пользователя из кэша, промах кэша (JWT + запрос в БД), ORM-пользователь."""
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api.deps import get_current_principal, get_current_user
+from app.core.security import create_access_token
+from app.db.session import async_session
+from app.models import User
+from app.services.principal_cache import principal_cache
+
+
+async def _credentials(db) -> HTTPAuthorizationCredentials:
+    user = User(email="bench@example.com")
+    db.add(user)
+    await db.commit()
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(user.id))
+
+
+async def test_get_current_principal_cached(benchmark, db):
+    credentials = await _credentials(db)
+    principal = await benchmark(get_current_principal, credentials)
+    assert principal.email == "bench@example.com"
+
+
+async def test_get_current_principal_uncached(benchmark, db):
+    credentials = await _credentials(db)
+
+    async def resolve_cold():
+        principal_cache.clear()
+        return await get_current_principal(credentials)
+
+    principal = await benchmark(resolve_cold)
+    assert principal.email == "bench@example.com"
+
+
+async def test_get_current_user(benchmark, db):
+    """Ручки, меняющие пользователя: снимок из кэша + загрузка ORM-объекта в новой сессии запроса."""
+    principal = await get_current_principal(await _credentials(db))
+
+    async def load_user():
+        async with async_session() as session:
+            return await get_current_user(principal, session)
+
+    user = await benchmark(load_user)
+    assert user.id == principal.id
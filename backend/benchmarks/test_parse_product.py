@@ -0,0 +1,67 @@
+"""
+Разбор страниц товара: полное дерево BeautifulSoup и потоковый сканер — на синтетических страницах
+и на корпусе сохранённых страниц (benchmarks/pages или --benchmark-corpus) с пиком памяти.
+"""
+from pathlib import Path
+
+import pytest
+
+from app.services.fetch_product import FETCH_MAX_BYTES, parse_product_page, scan_product_page
+
+BASE_URL = "https://shop.example.com/product/1"
+
+_HEAD = (
+    "<html><head><title>Товар — магазин</title>"
+    '<meta property="og:title" content="Смартфон X 128 ГБ">'
+    '<meta property="og:image" content="/images/x.jpg">'
+    '<meta property="og:price:amount" content="49 990">'
+    + '<link rel="stylesheet" href="/s.css">' * 40
+    + "</head><body>"
+)
+_HEAD_NO_PRICE = _HEAD.replace('<meta property="og:price:amount" content="49 990">', "")
+_LD = '<script type="application/ld+json">{"@type": "Product", "name": "X", "offers": {"price": "49990"}}</script>'
+_ROW = '<div class="card"><a href="/p/{n}"><img src="/i/{n}.jpg"><span>Похожий товар {n}</span></a></div>'
+
+PAGES = ("og_head_40k", "og_head_400k", "ld_tail_400k")
+PARSERS = {"soup": parse_product_page, "scan": scan_product_page}
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "corpus_page" in metafunc.fixturenames:
+        corpus: Path = metafunc.config.getoption("--benchmark-corpus")
+        files = sorted(corpus.glob("*.htm*"))
+        metafunc.parametrize("corpus_page", files, ids=[f.name for f in files])
+
+
+@pytest.fixture(scope="module")
+def pages() -> dict[str, str]:
+    """Типичные случаи: всё в <head>; цена только в JSON-LD внизу тела; страницы разного размера."""
+    body = "".join(_ROW.format(n=n) for n in range(4000))  # ~400 КБ разметки карточек
+    return {
+        "og_head_40k": _HEAD + body[:40_000] + "</body></html>",
+        "og_head_400k": _HEAD + body + "</body></html>",
+        "ld_tail_400k": _HEAD_NO_PRICE + body + _LD + "</body></html>",
+    }
+
+
+@pytest.mark.parametrize("page", PAGES)
+async def test_parse_product_page(benchmark, pages, page):
+    """Полное дерево BeautifulSoup: время растёт с размером страницы, где бы ни были метаданные."""
+    result = await benchmark(parse_product_page, pages[page], BASE_URL)
+    assert result["price"]
+
+
+@pytest.mark.parametrize("page", PAGES)
+async def test_scan_product_page(benchmark, pages, page):
+    """og в <head> — ранняя остановка; JSON-LD в конце — сканер дочитывает всю страницу. Результат как у дерева."""
+    result = await benchmark(scan_product_page, pages[page], BASE_URL)
+    assert result == parse_product_page(pages[page], BASE_URL)
+
+
+@pytest.mark.memory
+@pytest.mark.parametrize("parser", list(PARSERS))
+async def test_corpus_page(benchmark, corpus_page: Path, parser):
+    """Сохранённая страница магазина (как её скачал бы fetch_product): время и пик памяти дерева и сканера."""
+    html = corpus_page.read_bytes()[:FETCH_MAX_BYTES].decode("utf-8", errors="replace")
+    result = await benchmark(PARSERS[parser], html, BASE_URL)
+    assert result == parse_product_page(html, BASE_URL)
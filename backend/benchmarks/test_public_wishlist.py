@@ -0,0 +1,102 @@
+"""
+Публичное чтение списка: ручка /s/{slug} (кэш холодный и тёплый), снимок для рассылки, item_to_response;
+товары списка прежним путём (все Contribution через selectinload, сумма в Python) и агрегирующим запросом.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.models import Reservation, Wishlist, WishlistItem
+from app.services.cache import public_cache
+from app.services.wishlist import get_items_aggregated, get_wishlist_public_dict, item_to_response
+from benchmarks.conftest import ITEMS_PER_WISHLIST
+
+# Вкладов на товар: латентность чтения в зависимости от популярности списка
+CONTRIBUTION_COUNTS = (0, 10, 100, 1000)
+by_contributions = pytest.mark.parametrize(
+    "wishlist", CONTRIBUTION_COUNTS, indirect=True, ids=[f"{n}_contributions" for n in CONTRIBUTION_COUNTS]
+)
+
+
+@by_contributions
+async def test_get_wishlist_public_cold(benchmark, client, wishlist):
+    """Промах кэша: запрос списка и агрегированных товаров в БД, сериализация ответа."""
+    url = f"/api/wishlists/s/{wishlist.slug}"
+
+    async def get_cold():
+        public_cache.clear()
+        return await client.get(url)
+
+    r = await benchmark(get_cold)
+    assert r.status_code == 200 and len(r.json()["items"]) == ITEMS_PER_WISHLIST
+
+
+async def test_get_wishlist_public_cached(benchmark, client, wishlist):
+    """Попадание в кэш публичного снимка — основной путь популярного списка."""
+    r = await benchmark(client.get, f"/api/wishlists/s/{wishlist.slug}")
+    assert r.status_code == 200
+
+
+@by_contributions
+async def test_get_wishlist_public_dict(benchmark, db, wishlist):
+    """Снимок для WebSocket-рассылки (BroadcastScheduler загружает его на каждое изменение)."""
+    data = await benchmark(get_wishlist_public_dict, wishlist.slug, db)
+    assert len(data["items"]) == ITEMS_PER_WISHLIST
+
+
+async def _items_selectinload(wishlist_id: int, db) -> list[Decimal]:
+    """Путь до агрегирующего запроса: ORM-объект на каждый вклад ради одной суммы на товар."""
+    db.expunge_all()  # иначе selectinload отдаст уже загруженные объекты из identity map
+    wishlist = (
+        await db.execute(
+            select(Wishlist)
+            .where(Wishlist.id == wishlist_id)
+            .options(
+                selectinload(Wishlist.items).selectinload(WishlistItem.contributions),
+                selectinload(Wishlist.items).selectinload(WishlistItem.reservation),
+            )
+        )
+    ).scalar_one()
+    return [sum((c.amount for c in item.contributions), Decimal("0")) for item in wishlist.items]
+
+
+async def _items_aggregated(wishlist_id: int, db) -> list[Decimal]:
+    return [item.total_contributed for item in await get_items_aggregated(wishlist_id, db)]
+
+
+@by_contributions
+@pytest.mark.parametrize("path", ["selectinload", "aggregated"])
+async def test_public_items(benchmark, db, wishlist, path):
+    """Товары публичного списка: суммы вкладов обоими путями совпадают, сравнивается время."""
+    fn = _items_selectinload if path == "selectinload" else _items_aggregated
+    totals = await benchmark(fn, wishlist.id, db)
+    assert totals == await _items_aggregated(wishlist.id, db)
+
+
+def _items() -> list[WishlistItem]:
+    now = datetime.utcnow()
+    items = []
+    for n in range(ITEMS_PER_WISHLIST):
+        item = WishlistItem(
+            id=n + 1,
+            wishlist_id=1,
+            title=f"Товар {n}",
+            link=f"https://shop.example.com/p/{n}",
+            price=Decimal("100000"),
+            sort_order=n,
+            total_contributed=Decimal("5000") if n % 2 else Decimal("0"),
+            created_at=now,
+        )
+        item.reservation = Reservation(reserver_name="Маша") if n % 5 == 0 else None
+        items.append(item)
+    return items
+
+
+async def test_item_to_response(benchmark):
+    """Ответ по товарам списка из ORM-объектов (ручки владельца, поштучные изменения)."""
+    items = _items()
+    responses = await benchmark(lambda: [item_to_response(i) for i in items])
+    assert sum(r.is_reserved for r in responses) == ITEMS_PER_WISHLIST // 5
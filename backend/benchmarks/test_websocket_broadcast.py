@@ -0,0 +1,64 @@
+"""Рассылка изменений списка подписчикам: diff снимков, сериализация и доставка через очереди писателей."""
+import asyncio
+
+import pytest
+
+from app.services.websocket import ConnectionManager
+
+SUBSCRIBERS = 100
+ITEMS = 20
+
+
+class CountingWebSocket:
+    """Считает отправленные сообщения, ничего не сериализуя повторно."""
+
+    sent = 0
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        CountingWebSocket.sent += 1
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        pass
+
+
+def _snapshot(collected: int) -> dict:
+    items = [
+        {"id": n, "title": f"Товар {n}", "price": "100000", "is_reserved": False, "total_contributed": "0"}
+        for n in range(ITEMS)
+    ]
+    items[0]["total_contributed"] = str(collected)
+    return {"id": 1, "title": "Список", "slug": "bench", "currency": "RUB", "items": items}
+
+
+@pytest.fixture
+async def manager():
+    manager = ConnectionManager(queue_size=32)
+    sockets = [CountingWebSocket() for _ in range(SUBSCRIBERS)]
+    for ws in sockets:
+        assert await manager.connect(ws, "bench")
+    yield manager
+    await asyncio.sleep(0.01)  # писатели завершают последнюю отправку, иначе отмена теряется в wait_for
+    for ws in sockets:
+        await manager.disconnect(ws, "bench")
+    await asyncio.sleep(0.01)
+
+
+async def test_broadcast_wishlist(benchmark, manager):
+    """Один вклад в товар на списке со SUBSCRIBERS подписчиками — до доставки всем."""
+    await manager.broadcast_wishlist("bench", _snapshot(0))
+    snapshots = [_snapshot(100), _snapshot(200)]
+    calls = 0
+
+    async def broadcast_and_deliver():
+        nonlocal calls
+        target = CountingWebSocket.sent + SUBSCRIBERS
+        assert await manager.broadcast_wishlist("bench", snapshots[calls % 2])
+        calls += 1
+        while CountingWebSocket.sent < target:
+            await asyncio.sleep(0)
+
+    await benchmark(broadcast_and_deliver)
+    assert manager.downgrades == 0 and manager.evictions == 0
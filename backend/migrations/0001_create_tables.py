@@ -0,0 +1,12 @@
+"""
+Миграция: таблицы, которых ещё нет в БД, — по моделям (как раньше делал init_db при старте).
+БД до появления schema_migrations могла быть создана старой версией приложения без части
+таблиц; последующие ALTER рассчитывают, что таблицы уже есть.
+"""
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.base import Base
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,4 @@
+-- Миграция: добавить поля occasion и event_date в wishlists
+
+ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS occasion VARCHAR(255) NULL;
+ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS event_date DATE NULL;
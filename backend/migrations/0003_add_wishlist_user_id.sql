@@ -1,6 +1,5 @@
 -- Миграция: привязка вишлистов к пользователю
 -- user_id — владелец (если был залогинен при создании)
--- Выполнить один раз. При повторном запуске ADD COLUMN IF NOT EXISTS безопасен.
 
 ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS user_id INTEGER NULL;
 ALTER TABLE wishlists DROP CONSTRAINT IF EXISTS fk_wishlists_user_id;
@@ -1,5 +1,4 @@
--- Колонки для сброса пароля (users). Выполнить один раз.
--- init_db() тоже добавляет их при старте приложения.
+-- Миграция: колонки для сброса пароля (users)
 
 ALTER TABLE users ADD COLUMN IF NOT EXISTS password_reset_token VARCHAR(255) NULL;
 ALTER TABLE users ADD COLUMN IF NOT EXISTS password_reset_expires TIMESTAMP NULL;
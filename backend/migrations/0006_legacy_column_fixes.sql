@@ -0,0 +1,12 @@
+-- Миграция: изменения схемы, которые раньше init_db() пытался применить при каждом старте
+-- и для которых не было отдельного файла.
+
+-- Суммы до 10^16 (было NUMERIC(10, 2))
+ALTER TABLE wishlist_items ALTER COLUMN price TYPE NUMERIC(18, 2);
+ALTER TABLE contributions ALTER COLUMN amount TYPE NUMERIC(18, 2);
+
+-- Аватар пользователя
+ALTER TABLE users ADD COLUMN IF NOT EXISTS avatar_url VARCHAR(2048) NULL;
+
+-- Вход через Google: у таких пользователей нет пароля
+ALTER TABLE users ALTER COLUMN hashed_password DROP NOT NULL;
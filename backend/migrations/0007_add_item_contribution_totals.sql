@@ -0,0 +1,15 @@
+-- Миграция: денормализованные итоги вкладов по товару
+-- total_contributed / contributions_count обновляются в contribute_item и cancel_contribution.
+-- Существующие итоги заполняются здесь же; сверка позже — python -m app.services.reconcile.
+
+ALTER TABLE wishlist_items ADD COLUMN IF NOT EXISTS total_contributed NUMERIC(18, 2) NOT NULL DEFAULT 0;
+ALTER TABLE wishlist_items ADD COLUMN IF NOT EXISTS contributions_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE wishlist_items wi
+SET total_contributed = c.total, contributions_count = c.cnt
+FROM (
+  SELECT wishlist_item_id, SUM(amount) AS total, COUNT(*) AS cnt
+  FROM contributions
+  GROUP BY wishlist_item_id
+) c
+WHERE c.wishlist_item_id = wi.id;
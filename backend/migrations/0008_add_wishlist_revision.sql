@@ -0,0 +1,5 @@
+-- Миграция: ревизия списка для ETag / Last-Modified
+-- revision увеличивается при каждом изменении списка (товары, резервации, вклады).
+
+ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS revision INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NULL;
@@ -0,0 +1,15 @@
+-- Миграция: кэш метаданных товара для POST /api/wishlists/fetch-product
+-- Ключ — sha256 канонического URL (без utm_*, gclid и т.п.).
+
+CREATE TABLE IF NOT EXISTS product_cache (
+    url_hash VARCHAR(64) PRIMARY KEY,
+    url TEXT NOT NULL,
+    title VARCHAR(500) NULL,
+    image_url VARCHAR(2048) NULL,
+    price NUMERIC(18, 2) NULL,
+    error TEXT NULL,
+    fetched_at TIMESTAMP NOT NULL DEFAULT now(),
+    fresh_until TIMESTAMP NOT NULL,
+    stale_until TIMESTAMP NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_product_cache_stale_until ON product_cache(stale_until);
@@ -0,0 +1,5 @@
+-- Миграция: индекс по creator_secret — по нему каждая ручка редактирования находит список
+-- (раньше — последовательное сканирование wishlists).
+-- CONCURRENTLY не блокирует запись в wishlists; app.db.migrate выполняет такие файлы вне транзакции.
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_wishlists_creator_secret ON wishlists(creator_secret);
@@ -0,0 +1,19 @@
+-- Миграция: индексы под частые запросы (см. __table_args__ в app/models).
+-- CONCURRENTLY не блокирует запись; app.db.migrate выполняет такие файлы вне транзакции.
+-- Проверка плана — tests/test_indexes.py.
+
+-- Товары списка в порядке отображения; MAX(sort_order) при добавлении товара
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_wishlist_items_wishlist_id_sort_order
+    ON wishlist_items (wishlist_id, sort_order);
+
+-- Вклады товара: selectinload, каскадное удаление, пересчёт итогов (сумма — index-only scan)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contributions_wishlist_item_id
+    ON contributions (wishlist_item_id) INCLUDE (amount);
+
+-- «Мои списки» постранично: WHERE user_id ORDER BY created_at DESC, id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_wishlists_user_id_created_at_id
+    ON wishlists (user_id, created_at, id);
+
+-- Ключ создателя — в каждой ручке редактирования (уже есть, если применена 0010)
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_wishlists_creator_secret
+    ON wishlists (creator_secret);
@@ -5,6 +5,10 @@ import os
 
 # Должно быть до импорта app (config читает DATABASE_URL при загрузке)
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+# Минимальная стоимость bcrypt — тесты не проверяют стойкость хэшей
+os.environ["PASSWORD_HASH_ROUNDS"] = "4"
+# Разбор страниц товара — прямо в event loop, без пула процессов
+os.environ["PRODUCT_PARSE_WORKERS"] = "0"
 
 import pytest
 from httpx import ASGITransport, AsyncClient
@@ -12,6 +16,9 @@ from sqlalchemy import text
 
 from app.db.session import async_session, engine, init_db
 from app.main import app
+from app.services.cache import public_cache
+from app.services.principal_cache import principal_cache
+from app.services.product_cache import product_cache
 
 
 @pytest.fixture(autouse=True)
@@ -25,6 +32,10 @@ async def clean_db():
         await conn.execute(text("DELETE FROM wishlists"))
         await conn.execute(text("DELETE FROM items"))
         await conn.execute(text("DELETE FROM users"))
+        await conn.execute(text("DELETE FROM product_cache"))
+    public_cache.clear()
+    principal_cache.clear()
+    product_cache.clear_memory()
     yield
 
 
@@ -85,6 +85,56 @@ async def test_me_unauthorized(client: AsyncClient):
     assert r.status_code == 401
 
 
+@pytest.mark.asyncio
+async def test_me_uses_principal_cache_and_update_invalidates(client: AsyncClient):
+    """Повторный /me берёт пользователя из кэша; PATCH /me сбрасывает кэш — новый аватар виден сразу."""
+    from app.services.principal_cache import principal_cache
+
+    reg_r = await client.post(
+        "/api/auth/register",
+        json={"email": "cached@example.com", "password": "secret12"},
+    )
+    headers = {"Authorization": f"Bearer {reg_r.json()['access_token']}"}
+
+    await client.get("/api/auth/me", headers=headers)
+    hits = principal_cache.hits
+    r = await client.get("/api/auth/me", headers=headers)
+    assert r.status_code == 200
+    assert principal_cache.hits == hits + 1
+
+    r = await client.patch("/api/auth/me", json={"avatar_url": "https://example.com/a.png"}, headers=headers)
+    assert r.status_code == 200
+    r = await client.get("/api/auth/me", headers=headers)
+    assert r.json()["avatar_url"] == "https://example.com/a.png"
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_not_cached(client: AsyncClient):
+    """Невалидный токен — 401, в кэш не попадает; для optional-авторизации — как аноним."""
+    from app.services.principal_cache import principal_cache
+
+    headers = {"Authorization": "Bearer not-a-jwt"}
+    assert (await client.get("/api/auth/me", headers=headers)).status_code == 401
+    assert principal_cache.stats()["size"] == 0
+    r = await client.post("/api/wishlists", json={"title": "Anon"}, headers=headers)
+    assert r.status_code == 200
+
+
+def test_principal_cache_rejects_snapshot_loaded_before_invalidation():
+    """Снимок, прочитанный до инвалидации пользователя, в кэш не кладётся."""
+    from app.services.principal_cache import Principal, PrincipalCache
+
+    cache = PrincipalCache(ttl_seconds=60)
+    principal = Principal(id=1, email="a@example.com", created_at=datetime(2024, 1, 1))
+    version = cache.version()
+    cache.invalidate_user(1)
+    assert cache.put("tok", version, principal) is False
+    assert cache.put("tok", cache.version(), principal) is True
+    assert cache.get("tok") == principal
+    cache.invalidate_user(1)
+    assert cache.get("tok") is None
+
+
 # --- Восстановление пароля (forgot-password / reset-password) ---
 
 
@@ -252,3 +302,38 @@ async def test_reset_password_expired_token(client: AsyncClient, db_session):
     )
     assert r.status_code == 400
     assert "detail" in r.json()
+
+
+# --- bcrypt в пуле потоков ---
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_password_with_new_cost(client: AsyncClient, db_session):
+    """Хэш со старой стоимостью bcrypt при успешном входе пересчитывается с текущей."""
+    from passlib.context import CryptContext
+
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("oldcost12")
+    db_session.add(User(email="rehash@example.com", hashed_password=old_hash))
+    await db_session.commit()
+
+    r = await client.post("/api/auth/login", json={"email": "rehash@example.com", "password": "oldcost12"})
+    assert r.status_code == 200
+
+    db_session.expire_all()
+    user = (await db_session.execute(select(User).where(User.email == "rehash@example.com"))).scalar_one()
+    assert user.hashed_password != old_hash
+    assert user.hashed_password.startswith("$2b$04$")
+    r = await client.post("/api/auth/login", json={"email": "rehash@example.com", "password": "oldcost12"})
+    assert r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_busy_returns_503(client: AsyncClient, monkeypatch):
+    """Переполненная очередь bcrypt — 503 с Retry-After, а не бесконечное ожидание."""
+    from app.core.security import password_hasher
+
+    monkeypatch.setattr(password_hasher, "max_queue", 0)
+    r = await client.post("/api/auth/register", json={"email": "busy@example.com", "password": "secret12"})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+    assert password_hasher.stats()["rejected"] >= 1
@@ -87,3 +87,122 @@ async def test_manage_response_has_no_contributor_details(client: AsyncClient):
     assert item["total_contributed"] == 300 or float(item["total_contributed"]) == 300
     assert "contributor_name" not in item
     assert "contributions" not in item
+
+
+@pytest.mark.asyncio
+async def test_public_view_sums_contributions_per_item(client: AsyncClient):
+    """Публичный вид: total_contributed — сумма всех вкладов товара, is_reserved не путается между товарами."""
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    slug = create_r.json()["slug"]
+    creator_secret = create_r.json()["creator_secret"]
+    first = await client.post(
+        f"/api/wishlists/m/{creator_secret}/items",
+        json={"title": "Складчина", "price": 1000},
+    )
+    second = await client.post(
+        f"/api/wishlists/m/{creator_secret}/items",
+        json={"title": "Резерв"},
+    )
+    for amount in (100, 250, 50):
+        await client.post(
+            f"/api/wishlists/s/{slug}/items/{first.json()['id']}/contribute",
+            json={"contributor_name": "Маша", "amount": amount},
+        )
+    await client.post(
+        f"/api/wishlists/s/{slug}/items/{second.json()['id']}/reserve",
+        json={"reserver_name": "Петя"},
+    )
+
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    assert r.status_code == 200
+    items = r.json()["items"]
+    assert [i["title"] for i in items] == ["Складчина", "Резерв"]
+    assert float(items[0]["total_contributed"]) == 400
+    assert items[0]["is_reserved"] is False
+    assert float(items[1]["total_contributed"]) == 0
+    assert items[1]["is_reserved"] is True
+
+
+@pytest.mark.asyncio
+async def test_cancel_contribution_updates_total(client: AsyncClient):
+    """Отмена вклада уменьшает total_contributed товара — сумма снова доступна для вкладов."""
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    slug = create_r.json()["slug"]
+    creator_secret = create_r.json()["creator_secret"]
+    add_r = await client.post(
+        f"/api/wishlists/m/{creator_secret}/items",
+        json={"title": "Подарок", "price": 1000},
+    )
+    item_id = add_r.json()["id"]
+    contrib_r = await client.post(
+        f"/api/wishlists/s/{slug}/items/{item_id}/contribute",
+        json={"contributor_name": "Маша", "amount": 1000},
+    )
+    await client.delete(f"/api/contributions/{contrib_r.json()['contributor_secret']}")
+
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    assert float(r.json()["items"][0]["total_contributed"]) == 0
+    r = await client.post(
+        f"/api/wishlists/s/{slug}/items/{item_id}/contribute",
+        json={"contributor_name": "Петя", "amount": 1000},
+    )
+    assert r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_cancel_contribution_twice_decrements_once(client: AsyncClient):
+    """
+    Повторная отмена того же вклада — 404, сумма товара уменьшается один раз. Итог меняет только
+    запрос, чей DELETE вернул строку; в тестовой SQLite все сессии делят одно соединение, поэтому
+    одновременные отмены здесь не воспроизвести — проверяем повтор.
+    """
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    slug = create_r.json()["slug"]
+    creator_secret = create_r.json()["creator_secret"]
+    add_r = await client.post(f"/api/wishlists/m/{creator_secret}/items", json={"title": "Подарок", "price": 1000})
+    item_id = add_r.json()["id"]
+    for name, amount in (("Маша", 300), ("Петя", 200)):
+        contrib_r = await client.post(
+            f"/api/wishlists/s/{slug}/items/{item_id}/contribute",
+            json={"contributor_name": name, "amount": amount},
+        )
+    contributor_secret = contrib_r.json()["contributor_secret"]
+
+    first = await client.delete(f"/api/contributions/{contributor_secret}")
+    second = await client.delete(f"/api/contributions/{contributor_secret}")
+    assert (first.status_code, second.status_code) == (204, 404)
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    assert float(r.json()["items"][0]["total_contributed"]) == 300
+
+
+@pytest.mark.asyncio
+async def test_reconcile_item_totals(client: AsyncClient, db_session):
+    """reconcile_item_totals восстанавливает итоги товара из таблицы contributions."""
+    from sqlalchemy import text
+
+    from app.services.reconcile import reconcile_item_totals
+
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    slug = create_r.json()["slug"]
+    creator_secret = create_r.json()["creator_secret"]
+    add_r = await client.post(
+        f"/api/wishlists/m/{creator_secret}/items",
+        json={"title": "Подарок", "price": 1000},
+    )
+    item_id = add_r.json()["id"]
+    for amount in (300, 200):
+        await client.post(
+            f"/api/wishlists/s/{slug}/items/{item_id}/contribute",
+            json={"contributor_name": "Маша", "amount": amount},
+        )
+
+    await db_session.execute(
+        text("UPDATE wishlist_items SET total_contributed = 0, contributions_count = 0 WHERE id = :id"),
+        {"id": item_id},
+    )
+    assert await reconcile_item_totals(db_session) == 1
+    assert await reconcile_item_totals(db_session) == 0
+    await db_session.commit()
+
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    assert float(r.json()["items"][0]["total_contributed"]) == 500
@@ -1,5 +1,14 @@
-"""Тесты парсинга метаданных товара по HTML (Open Graph, schema.org)."""
+"""Тесты парсинга метаданных товара по HTML (Open Graph, schema.org) и кэша fetch_product."""
+import asyncio
+import time
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from app.services import fetch_product as fp
 from app.services.fetch_product import parse_product_page
+from app.services.product_cache import canonical_url, product_cache, url_key
 
 
 def test_parse_og_title_image_price():
@@ -92,3 +101,263 @@ def test_parse_empty_html():
     assert out["title"] is None or out["title"] == ""
     assert out["image_url"] is None
     assert out["price"] is None
+
+
+# --- Кэш fetch_product ---
+
+
+def _counting_fetcher(monkeypatch, result=None, error=None):
+    calls = []
+
+    async def fake(url: str) -> dict:
+        calls.append(url)
+        if error is not None:
+            raise error
+        return dict(result)
+
+    monkeypatch.setattr(fp, "fetch_product_uncached", fake)
+    return calls
+
+
+def test_canonical_url_strips_tracking():
+    """utm_*, gclid и фрагмент отбрасываются, хост в нижнем регистре, параметры товара сортируются."""
+    assert (
+        canonical_url("Shop.Example.com:443/p/1?utm_source=tg&sku=2&gclid=x&color=red#reviews")
+        == "https://shop.example.com/p/1?color=red&sku=2"
+    )
+    assert canonical_url("http://shop.example.com:8080") == "http://shop.example.com:8080/"
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_served_from_memory_then_db(monkeypatch):
+    """Повтор (в т.ч. с другими utm-метками) не ходит в магазин; после сброса памяти — берётся из БД."""
+    calls = _counting_fetcher(monkeypatch, {"title": "Cached", "image_url": None, "price": Decimal("10.00")})
+
+    first = await fp.fetch_product("https://shop.example.com/p/1?utm_source=a")
+    second = await fp.fetch_product("https://shop.example.com/p/1?utm_source=b")
+    assert first == second
+    assert calls == ["https://shop.example.com/p/1"]
+
+    product_cache.clear_memory()
+    third = await fp.fetch_product("https://shop.example.com/p/1")
+    assert third["title"] == "Cached" and third["price"] == Decimal("10.00")
+    assert len(calls) == 1
+    assert product_cache.stats()["db_hits"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_product_cache_truncates_long_fields_to_columns(monkeypatch):
+    """title и image_url обрезаются по длине колонок: запись сохраняется в БД, а не только в памяти."""
+    long_image = "https://cdn.example.com/" + "i" * 3000
+    _counting_fetcher(monkeypatch, {"title": "T" * 600, "image_url": long_image, "price": None})
+
+    await fp.fetch_product("https://shop.example.com/p/long")
+    product_cache.clear_memory()
+    cached = await fp.fetch_product("https://shop.example.com/p/long")
+    assert len(cached["title"]) == 500
+    assert cached["image_url"] == long_image[:2048]
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_negative_caching(monkeypatch):
+    """403 кэшируется: повтор отдаёт ту же ошибку без запроса к магазину."""
+    calls = _counting_fetcher(monkeypatch, error=fp.ProductFetchBlocked("403"))
+    for _ in range(2):
+        with pytest.raises(ValueError, match="403"):
+            await fp.fetch_product("https://blocked.example.com/p")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_stale_while_revalidate(monkeypatch):
+    """Устаревшая запись отдаётся сразу, обновление идёт в фоне."""
+    calls = _counting_fetcher(monkeypatch, {"title": "New", "image_url": None, "price": None})
+    url = "https://shop.example.com/p/stale"
+    now = time.time()
+    stale = product_cache.positive({"title": "Old", "image_url": None, "price": None}, now=now - 10)
+    stale.fresh_until = now - 1
+    await product_cache.put(url_key(canonical_url(url)), canonical_url(url), stale)
+
+    assert (await fp.fetch_product(url))["title"] == "Old"
+    await asyncio.gather(*fp._inflight.values())
+    assert calls == [url]
+    assert (await fp.fetch_product(url))["title"] == "New"
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_single_flight(monkeypatch):
+    """Одновременные запросы одного URL (с разными метками) ждут одну загрузку."""
+    release = asyncio.Event()
+    calls = []
+
+    async def slow(url: str) -> dict:
+        calls.append(url)
+        await release.wait()
+        return {"title": "Once", "image_url": None, "price": None}
+
+    monkeypatch.setattr(fp, "fetch_product_uncached", slow)
+    tasks = [
+        asyncio.create_task(fp.fetch_product(f"https://shop.example.com/p/hot?utm_campaign={n}"))
+        for n in range(5)
+    ]
+    await asyncio.sleep(0.01)
+    release.set()
+    results = await asyncio.gather(*tasks)
+    assert len(calls) == 1
+    assert all(r["title"] == "Once" for r in results)
+
+
+@pytest.mark.asyncio
+async def test_scrape_limiter_per_host_and_total():
+    """Не больше per_host загрузок на хост и max_total всего."""
+    limiter = fp.ScrapeLimiter(max_total=3, per_host=2)
+    active: dict[str, int] = {}
+    peak = {"a": 0, "b": 0, "c": 0, "total": 0}
+
+    async def job(host: str) -> None:
+        async with limiter.slot(host):
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak[host], active[host])
+            peak["total"] = max(peak["total"], sum(active.values()))
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+
+    await asyncio.gather(*(job(h) for h in "aaaabbbbcc"))
+    assert peak["a"] <= 2 and peak["b"] <= 2 and peak["c"] <= 2
+    assert peak["total"] == 3
+    assert limiter.stats() == {"active": 0, "waiting": 0, "hosts": 0}
+
+
+# --- Потоковый сканер ---
+
+_PAGES = [
+    """<html><head><meta property="og:title" content="OG &amp; Co">
+    <meta property="og:image" content="/img/1.jpg"><title>T</title></head><body></body></html>""",
+    """<html><head><title> Only title </title></head><body>
+    <script type="application/ld+json">[{"@type": "Offer"}, {"@type": "Product", "name": "LD",
+    "image": ["https://ld.com/a.png"], "offers": [{"price": "12.5"}]}]</script></body></html>""",
+    """<html><head><meta name="twitter:title" content="TW"><meta property="product:price:amount" content="1 299,00">
+    <script type="application/ld+json">{"@type": "Product", "name": "Ignored", "image": "rel.png"}</script>
+    </head><body><script type="application/ld+json">[{"@type": "Thing"}]</script></body></html>""",
+    "<html><head></head><body><p>nothing</p></body></html>",
+]
+
+
+@pytest.mark.parametrize("html", _PAGES)
+def test_scanner_matches_parse_product_page(html):
+    """Потоковый сканер даёт тот же результат, что и разбор через BeautifulSoup."""
+    base = "https://shop.example.com/p/1"
+    assert fp.scan_product_page(html, base, chunk_size=7) == parse_product_page(html, base)
+
+
+def test_scanner_stops_after_head_metadata():
+    """Когда Open Graph дал все поля, тело страницы не дочитывается."""
+    head = (
+        '<html><head><meta property="og:title" content="Fast"><meta property="og:image" content="https://x/i.jpg">'
+        '<meta property="og:price:amount" content="5"></head><body>'
+    )
+    scanner = fp.ProductMetaScanner("https://x/")
+    scanner.feed(head)
+    assert scanner.done
+    assert scanner.result() == {"title": "Fast", "image_url": "https://x/i.jpg", "price": Decimal("5")}
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_uncached_streams_and_stops_early(monkeypatch):
+    """Из потока читаются только первые куски: после <head> с JSON-LD Product загрузка прекращается."""
+    from app.services.http_clients import SHOPS, http_clients
+
+    consumed = []
+
+    async def body():
+        yield (
+            b'<html><head><script type="application/ld+json">{"@type": "Product", "name": "Streamed"}</script>'
+            b"</head><body>"
+        )
+        for n in range(100):
+            consumed.append(n)
+            yield b"<p>" + b"x" * 10_000 + b"</p>"
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=body())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_clients._clients, SHOPS, client)
+    try:
+        result = await fp.fetch_product_uncached("https://stream.example.com/p")
+    finally:
+        await client.aclose()
+    assert result["title"] == "Streamed"
+    assert len(consumed) <= 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_uncached_stops_after_json_ld_in_body(monkeypatch):
+    """JSON-LD в начале тела: разбор повторяется по мере загрузки, и мегабайт страницы не докачивается."""
+    from app.services.http_clients import SHOPS, http_clients
+
+    consumed = []
+
+    async def body():
+        yield b"<html><head><title>Fallback</title></head><body>"
+        yield b'<script type="application/ld+json">{"@type": "Product", "name": "Early"}</script>'
+        for n in range(100):
+            consumed.append(n)
+            yield b"<p>" + b"x" * 10_000 + b"</p>"
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=body())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_clients._clients, SHOPS, client)
+    try:
+        result = await fp.fetch_product_uncached("https://body.example.com/p")
+    finally:
+        await client.aclose()
+    assert result["title"] == "Early"
+    assert len(consumed) <= fp.FETCH_RECHECK_BYTES // 10_000 + 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_uncached_reads_body_when_head_is_not_enough(monkeypatch):
+    """Без метаданных в <head> страница дочитывается и разбирается целиком (JSON-LD в конце тела)."""
+    from app.services.http_clients import SHOPS, http_clients
+
+    async def body():
+        yield b"<html><head><title>Fallback</title></head><body>"
+        yield b"<p>" + b"x" * 50_000 + b"</p>"
+        yield b'<script type="application/ld+json">{"@type": "Product", "name": "Late", "offers": {"price": 7}}</script>'
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=body())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_clients._clients, SHOPS, client)
+    try:
+        result = await fp.fetch_product_uncached("https://late.example.com/p")
+    finally:
+        await client.aclose()
+    assert result == {"title": "Late", "image_url": None, "price": Decimal("7")}
+
+
+def test_parse_page_bytes_limits():
+    """Лимит размера: всё после max_bytes не разбирается; кодировка применяется в воркере."""
+    html = '<html><head><title>Привет</title></head><body>'.encode("cp1251") + b"x" * 100
+    result, done = fp.parse_page_bytes(html, "cp1251", "https://x/", max_bytes=len(html), time_limit=1.0)
+    assert result["title"] == "Привет" and not done
+    late = html + b'<script type="application/ld+json">{"@type": "Product", "name": "Cut"}</script>'
+    result, _ = fp.parse_page_bytes(late, "cp1251", "https://x/", max_bytes=len(html), time_limit=1.0)
+    assert result["title"] == "Привет"
+
+
+@pytest.mark.asyncio
+async def test_parse_pool_runs_in_worker_process():
+    """С workers > 0 разбор идёт в отдельном процессе и возвращает тот же результат."""
+    pool = fp.ParsePool(workers=1, max_bytes=1_000_000, time_limit=5.0)
+    try:
+        page = bytearray(b'<html><head><meta property="og:title" content="Worker"></head></html>')
+        result, _ = await pool.parse(page, "utf-8", "https://x/")
+    finally:
+        pool.shutdown()
+    assert result["title"] == "Worker"
+    assert pool.stats()["jobs"] == 1
@@ -27,3 +27,37 @@ async def test_root(client: AsyncClient):
     r = await client.get("/")
     assert r.status_code == 200
     assert "message" in r.json()
+
+
+@pytest.mark.asyncio
+async def test_internal_metrics(client: AsyncClient, monkeypatch):
+    """Метрики отдают состояние пула и кэша; без METRICS_TOKEN ручки нет, с ним без заголовка — 403."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "metrics_token", None)
+    assert (await client.get("/api/internal/metrics")).status_code == 404
+
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+    assert (await client.get("/api/internal/metrics")).status_code == 403
+    r = await client.get("/api/internal/metrics", headers={"X-Metrics-Token": "s3cret"})
+    assert r.status_code == 200
+    data = r.json()
+    assert "wait_seconds" in data["db_pool"]
+    assert {"public_cache", "websocket", "broadcast", "event_bus"} <= data.keys()
+
+
+def test_engine_options_postgres_only(monkeypatch):
+    """Настройки пула применяются только к Postgres; в режиме PgBouncer кэш prepared statements выключен."""
+    from app.core.config import settings
+    from app.db.session import InstrumentedQueuePool, engine_options
+
+    assert engine_options("sqlite+aiosqlite:///:memory:") == {}
+    opts = engine_options("postgresql+asyncpg://localhost/db")
+    assert opts["poolclass"] is InstrumentedQueuePool
+    assert opts["pool_size"] == settings.db_pool_size
+    assert opts["connect_args"]["statement_cache_size"] == settings.db_statement_cache_size
+
+    monkeypatch.setattr(settings, "db_pgbouncer", True)
+    args = engine_options("postgresql+asyncpg://localhost/db")["connect_args"]
+    assert args["statement_cache_size"] == 0 and args["prepared_statement_cache_size"] == 0
+    assert args["prepared_statement_name_func"]() != args["prepared_statement_name_func"]()
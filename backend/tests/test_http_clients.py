@@ -0,0 +1,59 @@
+"""Общие httpx-клиенты: переиспользование между запросами и закрытие при остановке."""
+import httpx
+import pytest
+
+from app.services.fetch_product import fetch_product
+from app.services.http_clients import SHOPS, HttpClientRegistry, http_clients
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_client_until_closed():
+    """Один клиент на сервис; после aclose() get() создаёт новый."""
+    registry = HttpClientRegistry()
+    client = registry.get(SHOPS)
+    assert registry.get(SHOPS) is client
+    await registry.aclose()
+    assert client.is_closed
+    assert registry.get(SHOPS) is not client
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_shops_client_discards_cookies():
+    """Общий клиент магазинов не запоминает Set-Cookie — состояние не переходит между пользователями."""
+    registry = HttpClientRegistry()
+    client = registry.get(SHOPS)
+    response = httpx.Response(
+        200,
+        headers={"set-cookie": "session=abc; Path=/"},
+        request=httpx.Request("GET", "https://shop.example.com/p/1"),
+    )
+    client.cookies.extract_cookies(response)
+    assert len(client.cookies.jar) == 0
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_product_uses_shared_client(monkeypatch):
+    """fetch_product ходит через общий клиент магазинов с браузерными заголовками и Referer."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/html; charset=utf-8"},
+            text='<html><head><meta property="og:title" content="Shared"></head></html>',
+        )
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_clients._clients, SHOPS, client)
+    try:
+        first = await fetch_product("https://shop.example.com/p/1")
+        await fetch_product("https://shop.example.com/p/2")
+    finally:
+        await client.aclose()
+    assert first["title"] == "Shared"
+    assert len(seen) == 2
+    assert seen[0].headers["referer"] == "https://shop.example.com/"
+    assert "Mozilla" in seen[0].headers["user-agent"]
@@ -0,0 +1,105 @@
+"""
+Планы частых запросов: запросы, которые реально выполняют ручки, прогоняются через
+EXPLAIN QUERY PLAN (SQLite) — ни один не должен читать горячие таблицы целиком.
+"""
+import re
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.db.session import engine
+from app.models import Contribution
+
+HOT_TABLES = ("wishlists", "wishlist_items", "contributions", "reservations")
+_FULL_SCAN = re.compile(rf"^SCAN ({'|'.join(HOT_TABLES)})$")
+
+
+async def _seed(client: AsyncClient) -> tuple[dict, dict, list[int]]:
+    """Пользователь с несколькими списками; в последнем — товары, вклады и резервация."""
+    reg = await client.post("/api/auth/register", json={"email": "plans@example.com", "password": "secret12"})
+    headers = {"Authorization": f"Bearer {reg.json()['access_token']}"}
+    for n in range(3):
+        await client.post("/api/wishlists", json={"title": f"Старый {n}"}, headers=headers)
+    wishlist = (await client.post("/api/wishlists", json={"title": "Список"}, headers=headers)).json()
+    r = await client.post(
+        f"/api/wishlists/m/{wishlist['creator_secret']}/items/batch",
+        json={"ops": [{"op": "create", "title": f"Товар {n}", "price": 1000} for n in range(20)]},
+    )
+    ids = [i["id"] for i in r.json()["items"]]
+    for item_id in ids[:5]:
+        await client.post(
+            f"/api/wishlists/s/{wishlist['slug']}/items/{item_id}/contribute",
+            json={"contributor_name": "Петя", "amount": 100},
+        )
+    await client.post(f"/api/wishlists/s/{wishlist['slug']}/items/{ids[5]}/reserve", json={"reserver_name": "Маша"})
+    return headers, wishlist, ids
+
+
+async def _explain_hot_paths(client: AsyncClient, db_session) -> list[tuple[str, list[str]]]:
+    headers, wishlist, ids = await _seed(client)
+    secret, slug = wishlist["creator_secret"], wishlist["slug"]
+    statements: list[tuple[str, tuple]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        await client.get(f"/api/wishlists/m/{secret}")
+        await client.get(f"/api/wishlists/s/{slug}")
+        await client.post(f"/api/wishlists/m/{secret}/items", json={"title": "Ещё"})
+        await client.patch(f"/api/wishlists/m/{secret}/items/{ids[1]}", json={"title": "Другое"})
+        await client.delete(f"/api/wishlists/m/{secret}/items/{ids[0]}")
+        page = (await client.get("/api/wishlists/mine/summary", params={"limit": 2}, headers=headers)).json()
+        await client.get(
+            "/api/wishlists/mine/summary", params={"limit": 2, "cursor": page["next_cursor"]}, headers=headers
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    conn = await db_session.connection()
+    plans = []
+    for statement, parameters in statements:
+        rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)).all()
+        plans.append((" ".join(statement.split()), [row[-1] for row in rows]))
+    return plans
+
+
+def _plans_for(plans: list[tuple[str, list[str]]], pattern: str) -> list[list[str]]:
+    found = [plan for sql, plan in plans if re.search(pattern, sql)]
+    assert found, f"запрос не выполнялся: {pattern}"
+    return found
+
+
+@pytest.mark.asyncio
+async def test_hot_queries_use_indexes(client: AsyncClient, db_session):
+    """Ни одна ручка редактирования/просмотра не сканирует горячие таблицы целиком."""
+    plans = await _explain_hot_paths(client, db_session)
+    full_scans = [(sql, line) for sql, plan in plans for line in plan if _FULL_SCAN.match(line)]
+    assert not full_scans
+
+    for plan in _plans_for(plans, r"WHERE wishlists\.creator_secret = \?"):
+        assert any("ix_wishlists_creator_secret" in line for line in plan)
+    for plan in _plans_for(plans, r"SELECT max\(wishlist_items\.sort_order\)"):
+        assert any("COVERING INDEX ix_wishlist_items_wishlist_id_sort_order" in line for line in plan)
+    for plan in _plans_for(plans, r"DELETE FROM contributions WHERE contributions\.wishlist_item_id"):
+        assert any("ix_contributions_wishlist_item_id" in line for line in plan)
+    # Страницы «Моих списков»: порядок берётся из индекса, без сортировки всей выборки
+    for plan in _plans_for(plans, r"WHERE wishlists\.user_id = \?.*ORDER BY wishlists\.created_at DESC"):
+        assert any("ix_wishlists_user_id_created_at_id" in line for line in plan)
+        assert not any("TEMP B-TREE" in line for line in plan)
+    # Товары списка в порядке sort_order — тоже по индексу
+    for plan in _plans_for(plans, r"WHERE wishlist_items\.wishlist_id = \? ORDER BY wishlist_items\.sort_order"):
+        assert any("ix_wishlist_items_wishlist_id_sort_order" in line for line in plan)
+        assert not any("TEMP B-TREE" in line for line in plan)
+
+
+def test_contributions_index_covers_amount_in_postgres():
+    """В Postgres индекс вкладов несёт amount (INCLUDE) — суммы без чтения таблицы."""
+    index = next(ix for ix in Contribution.__table__.indexes if ix.name == "ix_contributions_wishlist_item_id")
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert ddl.endswith("ON contributions (wishlist_item_id) INCLUDE (amount)")
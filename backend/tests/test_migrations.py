@@ -0,0 +1,116 @@
+"""Раннер миграций app.db.migrate на отдельной SQLite-БД во временном каталоге."""
+import pytest
+from sqlalchemy import inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db.migrate import SchemaEmpty, SchemaOutdated, check_schema_version, discover, migrate, schema_migrations, split_sql
+from app.db.session import direct_engine, engine
+
+
+@pytest.fixture
+async def temp_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+    yield engine
+    await engine.dispose()
+
+
+async def _versions(engine) -> list[int]:
+    async with engine.connect() as conn:
+        return list((await conn.execute(select(schema_migrations.c.version).order_by("version"))).scalars())
+
+
+@pytest.mark.asyncio
+async def test_fresh_database_is_created_from_models_and_stamped(temp_engine):
+    """Пустая БД: create_all по моделям и все версии помечены применёнными; старт видит актуальную схему."""
+    with pytest.raises(SchemaEmpty):
+        await check_schema_version(temp_engine)
+
+    assert await migrate(temp_engine) == []
+    async with temp_engine.connect() as conn:
+        tables = await conn.run_sync(lambda c: set(inspect(c).get_table_names()))
+    assert {"wishlists", "wishlist_items", "contributions", "product_cache", "schema_migrations"} <= tables
+    assert await _versions(temp_engine) == [m.version for m in discover()]
+    assert await check_schema_version(temp_engine) == discover()[-1].version
+    assert await migrate(temp_engine) == []
+
+
+@pytest.mark.asyncio
+async def test_existing_database_applies_pending_migrations_once(temp_engine, tmp_path):
+    """Старая БД без schema_migrations: SQL и Python-миграции по порядку номеров, каждая один раз."""
+    migrations = tmp_path / "migrations"
+    migrations.mkdir()
+    (migrations / "0001_add_note.sql").write_text(
+        "-- заметка к списку\nALTER TABLE wishlists ADD COLUMN note TEXT; -- комментарий в строке\n"
+    )
+    (migrations / "0002_fill_note.py").write_text(
+        "from sqlalchemy import text\n\n\n"
+        "async def upgrade(conn):\n"
+        "    await conn.execute(text(\"UPDATE wishlists SET note = 'migrated'\"))\n"
+    )
+    (migrations / "truncate_all_data.sql").write_text("DELETE FROM wishlists;")  # без номера — не миграция
+    async with temp_engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE wishlists (id INTEGER PRIMARY KEY)"))
+        await conn.execute(text("INSERT INTO wishlists (id) VALUES (1)"))
+
+    with pytest.raises(SchemaOutdated) as outdated:
+        await check_schema_version(temp_engine, migrations)
+    assert not isinstance(outdated.value, SchemaEmpty)  # непустую БД при старте не создаём заново
+
+    applied = await migrate(temp_engine, migrations)
+    assert [m.path.name for m in applied] == ["0001_add_note.sql", "0002_fill_note.py"]
+    assert await migrate(temp_engine, migrations) == []
+    async with temp_engine.connect() as conn:
+        assert (await conn.execute(text("SELECT note FROM wishlists"))).scalar() == "migrated"
+    assert await check_schema_version(temp_engine, migrations) == 2
+
+    (migrations / "0003_broken.sql").write_text(
+        "INSERT INTO wishlists (id, note) VALUES (2, 'partial');\nINSERT INTO no_such_table VALUES (1);\n"
+    )
+    with pytest.raises(SchemaOutdated):
+        await check_schema_version(temp_engine, migrations)
+    with pytest.raises(Exception):
+        await migrate(temp_engine, migrations)
+    # Файл откатился целиком (DDL в SQLite-драйвере не транзакционен, поэтому проверка на DML) и не помечен
+    assert await _versions(temp_engine) == [1, 2]
+    async with temp_engine.connect() as conn:
+        assert (await conn.execute(text("SELECT count(*) FROM wishlists"))).scalar() == 1
+
+
+def test_discover_rejects_duplicate_versions(tmp_path):
+    (tmp_path / "0001_a.sql").write_text("SELECT 1;")
+    (tmp_path / "0001_b.py").write_text("async def upgrade(conn):\n    pass\n")
+    with pytest.raises(RuntimeError, match="0001"):
+        discover(tmp_path)
+
+
+def test_repo_migrations_split_and_concurrent_files_run_outside_transaction():
+    """Файлы репозитория разбираются на выражения; CREATE INDEX CONCURRENTLY — вне транзакции."""
+    for migration in discover():
+        if migration.path.suffix == ".sql":
+            statements = split_sql(migration.path.read_text(encoding="utf-8"))
+            assert statements and all(";" not in s and "--" not in s for s in statements)
+            concurrent = any("CONCURRENTLY" in s for s in statements)
+            assert migration.transactional is not concurrent
+
+
+def test_concurrently_in_comment_keeps_migration_transactional(tmp_path):
+    (tmp_path / "0001_comment.sql").write_text(
+        "-- не CONCURRENTLY: таблица маленькая\nCREATE INDEX IF NOT EXISTS ix_a ON wishlists (title);\n"
+    )
+    (tmp_path / "0002_index.sql").write_text("create index concurrently if not exists ix_b ON wishlists (slug);\n")
+    comment, concurrent = discover(tmp_path)
+    assert comment.transactional and not concurrent.transactional
+
+
+async def test_direct_engine_bypasses_pgbouncer(monkeypatch):
+    """За PgBouncer миграции (сессионный advisory lock) идут только по прямому подключению."""
+    assert direct_engine() is engine
+    monkeypatch.setattr(settings, "db_pgbouncer", True)
+    monkeypatch.setattr(settings, "database_direct_url", None)
+    with pytest.raises(RuntimeError, match="DATABASE_DIRECT_URL"):
+        direct_engine()
+    monkeypatch.setattr(settings, "database_direct_url", "sqlite+aiosqlite:///:memory:")
+    direct = direct_engine()
+    assert direct is not engine
+    await direct.dispose()
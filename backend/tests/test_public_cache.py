@@ -0,0 +1,70 @@
+"""Тесты кэша публичных снимков вишлиста: LRU, версии, инвалидация на мутациях."""
+import pytest
+from httpx import AsyncClient
+
+from app.services.cache import PublicWishlistCache, public_cache
+
+
+def test_cache_lru_eviction():
+    """При переполнении вытесняется давно не читанный slug."""
+    cache = PublicWishlistCache(max_entries=2)
+    cache.put("a", cache.version("a"), b"A")
+    cache.put("b", cache.version("b"), b"B")
+    assert cache.get("a") == b"A"
+    cache.put("c", cache.version("c"), b"C")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"A"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_rejects_snapshot_built_before_invalidation():
+    """Снимок, начатый до инвалидации, не попадает в кэш."""
+    cache = PublicWishlistCache()
+    version = cache.version("slug")
+    cache.invalidate("slug")
+    assert cache.put("slug", version, b"stale") is False
+    assert cache.get("slug") is None
+    assert cache.put("slug", cache.version("slug"), b"fresh") is True
+    assert cache.get("slug") == b"fresh"
+
+
+def test_cache_version_is_per_slug():
+    """Инвалидация одного списка не меняет версию другого и не мешает сохранить его снимок."""
+    cache = PublicWishlistCache()
+    version = cache.version("a")
+    cache.invalidate("b")
+    assert cache.version("a") == version
+    assert cache.version("b") > version
+    assert cache.put("a", version, b"A") is True
+
+
+@pytest.mark.asyncio
+async def test_public_view_served_from_cache_and_invalidated(client: AsyncClient):
+    """Повторный GET — из кэша; добавление товара и резервация сбрасывают снимок."""
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    slug = create_r.json()["slug"]
+    creator_secret = create_r.json()["creator_secret"]
+
+    await client.get(f"/api/wishlists/s/{slug}")
+    hits = public_cache.hits
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    assert r.json()["items"] == []
+    assert public_cache.hits == hits + 1
+
+    add_r = await client.post(
+        f"/api/wishlists/m/{creator_secret}/items",
+        json={"title": "Подарок"},
+    )
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    assert [i["title"] for i in r.json()["items"]] == ["Подарок"]
+
+    await client.post(
+        f"/api/wishlists/s/{slug}/items/{add_r.json()['id']}/reserve",
+        json={"reserver_name": "Маша"},
+    )
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    assert r.json()["items"][0]["is_reserved"] is True
+
+    await client.patch(f"/api/wishlists/m/{creator_secret}", json={"title": "Новое"})
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    assert r.json()["title"] == "Новое"
@@ -0,0 +1,115 @@
+"""Тесты шины изменений между воркерами (InMemoryBus)."""
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.services.pubsub import BroadcastBus, InMemoryBus, PostgresNotifyBus, event_bus
+
+
+class FakeListenConnection:
+    """asyncpg-соединение для PostgresNotifyBus._serve: запоминает запросы, умеет «оборваться»."""
+
+    def __init__(self) -> None:
+        self.queries: list[tuple] = []
+        self._on_terminate = None
+
+    def add_termination_listener(self, callback) -> None:
+        self._on_terminate = callback
+
+    async def add_listener(self, channel, callback) -> None:
+        pass
+
+    async def execute(self, query, *args) -> None:
+        self.queries.append((query, *args))
+
+    def terminate(self) -> None:
+        self._on_terminate(self)
+
+
+def test_in_memory_bus_delivers_to_other_instances_only():
+    """Публикация доставляется остальным экземплярам hub, но не себе."""
+    a = InMemoryBus()
+    b = InMemoryBus(hub=a.hub)
+    got_a: list[str] = []
+    got_b: list[str] = []
+    a.subscribe(got_a.append)
+    b.subscribe(got_b.append)
+
+    a.publish_nowait("slug-1")
+    assert got_a == []
+    assert got_b == ["slug-1"]
+
+
+def test_postgres_bus_ignores_own_notifications():
+    """LISTEN/NOTIFY: уведомления своего процесса отфильтровываются по origin."""
+    bus = PostgresNotifyBus()
+    got: list[str] = []
+    bus.subscribe(got.append)
+    bus._on_notify(None, 1, bus.CHANNEL, f"{bus.origin}:own")
+    bus._on_notify(None, 2, bus.CHANNEL, "other-worker:remote")
+    assert got == ["remote"]
+
+
+def test_broadcast_bus_requires_publish_nowait():
+    """Шина без publish_nowait не создаётся — ошибка при старте, а не при первом commit."""
+    class Incomplete(BroadcastBus):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.asyncio
+async def test_postgres_bus_notices_dropped_connection_without_publishes():
+    """Обрыв LISTEN-соединения замечается сразу, даже если воркер ничего не публикует."""
+    bus = PostgresNotifyBus(liveness_interval=60)
+    raw = FakeListenConnection()
+    serving = asyncio.create_task(bus._serve(raw))
+    await asyncio.sleep(0)
+    raw.terminate()
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(serving, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_postgres_bus_checks_idle_connection_and_publishes():
+    """В тишине соединение проверяется SELECT 1; публикации уходят через pg_notify."""
+    bus = PostgresNotifyBus(liveness_interval=0.01)
+    raw = FakeListenConnection()
+    serving = asyncio.create_task(bus._serve(raw))
+    await asyncio.sleep(0.05)
+    bus.publish_nowait("slug-1")
+    await asyncio.sleep(0.01)
+    serving.cancel()
+    await asyncio.gather(serving, return_exceptions=True)
+    assert ("SELECT 1",) in raw.queries
+    assert ("SELECT pg_notify($1, $2)", bus.CHANNEL, f"{bus.origin}:slug-1") in raw.queries
+
+
+@pytest.mark.asyncio
+async def test_postgres_bus_refuses_to_listen_through_pgbouncer(monkeypatch):
+    """За PgBouncer без прямого подключения шина не стартует: LISTEN там не работает."""
+    monkeypatch.setattr(settings, "db_pgbouncer", True)
+    monkeypatch.setattr(settings, "database_direct_url", None)
+    bus = PostgresNotifyBus()
+    with pytest.raises(RuntimeError, match="DATABASE_DIRECT_URL"):
+        await bus.start()
+    assert bus._task is None
+
+
+@pytest.mark.asyncio
+async def test_commit_publishes_change_to_other_workers(client: AsyncClient):
+    """Изменение списка после commit публикуется в шину для других воркеров."""
+    peer = InMemoryBus(hub=event_bus.hub)
+    received: list[str] = []
+    peer.subscribe(received.append)
+    try:
+        create_r = await client.post("/api/wishlists", json={"title": "Список"})
+        slug = create_r.json()["slug"]
+        creator_secret = create_r.json()["creator_secret"]
+        await client.post(f"/api/wishlists/m/{creator_secret}/items", json={"title": "Подарок"})
+        assert received == [slug]
+    finally:
+        event_bus.hub.remove(peer)
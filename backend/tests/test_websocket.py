@@ -0,0 +1,224 @@
+"""Тесты рассылок WebSocket: debounce BroadcastScheduler, snapshot/patch протокол."""
+import asyncio
+import json
+
+import pytest
+
+from app.services.websocket import BroadcastScheduler, ConnectionManager, _slug_key, diff_snapshots
+
+
+class FakeManager(ConnectionManager):
+    """Подписчик есть всегда, отправленные снимки складываются в sent."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.sent: list[tuple[str, dict]] = []
+
+    def has_subscribers(self, slug: str) -> bool:
+        return True
+
+    async def broadcast_wishlist(self, slug: str, data: dict) -> bool:
+        self.sent.append((slug, data))
+        return True
+
+
+class FakeWebSocket:
+    """Собирает отправленные сообщения."""
+
+    def __init__(self) -> None:
+        self.messages: list[dict] = []
+        self.closed_with: int | None = None
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        self.messages.append(json.loads(text))
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.closed_with = code
+
+
+async def _drain() -> None:
+    """Дать задачам-писателям отправить очереди."""
+    await asyncio.sleep(0.01)
+
+
+def _snapshot(*items: dict, title: str = "Список") -> dict:
+    return {"id": 1, "title": title, "slug": "s", "items": list(items)}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_coalesces_burst_into_one_snapshot():
+    """Всплеск изменений одного slug за окно — одна загрузка снимка и одна рассылка."""
+    manager = FakeManager()
+    loads: list[str] = []
+
+    async def loader(slug: str) -> dict:
+        loads.append(slug)
+        return {"slug": slug, "version": len(loads)}
+
+    manager.set_loader(loader)
+    scheduler = BroadcastScheduler(manager, window=0.01)
+    for _ in range(20):
+        scheduler.schedule("a")
+    scheduler.schedule("b")
+    await asyncio.sleep(0.05)
+
+    assert sorted(loads) == ["a", "b"]
+    assert sorted(slug for slug, _ in manager.sent) == ["a", "b"]
+    stats = scheduler.stats()
+    assert stats["sent"] == 2
+    assert stats["coalesced"] == 19
+    assert stats["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_skips_slug_without_subscribers():
+    """Без подписчиков снимок не загружается."""
+    manager = ConnectionManager()
+
+    async def loader(slug: str) -> dict:
+        raise AssertionError("loader must not be called")
+
+    manager.set_loader(loader)
+    scheduler = BroadcastScheduler(manager, window=0.01)
+    scheduler.schedule("nobody")
+    await asyncio.sleep(0.02)
+    assert scheduler.stats()["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_overlapping_refreshes_never_send_older_snapshot():
+    """Два refresh одного slug подряд: медленная первая загрузка не перетирает более новую."""
+    manager = ConnectionManager()
+    ws = FakeWebSocket()
+    await manager.connect(ws, "s")
+    loads = 0
+
+    async def loader(slug: str) -> dict:
+        nonlocal loads
+        loads += 1
+        version = loads
+        if version == 1:
+            await asyncio.sleep(0.02)  # старый снимок грузится дольше нового
+        return _snapshot({"id": 1, "total_contributed": str(version)})
+
+    manager.set_loader(loader)
+    await asyncio.gather(manager.refresh("s"), manager.refresh("s"))
+    await _drain()
+    last = ws.messages[-1]
+    assert last["type"] == "patch" and last["upserts"] == [{"id": 1, "total_contributed": "2"}]
+    assert manager._refreshing == {}
+    await manager.disconnect(ws, "s")
+
+
+def test_diff_snapshots():
+    """Дельта: изменённые поля списка, изменённые/новые товары и удалённые id."""
+    old = _snapshot({"id": 1, "total_contributed": "0"}, {"id": 2, "total_contributed": "0"})
+    new = _snapshot({"id": 1, "total_contributed": "50"}, {"id": 3, "total_contributed": "0"}, title="Новое")
+    delta = diff_snapshots(old, new)
+    assert delta["fields"] == {"title": "Новое"}
+    assert [i["id"] for i in delta["upserts"]] == [1, 3]
+    assert delta["deletes"] == [2]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_on_connect_then_patches_with_seq():
+    """Подключение — снимок; изменения — patch с seq+1; без изменений ничего не шлётся."""
+    manager = ConnectionManager()
+    current = {"data": _snapshot({"id": 1, "is_reserved": False})}
+
+    async def loader(slug: str) -> dict:
+        return current["data"]
+
+    manager.set_loader(loader)
+    ws = FakeWebSocket()
+    await manager.connect(ws, "s")
+    await manager.send_snapshot(ws, "s")
+    await _drain()
+    assert ws.messages[0]["type"] == "snapshot"
+    seq = ws.messages[0]["seq"]
+
+    current["data"] = _snapshot({"id": 1, "is_reserved": True})
+    assert await manager.refresh("s") is True
+    await _drain()
+    patch = ws.messages[1]
+    assert patch["type"] == "patch"
+    assert patch["seq"] == seq + 1
+    assert patch["upserts"] == [{"id": 1, "is_reserved": True}]
+    assert patch["deletes"] == [] and patch["fields"] == {}
+
+    assert await manager.refresh("s") is False
+    await _drain()
+    assert len(ws.messages) == 2
+
+    await manager.send_snapshot(ws, "s")
+    await _drain()
+    assert ws.messages[2] == {"type": "snapshot", "seq": seq + 1, "data": current["data"]}
+    await manager.disconnect(ws, "s")
+
+
+class SlowWebSocket(FakeWebSocket):
+    """Клиент, который не читает: send_text висит, пока не отпустят."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def send_text(self, text: str) -> None:
+        await self.release.wait()
+        await super().send_text(text)
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_does_not_stall_others_and_is_evicted():
+    """Медленный клиент: быстрые получают все патчи, медленный — снимок вместо очереди, затем отключение."""
+    manager = ConnectionManager(queue_size=2)
+    fast, slow = FakeWebSocket(), SlowWebSocket()
+    await manager.connect(fast, "s")
+    await manager.connect(slow, "s")
+    await manager.broadcast_wishlist("s", _snapshot({"id": 1, "n": 0}))
+    for n in range(1, 4):
+        await manager.broadcast_wishlist("s", _snapshot({"id": 1, "n": n}))
+        await _drain()
+
+    assert [m["seq"] for m in fast.messages] == [1, 2, 3, 4]
+    assert manager.stats()["downgrades"] == 1
+    assert slow.messages == []
+
+    for n in range(4, 7):
+        await manager.broadcast_wishlist("s", _snapshot({"id": 1, "n": n}))
+    await _drain()
+    assert manager.stats()["evictions"] == 1
+    assert slow.closed_with == 1013
+    assert manager.stats()["connections"] == 1
+    stats = manager.stats()
+    assert stats["send_latency"]["count"] >= 4
+    assert stats["slugs"][_slug_key("s")]["send_latency"]["count"] >= 4
+    await manager.disconnect(fast, "s")
+
+
+@pytest.mark.asyncio
+async def test_connection_limit_per_slug_and_ping():
+    """Сверх лимита на slug — close 1013; ping уходит через очередь подписчика."""
+    manager = ConnectionManager(max_per_slug=1)
+    first, second, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    assert await manager.connect(first, "s") is True
+    assert await manager.connect(second, "s") is False
+    assert second.closed_with == 1013
+    assert await manager.connect(other, "t") is True
+
+    await manager.ping(first, "s")
+    await _drain()
+    assert first.messages == [{"type": "ping"}]
+    stats = manager.stats()
+    assert stats["connections"] == 2
+    assert stats["rejected"] == 1
+    assert stats["slugs"][_slug_key("s")]["connections"] == 1
+    assert stats["slugs"][_slug_key("t")]["connections"] == 1
+    assert "s" not in stats["slugs"] and "t" not in stats["slugs"]  # сами slug в метрики не попадают
+
+    await manager.disconnect(first, "s")
+    await manager.disconnect(other, "t")
+    assert manager.stats()["connections"] == 0
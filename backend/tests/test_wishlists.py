@@ -457,3 +457,327 @@ async def test_after_delete_item_contribution_returns_404(client: AsyncClient):
     r = await client.get(f"/api/contributions/{contributor_secret}")
     assert r.status_code == 404
     assert "Вклад не найден" in r.json()["detail"]
+
+
+# --- ETag / 304 ---
+
+
+@pytest.mark.asyncio
+async def test_public_etag_not_modified(client: AsyncClient):
+    """Публичный вид отдаёт ETag; тот же If-None-Match — 304, после изменения — новый ETag."""
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    slug = create_r.json()["slug"]
+    creator_secret = create_r.json()["creator_secret"]
+
+    r = await client.get(f"/api/wishlists/s/{slug}")
+    etag = r.headers["etag"]
+    assert "last-modified" in r.headers
+    r = await client.get(f"/api/wishlists/s/{slug}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    await client.post(f"/api/wishlists/m/{creator_secret}/items", json={"title": "Подарок"})
+    r = await client.get(f"/api/wishlists/s/{slug}", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert len(r.json()["items"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_manage_etag_not_modified(client: AsyncClient):
+    """Вид создателя: 304 по If-None-Match, вклад по публичной ссылке меняет ETag."""
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    slug = create_r.json()["slug"]
+    creator_secret = create_r.json()["creator_secret"]
+    add_r = await client.post(
+        f"/api/wishlists/m/{creator_secret}/items",
+        json={"title": "Подарок", "price": 1000},
+    )
+
+    r = await client.get(f"/api/wishlists/m/{creator_secret}")
+    etag = r.headers["etag"]
+    r = await client.get(f"/api/wishlists/m/{creator_secret}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    await client.post(
+        f"/api/wishlists/s/{slug}/items/{add_r.json()['id']}/contribute",
+        json={"contributor_name": "Маша", "amount": 100},
+    )
+    r = await client.get(f"/api/wishlists/m/{creator_secret}", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert float(r.json()["items"][0]["total_contributed"]) == 100
+
+
+@pytest.mark.asyncio
+async def test_revision_bumped_last_before_commit(client: AsyncClient, db_session):
+    """UPDATE revision (блокировка строки списка) — последний запрос транзакции, прямо перед COMMIT."""
+    from sqlalchemy import event, select
+
+    from app.db.session import engine
+    from app.models import Wishlist, WishlistItem
+    from app.services.wishlist import mark_wishlist_changed
+
+    slug = (await client.post("/api/wishlists", json={"title": "Список"})).json()["slug"]
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        mark_wishlist_changed(db_session, slug)
+        await db_session.execute(select(WishlistItem.id))
+        assert not any(s.startswith("UPDATE wishlists") for s in statements)
+        await db_session.commit()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert statements[-1].startswith("UPDATE wishlists")
+    revision = (await db_session.execute(select(Wishlist.revision).where(Wishlist.slug == slug))).scalar_one()
+    assert revision == 2
+
+
+# --- Импорт товаров списком ссылок ---
+
+
+@pytest.mark.asyncio
+async def test_import_items_streams_progress_and_appends(client: AsyncClient):
+    """NDJSON: progress на каждую ссылку, done с товарами; sort_order продолжает список подряд."""
+    import json
+
+    import httpx
+
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    creator_secret = create_r.json()["creator_secret"]
+    await client.post(f"/api/wishlists/m/{creator_secret}/items", json={"title": "Уже был"})
+
+    async def fake_fetch(url: str) -> dict:
+        if "down" in url:
+            raise httpx.ConnectError("Connection refused")
+        return {"title": f"Товар {url[-1]}", "image_url": None, "price": 100}
+
+    urls = ["https://shop.example.com/p/1", "https://down.example.com/p/2", "https://shop.example.com/p/3"]
+    with patch("app.api.v1.wishlists.fetch_product", side_effect=fake_fetch):
+        r = await client.post(f"/api/wishlists/m/{creator_secret}/items/import", json={"urls": urls})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    progress = [m for m in lines if m["type"] == "progress"]
+    assert sorted(m["index"] for m in progress) == [0, 1, 2]
+    assert [m["completed"] for m in progress] == [1, 2, 3]
+    failed = next(m for m in progress if m["index"] == 1)
+    assert failed["ok"] is False and "загрузить" in failed["error"]
+
+    done = lines[-1]
+    assert done["type"] == "done"
+    assert [i["title"] for i in done["items"]] == ["Товар 1", urls[1], "Товар 3"]
+    assert [i["sort_order"] for i in done["items"]] == [2, 3, 4]
+
+    manage = await client.get(f"/api/wishlists/m/{creator_secret}")
+    assert [i["title"] for i in manage.json()["items"]] == ["Уже был", "Товар 1", urls[1], "Товар 3"]
+
+
+@pytest.mark.asyncio
+async def test_import_items_unexpected_error_fails_only_that_url(client: AsyncClient):
+    """Непредвиденная ошибка разбора одной ссылки — строка progress с ошибкой, остальные импортируются."""
+    import json
+
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    creator_secret = create_r.json()["creator_secret"]
+
+    async def fake_fetch(url: str) -> dict:
+        if "broken" in url:
+            raise KeyError("price")
+        return {"title": "Товар", "image_url": None, "price": 100}
+
+    urls = ["https://broken.example.com/p/1", "https://shop.example.com/p/2"]
+    with patch("app.api.v1.wishlists.fetch_product", side_effect=fake_fetch):
+        r = await client.post(f"/api/wishlists/m/{creator_secret}/items/import", json={"urls": urls})
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    failed = next(m for m in lines if m["type"] == "progress" and m["index"] == 0)
+    assert failed["ok"] is False and failed["error"]
+    assert lines[-1]["type"] == "done"
+    assert [i["title"] for i in lines[-1]["items"]] == [urls[0], "Товар"]
+
+
+@pytest.mark.asyncio
+async def test_import_items_not_found(client: AsyncClient):
+    """Импорт по неверному ключу — 404 до начала загрузки страниц."""
+    with patch("app.api.v1.wishlists.fetch_product", new_callable=AsyncMock) as m:
+        r = await client.post("/api/wishlists/m/bad-secret/items/import", json={"urls": ["https://a.example.com"]})
+    assert r.status_code == 404
+    m.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_import_items_validates_urls(client: AsyncClient):
+    """Пустой список ссылок — 422."""
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    r = await client.post(f"/api/wishlists/m/{create_r.json()['creator_secret']}/items/import", json={"urls": []})
+    assert r.status_code == 422
+
+
+# --- Пакетные операции над товарами ---
+
+
+async def _wishlist_with_items(client: AsyncClient, titles: list[str]) -> tuple[str, str, list[int]]:
+    create_r = await client.post("/api/wishlists", json={"title": "Список"})
+    slug, creator_secret = create_r.json()["slug"], create_r.json()["creator_secret"]
+    ids = []
+    for title in titles:
+        r = await client.post(f"/api/wishlists/m/{creator_secret}/items", json={"title": title, "price": 1000})
+        ids.append(r.json()["id"])
+    return slug, creator_secret, ids
+
+
+@pytest.mark.asyncio
+async def test_batch_items_applies_all_ops(client: AsyncClient):
+    """create/update/delete/move за один запрос; в ответе только затронутые товары."""
+    slug, creator_secret, (a, b, c, d) = await _wishlist_with_items(client, ["A", "B", "C", "D"])
+    reserve_r = await client.post(f"/api/wishlists/s/{slug}/items/{c}/reserve", json={"reserver_name": "Маша"})
+    contribute_r = await client.post(
+        f"/api/wishlists/s/{slug}/items/{d}/contribute", json={"contributor_name": "Петя", "amount": 100}
+    )
+
+    r = await client.post(
+        f"/api/wishlists/m/{creator_secret}/items/batch",
+        json={"ops": [
+            {"op": "update", "id": a, "title": "A2", "price": 1500},
+            {"op": "move", "id": a, "sort_order": 3},
+            {"op": "move", "id": b, "sort_order": 1},
+            {"op": "delete", "id": c},
+            {"op": "delete", "id": d},
+            {"op": "create", "title": "E"},
+            {"op": "create", "title": "F", "sort_order": 2},
+        ]},
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert sorted(data["deleted"]) == sorted([c, d])
+    by_title = {i["title"]: i for i in data["items"]}
+    assert set(by_title) == {"A2", "B", "E", "F"}
+    assert by_title["A2"]["sort_order"] == 3 and float(by_title["A2"]["price"]) == 1500
+    assert by_title["E"]["sort_order"] == 4  # в конец — после перемещений и удалений
+
+    manage = (await client.get(f"/api/wishlists/m/{creator_secret}")).json()
+    assert [i["title"] for i in manage["items"]] == ["B", "F", "A2", "E"]
+    # Резервации и вклады удалённых товаров удалены вместе с ними
+    r = await client.get(f"/api/reservations/{reserve_r.json()['reserver_secret']}")
+    assert r.status_code == 404
+    r = await client.get(f"/api/contributions/{contribute_r.json()['contributor_secret']}")
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_batch_items_unknown_id_rolls_back(client: AsyncClient):
+    """Чужой или уже удалённый в пакете товар — 404, ничего не применяется."""
+    _, creator_secret, (a,) = await _wishlist_with_items(client, ["A"])
+    _, _, (foreign,) = await _wishlist_with_items(client, ["Чужой"])
+
+    for ops in (
+        [{"op": "update", "id": a, "title": "X"}, {"op": "delete", "id": foreign}],
+        [{"op": "delete", "id": a}, {"op": "move", "id": a, "sort_order": 5}],
+    ):
+        r = await client.post(f"/api/wishlists/m/{creator_secret}/items/batch", json={"ops": ops})
+        assert r.status_code == 404
+    manage = (await client.get(f"/api/wishlists/m/{creator_secret}")).json()
+    assert [i["title"] for i in manage["items"]] == ["A"]
+
+
+@pytest.mark.asyncio
+async def test_batch_items_validation(client: AsyncClient):
+    """Неизвестная операция и неверный ключ списка."""
+    _, creator_secret, _ = await _wishlist_with_items(client, [])
+    r = await client.post(f"/api/wishlists/m/{creator_secret}/items/batch", json={"ops": [{"op": "copy", "id": 1}]})
+    assert r.status_code == 422
+    r = await client.post("/api/wishlists/m/bad-secret/items/batch", json={"ops": [{"op": "create", "title": "A"}]})
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_item_mutations_do_not_load_wishlist_graph(client: AsyncClient, db_session):
+    """Правка и удаление товара находят список по индексу creator_secret и не читают чужие товары и вклады."""
+    from sqlalchemy import event, text
+
+    from app.db.session import engine
+
+    slug, creator_secret, (a, b) = await _wishlist_with_items(client, ["A", "B"])
+    await client.post(f"/api/wishlists/s/{slug}/items/{b}/contribute", json={"contributor_name": "Петя", "amount": 100})
+
+    plan = (
+        await db_session.execute(text("EXPLAIN QUERY PLAN SELECT id, slug FROM wishlists WHERE creator_secret = 'x'"))
+    ).all()
+    assert "ix_wishlists_creator_secret" in " ".join(row[-1] for row in plan)
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        r = await client.patch(f"/api/wishlists/m/{creator_secret}/items/{a}", json={"title": "A2"})
+        assert r.status_code == 200 and r.json()["title"] == "A2"
+        r = await client.delete(f"/api/wishlists/m/{creator_secret}/items/{a}")
+        assert r.status_code == 204
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert not any("FROM contributions" in s for s in selects)
+    assert not any("wishlist_items.wishlist_id IN" in s for s in selects)  # selectinload всех товаров списка
+    manage = (await client.get(f"/api/wishlists/m/{creator_secret}")).json()
+    assert [i["title"] for i in manage["items"]] == ["B"]
+
+
+# --- Мои списки: страницы с итогами ---
+
+
+@pytest.mark.asyncio
+async def test_my_wishlists_summary_keyset_pages(client: AsyncClient):
+    """/mine/summary: новые первыми, курсор без пропусков и повторов, итоги посчитаны в SQL."""
+    reg_r = await client.post("/api/auth/register", json={"email": "pages@example.com", "password": "secret12"})
+    headers = {"Authorization": f"Bearer {reg_r.json()['access_token']}"}
+    created = []
+    for n in range(5):
+        r = await client.post("/api/wishlists", json={"title": f"Список {n}"}, headers=headers)
+        created.append(r.json())
+    await client.post("/api/wishlists", json={"title": "Анонимный"})
+
+    first = created[-1]
+    add = [
+        (await client.post(f"/api/wishlists/m/{first['creator_secret']}/items", json={"title": t, "price": 1000})).json()
+        for t in ("A", "B")
+    ]
+    await client.post(f"/api/wishlists/m/{first['creator_secret']}/items", json={"title": "Без цены"})
+    await client.post(f"/api/wishlists/s/{first['slug']}/items/{add[0]['id']}/reserve", json={"reserver_name": "Маша"})
+    await client.post(
+        f"/api/wishlists/s/{first['slug']}/items/{add[1]['id']}/contribute",
+        json={"contributor_name": "Петя", "amount": 250},
+    )
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        r = await client.get("/api/wishlists/mine/summary", params=params, headers=headers)
+        assert r.status_code == 200
+        page = r.json()
+        seen += page["items"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert [w["title"] for w in seen] == [f"Список {n}" for n in reversed(range(5))]
+    assert "items" not in seen[0]
+    assert seen[0]["item_count"] == 3 and seen[0]["reserved_count"] == 1
+    assert float(seen[0]["collected"]) == 250 and float(seen[0]["target"]) == 2000
+    assert seen[1]["item_count"] == 0 and float(seen[1]["target"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_my_wishlists_summary_errors(client: AsyncClient):
+    """Без токена — 401, испорченный курсор — 400."""
+    assert (await client.get("/api/wishlists/mine/summary")).status_code == 401
+    reg_r = await client.post("/api/auth/register", json={"email": "cursor@example.com", "password": "secret12"})
+    headers = {"Authorization": f"Bearer {reg_r.json()['access_token']}"}
+    r = await client.get("/api/wishlists/mine/summary", params={"cursor": "bm90LWpzb24"}, headers=headers)
+    assert r.status_code == 400
@@ -69,6 +69,7 @@ export const translations: Record<Locale, Record<string, string>> = {
     'wishlist.myLists': 'Мои списки',
     'wishlist.createNew': 'Создать список',
     'wishlist.noLists': 'У вас пока нет списков. Создайте первый — и поделитесь ссылкой с друзьями.',
+    'wishlist.loadMore': 'Показать ещё',
     'wishlist.listTitle': 'Название списка',
     'wishlist.listTitlePlaceholder': 'Например: День рождения Маши',
     'wishlist.occasion': 'Повод',
@@ -235,6 +236,7 @@ export const translations: Record<Locale, Record<string, string>> = {
     'wishlist.myLists': 'My lists',
     'wishlist.createNew': 'Create list',
     'wishlist.noLists': "You don't have any lists yet. Create one and share the link with friends.",
+    'wishlist.loadMore': 'Show more',
     'wishlist.listTitle': 'List title',
     'wishlist.listTitlePlaceholder': "e.g. Mary's Birthday",
     'wishlist.occasion': 'Occasion',
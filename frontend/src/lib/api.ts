@@ -47,6 +47,19 @@ export type WishlistManageDetailResponse = WishlistManageResponse & {
   items: WishlistItemResponse[]
 }
 
+/** Карточка для «Мои списки»: итоги без самих товаров */
+export type WishlistSummaryResponse = WishlistManageResponse & {
+  item_count: number
+  reserved_count: number
+  collected: number | string
+  target: number | string
+}
+
+export type WishlistSummaryPage = {
+  items: WishlistSummaryResponse[]
+  next_cursor: string | null
+}
+
 export type WishlistPublicResponse = {
   id: number
   title: string
@@ -75,3 +88,31 @@ export type FetchProductResponse = {
   image_url: string | null
   price: number | string | null
 }
+
+/**
+ * Сообщения WebSocket /wishlists/ws/{slug}: снимок при подключении, дальше patch с seq.
+ * На ping нужно ответить {"type": "pong"}, иначе сервер закроет соединение по таймауту.
+ */
+export type WishlistSocketMessage =
+  | { type: 'ping' }
+  | { type: 'snapshot'; seq: number; data: WishlistPublicResponse }
+  | {
+      type: 'patch'
+      seq: number
+      fields: Partial<Omit<WishlistPublicResponse, 'items'>>
+      upserts: WishlistItemResponse[]
+      deletes: number[]
+    }
+
+export function applyWishlistPatch(
+  wishlist: WishlistPublicResponse,
+  patch: Extract<WishlistSocketMessage, { type: 'patch' }>
+): WishlistPublicResponse {
+  const upserted = new Map(patch.upserts.map((i) => [i.id, i]))
+  const deleted = new Set(patch.deletes)
+  const items = wishlist.items
+    .filter((i) => !deleted.has(i.id) && !upserted.has(i.id))
+    .concat(patch.upserts)
+    .sort((a, b) => a.sort_order - b.sort_order || a.id - b.id)
+  return { ...wishlist, ...patch.fields, items }
+}
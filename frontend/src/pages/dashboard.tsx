@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useCallback, useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
 import axios from 'axios'
 import { Gift, MoreVertical, Pencil, Share2, Trash2 } from 'lucide-react'
@@ -13,7 +13,7 @@ import {
 } from '@/components/ui/dropdown-menu'
 import { DashboardSkeleton } from '@/components/dashboard-skeleton'
 import { useI18n } from '@/contexts/i18n-context'
-import { API_URL, type WishlistManageDetailResponse } from '@/lib/api'
+import { API_URL, type WishlistSummaryPage, type WishlistSummaryResponse } from '@/lib/api'
 import { removeStoredWishlist } from '@/lib/wishlist-storage'
 
 function giftCountKey(count: number): string {
@@ -51,19 +51,33 @@ function daysUntilEvent(eventDate: string | null, t: (k: string) => string): str
 
 export function Dashboard() {
   const { t } = useI18n()
-  const [lists, setLists] = useState<WishlistManageDetailResponse[]>([])
+  const [lists, setLists] = useState<WishlistSummaryResponse[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState<string | null>(null)
 
-  useEffect(() => {
-    axios
-      .get<WishlistManageDetailResponse[]>(`${API_URL}/wishlists/mine`)
-      .then((r) => setLists(r.data))
+  const loadPage = useCallback((cursor: string | null) => {
+    return axios
+      .get<WishlistSummaryPage>(`${API_URL}/wishlists/mine/summary`, { params: cursor ? { cursor } : {} })
+      .then((r) => {
+        setLists((prev) => (cursor ? [...prev, ...r.data.items] : r.data.items))
+        setNextCursor(r.data.next_cursor)
+      })
       .catch((e) => setError(e.response?.data?.detail ?? e.message))
-      .finally(() => setLoading(false))
   }, [])
 
-  const shareList = (w: WishlistManageDetailResponse) => {
+  useEffect(() => {
+    loadPage(null).finally(() => setLoading(false))
+  }, [loadPage])
+
+  const loadMore = () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    loadPage(nextCursor).finally(() => setLoadingMore(false))
+  }
+
+  const shareList = (w: WishlistSummaryResponse) => {
     const url = `${window.location.origin}/wishlists/s/${w.slug}`
     const nav = typeof navigator !== 'undefined' ? navigator : null
     if (nav?.share) {
@@ -75,7 +89,7 @@ export function Dashboard() {
     }
   }
 
-  const deleteList = async (w: WishlistManageDetailResponse) => {
+  const deleteList = async (w: WishlistSummaryResponse) => {
     if (!confirm(t('wishlist.deleteConfirm'))) return
     try {
       await axios.delete(`${API_URL}/wishlists/m/${w.creator_secret}`)
@@ -117,7 +131,7 @@ export function Dashboard() {
       ) : (
         <ul className="space-y-3">
           {lists.map((w) => {
-            const count = w.items.length
+            const count = w.item_count
             const giftLabel = t(giftCountKey(count)).replace('{{count}}', String(count))
             const daysLabel = daysUntilEvent(w.event_date, t)
             return (
@@ -177,6 +191,13 @@ export function Dashboard() {
           })}
         </ul>
       )}
+      {nextCursor && (
+        <div className="flex justify-center">
+          <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? t('common.loading') : t('wishlist.loadMore')}
+          </Button>
+        </div>
+      )}
     </div>
   )
 }
@@ -32,7 +32,7 @@ import {
 } from '@/components/ui/dropdown-menu'
 import { Skeleton } from '@/components/ui/skeleton'
 import { useI18n } from '@/contexts/i18n-context'
-import { API_URL, type FetchProductResponse, type WishlistManageDetailResponse, type WishlistItemResponse, type WishlistManageResponse } from '@/lib/api'
+import { API_URL, type FetchProductResponse, type WishlistManageDetailResponse, type WishlistItemResponse, type WishlistManageResponse, type WishlistSocketMessage } from '@/lib/api'
 import { removeStoredWishlist, updateStoredWishlistTitle } from '@/lib/wishlist-storage'
 
 function toNum(v: number | string | null | undefined): number {
@@ -128,9 +128,19 @@ export function ManageWishlist() {
           })()
         : `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}${API_URL}/wishlists/ws/${wishlist.slug}`
 
-  useWebSocket(wsUrl, {
-    onMessage: () => {
+  const { sendMessage } = useWebSocket(wsUrl, {
+    onMessage: (e: MessageEvent) => {
       if (!creatorSecret) return
+      let msg: WishlistSocketMessage | null = null
+      try {
+        msg = JSON.parse(e.data) as WishlistSocketMessage
+      } catch (_err) {
+        // ignore invalid WS message payload
+      }
+      if (msg?.type === 'ping') {
+        sendMessage(JSON.stringify({ type: 'pong' }))
+        return
+      }
       axios
         .get<WishlistManageDetailResponse>(`${API_URL}/wishlists/m/${creatorSecret}`)
         .then((r) => setWishlist(r.data))
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { Link, useParams } from 'react-router-dom'
 import useWebSocket from 'react-use-websocket'
 import axios from 'axios'
@@ -18,7 +18,9 @@ import { Label } from '@/components/ui/label'
 import { useI18n } from '@/contexts/i18n-context'
 import {
   API_URL,
+  applyWishlistPatch,
   type WishlistPublicResponse,
+  type WishlistSocketMessage,
   type ReservationCreatedResponse,
   type ContributionCreatedResponse,
 } from '@/lib/api'
@@ -63,13 +65,32 @@ export function PublicWishlist() {
           })()
         : `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}${API_URL}/wishlists/ws/${slug}`
 
-  useWebSocket(wsUrl, {
+  const lastSeq = useRef<number | null>(null)
+  const { sendMessage } = useWebSocket(wsUrl, {
+    onOpen: () => {
+      lastSeq.current = null
+    },
     onMessage: (e: MessageEvent) => {
+      let parsed: WishlistSocketMessage
       try {
-        const data = JSON.parse(e.data) as WishlistPublicResponse
-        setWishlist(data)
+        parsed = JSON.parse(e.data) as WishlistSocketMessage
       } catch (_err) {
-        // ignore invalid WS message payload
+        return // ignore invalid WS message payload
+      }
+      const msg = parsed
+      if (msg.type === 'ping') {
+        sendMessage(JSON.stringify({ type: 'pong' }))
+      } else if (msg.type === 'snapshot') {
+        lastSeq.current = msg.seq
+        setWishlist(msg.data)
+      } else if (msg.type === 'patch') {
+        if (lastSeq.current === null || msg.seq !== lastSeq.current + 1) {
+          // пропущено сообщение — просим полный снимок
+          sendMessage(JSON.stringify({ type: 'resync' }))
+          return
+        }
+        lastSeq.current = msg.seq
+        setWishlist((w) => (w ? applyWishlistPatch(w, msg) : w))
       }
     },
     shouldReconnect: () => true,